@@ -4,16 +4,31 @@ import time
 import threading
 import sys
 import json
+import queue
 from datetime import datetime
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, asdict
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
 from typing import List, Dict, Optional
 import random
+import itertools
 import math
 import re
-import socket
+import html
+import sqlite3
+import zlib
+import hashlib
 import warnings
 import webbrowser
+import asyncio
+import contextvars
 import subprocess
+import shutil
+import platform
+import ast
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import psutil
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -23,8 +38,10 @@ from langchain_ollama import ChatOllama
 from langchain.agents import create_tool_calling_agent
 from langchain.agents import AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.callbacks import BaseCallbackHandler
 
 # --- PyQt6 UI ---
 from PyQt6.QtWidgets import (QApplication, QWidget, QMenu, QColorDialog, 
@@ -34,7 +51,8 @@ from PyQt6.QtWidgets import (QApplication, QWidget, QMenu, QColorDialog,
                             QLineEdit)
 from PyQt6.QtCore import Qt, QTimer, QPoint, QPointF, QRectF, pyqtSignal, QObject
 from PyQt6.QtGui import (QPainter, QPainterPath, QRadialGradient, QLinearGradient, 
-                        QColor, QFont, QPen, QBrush, QFontMetrics, QIcon, QKeyEvent)
+                        QColor, QFont, QPen, QBrush, QFontMetrics, QIcon, QKeyEvent,
+                        QTextCursor, QTextCharFormat, QTextBlockFormat, QPixmap)
 
 from PyQt6.QtWidgets import (QApplication, QWidget, QMenu, QColorDialog, 
                             QMessageBox, QInputDialog, QVBoxLayout, QLabel,
@@ -44,145 +62,349 @@ from PyQt6.QtWidgets import (QApplication, QWidget, QMenu, QColorDialog,
 # --- Speech & TTS ---
 import pyttsx3
 import speech_recognition as sr
+import audioop  # Provided by audioop-lts on Python 3.13+, like speech_recognition itself
+try:
+    import numpy as np
+except ImportError:  # Only needed by the wake-word template matcher
+    np = None
 from dotenv import load_dotenv
 
 # --- Tool Integration ---
 from langchain.tools import tool as langchain_tool
+from tools.runtime import ToolRuntime, command_cancel_event
+from langchain_core.tools import StructuredTool
+from pydantic import create_model
+
+# ============================================================================
+# STARTUP TIMELINE
+# ============================================================================
+
+class StartupTimeline:
+    """Milestones since process start, logged once the AI bootstrap finishes"""
+    
+    def __init__(self):
+        try:
+            self.started = psutil.Process().create_time()  # Includes interpreter and imports
+        except Exception:
+            self.started = time.time()
+        self.marks: List[tuple] = []
+        self._lock = threading.Lock()
+    
+    def mark(self, label: str) -> float:
+        elapsed = time.time() - self.started
+        with self._lock:
+            self.marks.append((elapsed, label))
+        return elapsed
+    
+    def log(self):
+        with self._lock:
+            marks = sorted(self.marks)
+        logging.info("⏱️ Startup timeline:")
+        for elapsed, label in marks:
+            logging.info(f"   +{elapsed:6.2f}s  {label}")
+
+startup_timeline = StartupTimeline()
+startup_timeline.mark("imports done")
 
 # ============================================================================
 # OLLAMA AUTO-DETECTION AND SETUP
 # ============================================================================
 
-def check_ollama_connection():
+# Model families JARVIS works with; any of them counts as a usable model
+SUPPORTED_MODEL_FAMILIES = ['qwen2.5', 'llama', 'mistral', 'codellama', 'phi']
+BOOTSTRAP_WAIT_SECONDS = 20  # How long the voice engine waits for the AI before greeting
+
+class OllamaClient:
     """
-    Check if Ollama is running and accessible
-    Returns: (bool, str) - (is_connected, status_message)
+    Thin client for the Ollama REST API on one pooled HTTP session, so model
+    discovery, pulls and keep-alive pings reuse connections instead of
+    spawning `ollama` processes.
     """
-    print("\n🔍 Checking Ollama connection...")
     
-    def is_ollama_installed():
-        """Check if Ollama is installed"""
-        try:
-            # Try to run ollama --version
-            result = subprocess.run(['ollama', '--version'], 
-                                  capture_output=True, text=True, timeout=5,
-                                  creationflags=subprocess.CREATE_NO_WINDOW)
-            return result.returncode == 0
-        except:
-            return False
+    def __init__(self, host: Optional[str] = None):
+        host = host or os.environ.get("OLLAMA_HOST") or "localhost:11434"
+        if not host.startswith(("http://", "https://")):
+            host = f"http://{host}"
+        self.base_url = host.rstrip("/").replace("0.0.0.0", "localhost")
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._preloading = set()
     
-    def is_ollama_running():
-        """Check if Ollama process is running"""
-        for proc in psutil.process_iter(['name']):
-            if proc.info['name'] and 'ollama' in proc.info['name'].lower():
-                return True
-        return False
+    @property
+    def session(self):
+        # requests is imported here so it stays off the startup path
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+                session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+                self._session = session
+            return self._session
+    
+    def _get(self, path: str, timeout: float = 5):
+        response = self.session.get(f"{self.base_url}{path}", timeout=timeout)
+        response.raise_for_status()
+        return response.json()
     
-    def can_connect_to_ollama():
-        """Check if we can connect to Ollama API"""
+    def is_up(self, timeout: float = 2) -> bool:
         try:
-            socket.create_connection(('localhost', 11434), timeout=3)
+            self._get("/api/version", timeout=timeout)
             return True
-        except:
+        except Exception:
             return False
     
-    def start_ollama():
-        """Start Ollama service"""
-        print("🚀 Starting Ollama service...")
+    def list_models(self) -> List[str]:
+        """Installed models (GET /api/tags)"""
+        return [model["name"] for model in self._get("/api/tags").get("models", [])]
+    
+    def loaded_models(self) -> List[str]:
+        """Models currently held in memory (GET /api/ps)"""
         try:
-            # Start Ollama in background
-            subprocess.Popen(['ollama', 'serve'], 
-                           creationflags=subprocess.CREATE_NO_WINDOW,
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL)
-            
-            # Wait for service to start
-            for _ in range(15):
-                time.sleep(1)
-                if can_connect_to_ollama():
-                    return True
-            return False
-        except Exception as e:
-            print(f"❌ Failed to start Ollama: {e}")
-            return False
+            return [model["name"] for model in self._get("/api/ps").get("models", [])]
+        except Exception:
+            return []
     
-    # Check installation
-    if not is_ollama_installed():
-        print("❌ Ollama is not installed!")
-        print("\n📥 To enable AI features, please install Ollama:")
-        print("   1. Download from: https://ollama.ai")
-        print("   2. Run the installer")
-        print("   3. Open terminal and run: ollama pull qwen2.5:7b")
-        print("   4. Restart JARVIS")
-        
-        # Ask user if they want to open browser
-        response = input("\nOpen browser to download Ollama? (y/n): ")
-        if response.lower() == 'y':
-            webbrowser.open('https://ollama.ai')
-        
-        return False, "Ollama not installed"
-    
-    # Check if running
-    if not is_ollama_running():
-        print("⚡ Ollama not running, attempting to start...")
-        if not start_ollama():
-            print("❌ Could not start Ollama service")
-            print("\n💡 Please manually start Ollama:")
-            print("   - Open terminal and run: ollama serve")
-            print("   - Wait for it to start, then restart JARVIS")
-            return False, "Ollama service not running"
-    
-    # Check connection
-    if not can_connect_to_ollama():
-        print("❌ Cannot connect to Ollama API")
-        print("\n💡 Troubleshooting steps:")
-        print("   1. Make sure Ollama is running: ollama serve")
-        print("   2. Check if port 11434 is available")
-        print("   3. Restart Ollama service")
-        return False, "Cannot connect to Ollama"
-    
-    print("✅ Ollama is connected and ready!")
-    return True, "Ollama connected"
-
-def check_ollama_model():
-    """
-    Check if required model exists
-    Returns: (bool, str) - (model_exists, status_message)
-    """
-    try:
-        result = subprocess.run(['ollama', 'list'], 
-                              capture_output=True, text=True, timeout=10,
-                              creationflags=subprocess.CREATE_NO_WINDOW)
-        
-        if result.returncode != 0:
-            return False, "Cannot check models"
-        
-        output = result.stdout.lower()
-        
-        # Check for various model names
-        model_names = ['qwen2.5', 'llama', 'mistral', 'codellama', 'phi']
-        for model in model_names:
-            if model in output:
-                return True, f"Found model: {model}"
+    def pull(self, model: str, on_progress=None) -> bool:
+        """Download a model, reporting (status, completed, total) as it streams"""
+        with self.session.post(f"{self.base_url}/api/pull", json={"model": model, "stream": True},
+                               stream=True, timeout=(5, None)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                update = json.loads(line)
+                if "error" in update:
+                    raise RuntimeError(update["error"])
+                if on_progress:
+                    on_progress(update.get("status", ""), update.get("completed"), update.get("total"))
+        return True
+    
+    def preload(self, model: str, num_ctx: Optional[int] = None, keep_alive: Optional[str] = None) -> float:
+        """
+        Load a model into memory and keep it there (POST /api/generate with no
+        prompt). num_ctx must match the chat requests, otherwise Ollama
+        reloads the model on the first real query. Returns seconds taken.
+        """
+        payload = {"model": model, "keep_alive": keep_alive or settings_manager.get('ollama_keep_alive', '30m')}
+        if num_ctx:
+            payload["options"] = {"num_ctx": num_ctx}
+        start = time.perf_counter()
+        response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=(5, 300))
+        response.raise_for_status()
+        elapsed = time.perf_counter() - start
+        logging.info(f"🔥 Model {model} loaded in {elapsed:.1f}s (keep_alive {payload['keep_alive']})")
+        return elapsed
+    
+    def preload_async(self, model: str, num_ctx: Optional[int] = None, on_done=None):
+        """preload() on a background thread; repeated calls for the same model are ignored"""
+        if model in self._preloading:
+            return
+        self._preloading.add(model)
         
-        return False, "No suitable model found"
+        def run():
+            ok = False
+            try:
+                self.preload(model, num_ctx)
+                ok = True
+            except Exception as e:
+                logging.error(f"Failed to preload {model}: {e}")
+            finally:
+                self._preloading.discard(model)
+            if on_done:
+                on_done(model, ok)
         
+        threading.Thread(target=run, name=f"preload-{model}", daemon=True).start()
+
+ollama_client = OllamaClient()
+
+def is_ollama_installed():
+    """Check if the ollama executable is on PATH"""
+    return shutil.which("ollama") is not None
+
+def is_ollama_running():
+    """Check if Ollama process is running"""
+    for proc in psutil.process_iter(['name']):
+        if proc.info['name'] and 'ollama' in proc.info['name'].lower():
+            return True
+    return False
+
+def start_ollama():
+    """Start Ollama service"""
+    print("🚀 Starting Ollama service...")
+    try:
+        # Start Ollama in background
+        subprocess.Popen(['ollama', 'serve'], 
+                       creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+                       stdout=subprocess.DEVNULL, 
+                       stderr=subprocess.DEVNULL)
+        
+        # Wait for service to start
+        for _ in range(15):
+            time.sleep(1)
+            if ollama_client.is_up():
+                return True
+        return False
     except Exception as e:
-        return False, f"Error checking models: {str(e)}"
+        print(f"❌ Failed to start Ollama: {e}")
+        return False
 
-def setup_ollama_automatically():
+def find_supported_model(models: List[str]) -> Optional[str]:
+    """First installed model from a supported family"""
+    for family in SUPPORTED_MODEL_FAMILIES:
+        for model in models:
+            if family in model.lower():
+                return model
+    return None
+
+def pull_default_model() -> bool:
+    """Download qwen2.5:7b, printing progress from the pull stream"""
+    print("\n⏬ Downloading AI model... This may take 5-15 minutes...")
+    print("   Download speed depends on your internet connection.")
+    print("   Please wait...\n")
+    
+    last_line = ""
+    
+    def show_progress(status, completed, total):
+        nonlocal last_line
+        line = f"   {status}" + (f" {completed * 100 // total}%" if completed and total else "")
+        if line != last_line:
+            print(line)
+            last_line = line
+    
+    try:
+        ollama_client.pull('qwen2.5:7b', on_progress=show_progress)
+        print("\n✅ Model downloaded successfully!")
+        return True
+    except Exception as e:
+        print(f"\n❌ Download failed: {e}")
+    print("   You can manually run: ollama pull qwen2.5:7b")
+    return False
+
+def ask_user(question: str) -> bool:
+    """Yes/no question on the console; always 'no' when there is no terminal"""
+    if not sys.stdin or not sys.stdin.isatty():
+        return False
+    try:
+        return input(question).strip().lower() == 'y'
+    except EOFError:
+        return False
+
+class OllamaBootstrap:
     """
-    Try to set up Ollama automatically for EXE users
+    Brings up the AI in the background so the orb appears immediately. The
+    install, process, port and model probes run concurrently; when they pass,
+    the LLM is initialized and ai_mode_enabled flips on.
     """
-    print("\n" + "="*60)
-    print("🤖 JARVIS AI - Ollama Setup Assistant")
-    print("="*60)
     
-    # Check connection
-    connected, msg = check_ollama_connection()
+    def __init__(self, timeline: StartupTimeline):
+        self.timeline = timeline
+        self.finished = threading.Event()
+        self.late = False  # Voice engine stopped waiting before we finished
+        self.on_finished = None
+        self.on_late_ready = None
+        self._thread = None
+    
+    def start(self, on_finished=None, on_late_ready=None):
+        self.on_finished = on_finished
+        self.on_late_ready = on_late_ready
+        self._thread = threading.Thread(target=self._run, name="ollama-bootstrap", daemon=True)
+        self._thread.start()
     
-    if not connected:
-        print(f"\n⚠️ {msg}")
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the bootstrap; after a timeout, a later success is announced instead"""
+        if not self.finished.wait(timeout):
+            self.late = True
+            return False
+        return True
+    
+    def _run(self):
+        enabled = False
+        try:
+            enabled = self.bootstrap()
+        except Exception as e:
+            logging.error(f"Ollama bootstrap failed: {e}")
+        finally:
+            self.timeline.mark(f"AI bootstrap finished ({'AI mode' if enabled else 'basic mode'})")
+            self.finished.set()
+            self.timeline.log()
+        
+        if self.on_finished:
+            self.on_finished(enabled)
+        if enabled and self.late and self.on_late_ready:
+            self.on_late_ready()
+    
+    def _timed(self, label: str, probe):
+        start = time.perf_counter()
+        try:
+            return probe()
+        finally:
+            self.timeline.mark(f"probe {label} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    
+    def bootstrap(self) -> bool:
+        global available_models
+        
+        self.timeline.mark("AI bootstrap started")
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="ollama-probe") as pool:
+            installed = pool.submit(self._timed, "installed", is_ollama_installed)
+            running = pool.submit(self._timed, "process", is_ollama_running)
+            reachable = pool.submit(self._timed, "api", ollama_client.is_up)
+            models = pool.submit(self._timed, "models", get_ollama_models)
+        
+        if not reachable.result():
+            if not installed.result():
+                print("❌ Ollama is not installed!")
+                print("\n📥 To enable AI features, please install Ollama:")
+                print("   1. Download from: https://ollama.ai")
+                print("   2. Run the installer")
+                print("   3. Open terminal and run: ollama pull qwen2.5:7b")
+                print("   4. Restart JARVIS")
+                if ask_user("\nOpen browser to download Ollama? (y/n): "):
+                    webbrowser.open('https://ollama.ai')
+                return self.basic_mode("Ollama not installed")
+            
+            if running.result() or not start_ollama():
+                print("❌ Cannot connect to Ollama API")
+                print("\n💡 Troubleshooting steps:")
+                print("   1. Make sure Ollama is running: ollama serve")
+                print("   2. Check if port 11434 is available")
+                print("   3. Restart Ollama service")
+                return self.basic_mode("Cannot connect to Ollama")
+            self.timeline.mark("ollama serve started")
+            available_models = get_ollama_models()
+        else:
+            available_models = models.result()
+        
+        print("✅ Ollama is connected and ready!")
+        model = find_supported_model(available_models)
+        if not model:
+            print("\n📦 No suitable model found")
+            if not (ask_user("\nDownload qwen2.5:7b model (4GB)? (y/n): ") and pull_default_model()):
+                print("\n⚠️ Running without AI model")
+                print("   You can download later with: ollama pull qwen2.5:7b")
+                return self.basic_mode("No suitable model found")
+            available_models = get_ollama_models()
+        else:
+            print(f"✅ Found model: {model}")
+        
+        logging.info(f"📦 Found {len(available_models)} Ollama models: {', '.join(available_models)}")
+        if initialize_llm(preload=False) is None:
+            return self.basic_mode("AI model error")
+        self.timeline.mark(f"LLM ready ({current_model})")
+        print(f"✅ AI Model: {current_model} - Ready!")
+        
+        # Load the weights and prefill the static prompt prefix now, so the
+        # first question pays for neither
+        try:
+            warm_up_llm()
+            self.timeline.mark(f"model warmed up ({current_model})")
+        except Exception as e:
+            logging.error(f"Failed to warm up {current_model}: {e}")
+        return True
+    
+    def basic_mode(self, reason: str) -> bool:
+        print(f"\n⚠️ {reason}")
         print("\n📋 JARVIS will run in BASIC MODE")
         print("   You can still use all non-AI features:")
         print("   - File management")
@@ -192,55 +414,6 @@ def setup_ollama_automatically():
         print("   - And more...")
         print("\n💡 To enable AI features, install Ollama from https://ollama.ai")
         return False
-    
-    # Check model
-    model_exists, model_msg = check_ollama_model()
-    
-    if not model_exists:
-        print(f"\n📦 {model_msg}")
-        response = input("\nDownload qwen2.5:7b model (4GB)? (y/n): ")
-        
-        if response.lower() == 'y':
-            print("\n⏬ Downloading AI model... This may take 5-15 minutes...")
-            print("   Download speed depends on your internet connection.")
-            print("   Please wait...\n")
-            
-            try:
-                process = subprocess.Popen(['ollama', 'pull', 'qwen2.5:7b'],
-                                          stdout=subprocess.PIPE,
-                                          stderr=subprocess.STDOUT,
-                                          text=True,
-                                          creationflags=subprocess.CREATE_NO_WINDOW,
-                                          bufsize=1,
-                                          universal_newlines=True)
-                
-                # Show progress
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        print(f"   {line}")
-                
-                process.wait()
-                
-                if process.returncode == 0:
-                    print("\n✅ Model downloaded successfully!")
-                    return True
-                else:
-                    print("\n⚠️ Model download had issues")
-                    print("   You can manually run: ollama pull qwen2.5:7b")
-                    return False
-                    
-            except Exception as e:
-                print(f"\n❌ Download failed: {e}")
-                print("   You can manually run: ollama pull qwen2.5:7b")
-                return False
-        else:
-            print("\n⚠️ Running without AI model")
-            print("   You can download later with: ollama pull qwen2.5:7b")
-            return False
-    
-    print(f"\n✅ {model_msg}")
-    return True
 
 # ============================================================================
 # BASIC COMMAND HANDLER (for when AI is not available)
@@ -298,162 +471,170 @@ def create_dummy_tool(tool_name):
     """Create a dummy tool that explains it's not available"""
     @langchain_tool
     def dummy_func(*args, **kwargs) -> str:
+        """Placeholder for a tool whose module could not be loaded"""
         return f"⚠️ **{tool_name} not available**\nPlease check if the tool is properly installed in the tools directory."
     dummy_func.__name__ = tool_name
     dummy_func.name = tool_name
     return dummy_func
 
-# Load all tools with error handling
-print("🔧 Loading tools...")
-
-# Basic tools
-try:
-    from tools.time_tool import get_time
-    print("✅ time_tool loaded")
-except ImportError as e:
-    print(f"⚠️ time_tool: {e}")
-    get_time = create_dummy_tool("get_time")
+# ============================================================================
+# LAZY TOOL REGISTRY
+# ============================================================================
 
-try:
-    from tools.OCR import read_text_from_latest_image, read_text_from_image_file, ocr_to_file, read_screen_area
-    print("✅ OCR tools loaded")
-except ImportError as e:
-    print(f"⚠️ OCR: {e}")
-    read_text_from_latest_image = create_dummy_tool("read_text_from_latest_image")
-    read_text_from_image_file = create_dummy_tool("read_text_from_image_file")
-    ocr_to_file = create_dummy_tool("ocr_to_file")
-    read_screen_area = create_dummy_tool("read_screen_area")
+# Tool module -> functions it provides. Modules are only imported when one of
+# their tools is first called; names, docstrings and signatures are read from
+# the source so the agent can be built without pyautogui, mss, pytesseract...
+TOOL_MODULES = {
+    "tools.time_tool": ["get_time"],
+    "tools.OCR": ["read_text_from_latest_image", "read_text_from_image_file", "ocr_to_file", "read_screen_area"],
+    "tools.arp_scan": ["arp_scan_terminal"],
+    "tools.duckduckgo": ["duckduckgo_search_tool"],
+    "tools.matrix": ["matrix_mode"],
+    "tools.screenshot": ["take_screenshot", "screenshot_all_monitors", "annotate_screenshot", "screenshot_window"],
+    "tools.pc_control": ["open_notepad_with_context", "list_notes", "quick_note", "list_running_apps",
+                         "execute_command", "system_info", "create_file_smart", "test_note_creation"],
+    "tools.app_launcher": ["open_app", "close_app", "rescan_apps", "list_installed_apps"],
+    "tools.automation_tools": ["type_text", "press_key", "copy_to_clipboard", "paste_from_clipboard",
+                               "click_mouse", "move_mouse", "get_mouse_position", "scroll_screen",
+                               "minimize_all_windows", "switch_window", "lock_computer", "get_screen_size"],
+    "tools.file_tools": ["search_files", "organize_files", "create_zip", "extract_zip",
+                         "delete_file", "rename_file", "copy_file", "get_file_info"],
+    "tools.network_tools": ["get_network_info", "network_speed_test", "list_connections",
+                            "monitor_system_resources", "list_processes", "kill_process", "get_battery_status"],
+    "tools.media_tools": ["control_volume", "play_sound", "open_url", "take_picture",
+                          "record_audio", "text_to_speech_file", "get_clipboard_history"],
+}
 
-try:
-    from tools.arp_scan import arp_scan_terminal
-    print("✅ arp_scan loaded")
-except ImportError as e:
-    print(f"⚠️ arp_scan: {e}")
-    arp_scan_terminal = create_dummy_tool("arp_scan_terminal")
+# Annotations the tool signatures use; anything else is passed through as a string
+ANNOTATION_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
 
-try:
-    from tools.duckduckgo import duckduckgo_search_tool
-    print("✅ duckduckgo loaded")
-except ImportError as e:
-    print(f"⚠️ duckduckgo: {e}")
-    duckduckgo_search_tool = create_dummy_tool("duckduckgo_search_tool")
+@dataclass
+class ToolModuleStats:
+    declare_ms: float = 0.0
+    import_ms: Optional[float] = None
+    error: Optional[str] = None
 
-try:
-    from tools.matrix import matrix_mode
-    print("✅ matrix loaded")
-except ImportError as e:
-    print(f"⚠️ matrix: {e}")
-    matrix_mode = create_dummy_tool("matrix_mode")
+class LazyToolRegistry:
+    """Declares tools from their source and imports each module on first use"""
+    
+    def __init__(self, base_dir: str = os.path.dirname(os.path.abspath(__file__))):
+        self.base_dir = base_dir
+        self.tools: Dict[str, StructuredTool] = {}
+        self.stats: Dict[str, ToolModuleStats] = {}
+        self._modules = {}
+        self._lock = threading.Lock()
+    
+    def declare(self, module_name: str, function_names: List[str]) -> List[StructuredTool]:
+        start = time.perf_counter()
+        stats = self.stats.setdefault(module_name, ToolModuleStats())
+        path = os.path.join(self.base_dir, *module_name.split(".")) + ".py"
+        
+        try:
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+            definitions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+        except (OSError, SyntaxError) as e:
+            stats.error = str(e)
+            definitions = {}
+        
+        declared = []
+        for function_name in function_names:
+            node = definitions.get(function_name)
+            proxy = self._make_proxy(module_name, node) if node else None
+            if proxy is None:
+                proxy = create_dummy_tool(function_name)
+            self.tools[function_name] = proxy
+            declared.append(proxy)
+        
+        stats.declare_ms = (time.perf_counter() - start) * 1000
+        return declared
+    
+    def _make_proxy(self, module_name: str, node: ast.FunctionDef) -> Optional[StructuredTool]:
+        decorator = next((d for d in node.decorator_list
+                          if (isinstance(d, ast.Call) and getattr(d.func, "id", None) == "tool")
+                          or getattr(d, "id", None) == "tool"), None)
+        if decorator is None:
+            return None
+        
+        # @tool("name", return_direct=True) or bare @tool, as in the tool modules
+        tool_name, return_direct = node.name, False
+        if isinstance(decorator, ast.Call):
+            if decorator.args and isinstance(decorator.args[0], ast.Constant):
+                tool_name = decorator.args[0].value
+            for keyword in decorator.keywords:
+                if keyword.arg == "return_direct":
+                    return_direct = bool(ast.literal_eval(keyword.value))
+        
+        fields = {}
+        args = node.args.args
+        defaults = [None] * (len(args) - len(node.args.defaults)) + node.args.defaults
+        for arg, default in zip(args, defaults):
+            annotation = ast.unparse(arg.annotation) if arg.annotation else "str"
+            field_type = ANNOTATION_TYPES.get(annotation.replace("Optional[", "").rstrip("]"), str)
+            fields[arg.arg] = (field_type, ... if default is None else ast.literal_eval(default))
+        
+        function_name = node.name
+        
+        def invoke(**kwargs) -> str:
+            real_tool = self.resolve(module_name, function_name)
+            return tool_runtime.run(tool_name, lambda: real_tool.invoke(kwargs), kwargs)
+        
+        return StructuredTool.from_function(
+            func=invoke,
+            name=tool_name,
+            description=(ast.get_docstring(node) or tool_name).strip(),
+            args_schema=create_model(f"{function_name}_args", **fields),
+            return_direct=return_direct,
+        )
+    
+    def resolve(self, module_name: str, function_name: str):
+        """The real tool, importing its module the first time it is needed"""
+        with self._lock:
+            if module_name not in self._modules:
+                self._modules[module_name] = self._import(module_name)
+            module = self._modules[module_name]
+        
+        real_tool = getattr(module, function_name, None) if module else None
+        if real_tool is None:
+            return create_dummy_tool(function_name)
+        return real_tool
+    
+    def _import(self, module_name: str):
+        stats = self.stats.setdefault(module_name, ToolModuleStats())
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+            print(f"✅ {module_name.split('.')[-1]} loaded on first use")
+            return module
+        except Exception as e:
+            # Not only ImportError: a module failing at import time must not take the tool call down
+            stats.error = str(e)
+            print(f"⚠️ {module_name.split('.')[-1]}: {e}")
+            logging.error(f"Failed to load tool module {module_name}: {e}")
+            return None
+        finally:
+            stats.import_ms = (time.perf_counter() - start) * 1000
+    
+    def load_all(self):
+        """Import every module now (used for the startup report)"""
+        for module_name, function_names in TOOL_MODULES.items():
+            self.resolve(module_name, function_names[0])
+    
+    def report(self) -> str:
+        lines = [f"{'module':<28}{'declare':>10}{'import':>10}  status"]
+        for module_name, stats in self.stats.items():
+            import_ms = f"{stats.import_ms:.1f}" if stats.import_ms is not None else "-"
+            status = f"⚠️ {stats.error}" if stats.error else ("loaded" if stats.import_ms is not None else "lazy")
+            lines.append(f"{module_name:<28}{stats.declare_ms:>10.1f}{import_ms:>10}  {status}")
+        return "\n".join(lines)
 
-try:
-    from tools.screenshot import take_screenshot, screenshot_all_monitors, annotate_screenshot, screenshot_window
-    print("✅ screenshot tools loaded")
-except ImportError as e:
-    print(f"⚠️ screenshot: {e}")
-    take_screenshot = create_dummy_tool("take_screenshot")
-    screenshot_all_monitors = create_dummy_tool("screenshot_all_monitors")
-    annotate_screenshot = create_dummy_tool("annotate_screenshot")
-    screenshot_window = create_dummy_tool("screenshot_window")
-
-# PC Control tools
-try:
-    from tools.pc_control import (
-        open_notepad_with_context, list_notes, quick_note,
-        list_running_apps, execute_command,
-        system_info, create_file_smart, test_note_creation
-    )
-    # Import new app launcher tools
-    from tools.app_launcher import open_app, close_app, rescan_apps, list_installed_apps
-    print("✅ pc_control tools loaded")
-except ImportError as e:
-    print(f"⚠️ pc_control: {e}")
-    open_notepad_with_context = create_dummy_tool("open_notepad_with_context")
-    list_notes = create_dummy_tool("list_notes")
-    quick_note = create_dummy_tool("quick_note")
-    open_app = create_dummy_tool("open_app")
-    close_app = create_dummy_tool("close_app")
-    list_running_apps = create_dummy_tool("list_running_apps")
-    execute_command = create_dummy_tool("execute_command")
-    system_info = create_dummy_tool("system_info")
-    create_file_smart = create_dummy_tool("create_file_smart")
-    test_note_creation = create_dummy_tool("test_note_creation")
-    rescan_apps = create_dummy_tool("rescan_apps")
-    list_installed_apps = create_dummy_tool("list_installed_apps")
-
-# Automation tools
-try:
-    from tools.automation_tools import (
-        type_text, press_key, copy_to_clipboard, paste_from_clipboard,
-        click_mouse, move_mouse, get_mouse_position, scroll_screen,
-        minimize_all_windows, switch_window, lock_computer, get_screen_size
-    )
-    print("✅ automation_tools loaded")
-except ImportError as e:
-    print(f"⚠️ automation_tools: {e}")
-    type_text = create_dummy_tool("type_text")
-    press_key = create_dummy_tool("press_key")
-    copy_to_clipboard = create_dummy_tool("copy_to_clipboard")
-    paste_from_clipboard = create_dummy_tool("paste_from_clipboard")
-    click_mouse = create_dummy_tool("click_mouse")
-    move_mouse = create_dummy_tool("move_mouse")
-    get_mouse_position = create_dummy_tool("get_mouse_position")
-    scroll_screen = create_dummy_tool("scroll_screen")
-    minimize_all_windows = create_dummy_tool("minimize_all_windows")
-    switch_window = create_dummy_tool("switch_window")
-    lock_computer = create_dummy_tool("lock_computer")
-    get_screen_size = create_dummy_tool("get_screen_size")
-
-# File management tools
-try:
-    from tools.file_tools import (
-        search_files, organize_files, create_zip, extract_zip,
-        delete_file, rename_file, copy_file, get_file_info
-    )
-    print("✅ file_tools loaded")
-except ImportError as e:
-    print(f"⚠️ file_tools: {e}")
-    search_files = create_dummy_tool("search_files")
-    organize_files = create_dummy_tool("organize_files")
-    create_zip = create_dummy_tool("create_zip")
-    extract_zip = create_dummy_tool("extract_zip")
-    delete_file = create_dummy_tool("delete_file")
-    rename_file = create_dummy_tool("rename_file")
-    copy_file = create_dummy_tool("copy_file")
-    get_file_info = create_dummy_tool("get_file_info")
-
-# Network and system monitoring tools
-try:
-    from tools.network_tools import (
-        get_network_info, network_speed_test, list_connections,
-        monitor_system_resources, list_processes, kill_process, get_battery_status
-    )
-    print("✅ network_tools loaded")
-except ImportError as e:
-    print(f"⚠️ network_tools: {e}")
-    get_network_info = create_dummy_tool("get_network_info")
-    network_speed_test = create_dummy_tool("network_speed_test")
-    list_connections = create_dummy_tool("list_connections")
-    monitor_system_resources = create_dummy_tool("monitor_system_resources")
-    list_processes = create_dummy_tool("list_processes")
-    kill_process = create_dummy_tool("kill_process")
-    get_battery_status = create_dummy_tool("get_battery_status")
-
-# Media tools
-try:
-    from tools.media_tools import (
-        control_volume, play_sound, open_url, take_picture,
-        record_audio, text_to_speech_file, get_clipboard_history
-    )
-    print("✅ media_tools loaded")
-except ImportError as e:
-    print(f"⚠️ media_tools: {e}")
-    control_volume = create_dummy_tool("control_volume")
-    play_sound = create_dummy_tool("play_sound")
-    open_url = create_dummy_tool("open_url")
-    take_picture = create_dummy_tool("take_picture")
-    record_audio = create_dummy_tool("record_audio")
-    text_to_speech_file = create_dummy_tool("text_to_speech_file")
-    get_clipboard_history = create_dummy_tool("get_clipboard_history")
+# Declare all tools; nothing from the tool modules is imported yet
+print("🔧 Loading tools...")
+tool_registry = LazyToolRegistry()
+for _module_name, _function_names in TOOL_MODULES.items():
+    tool_registry.declare(_module_name, _function_names)
+    print(f"✅ {_module_name.split('.')[-1]} declared ({tool_registry.stats[_module_name].declare_ms:.1f} ms)")
+startup_timeline.mark(f"{len(tool_registry.tools)} tools declared")
 
 load_dotenv()
 
@@ -462,13 +643,17 @@ TRIGGER_WORD = "jarvis"
 CONVERSATION_TIMEOUT = 30
 MEMORY_FILE = "jarvis_memory.json"
 CHAT_HISTORY_FILE = "chat_sessions.json"
+CHAT_JOURNAL_FILE = "chat_sessions.journal"
+CHAT_DATABASE_FILE = "chat_sessions.db"
+CHAT_INDEX_FILE = "chat_sessions.index.json"
+RESPONSE_CACHE_FILE = "response_cache.json"
+TRACE_FILE = "turn_traces.jsonl"
+VOSK_MODEL_PATH = os.path.join("models", "vosk-model-small-en-us-0.15")
+WAKE_WORD_FILE = "wake_word_templates.json"
+NOISE_PROFILE_FILE = "noise_profiles.json"
 SETTINGS_FILE = "jarvis_settings.json"
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-# Speech control flags
-speech_active = True
-speech_paused = False
-
 # Default settings
 DEFAULT_SETTINGS = {
     "voice_rate": 180,
@@ -479,7 +664,30 @@ DEFAULT_SETTINGS = {
     "orb_color": [0, 150, 255],  # RGB
     "glow_color": [100, 200, 255],  # RGB
     "ai_model": "qwen2.5:7b",
-    "conversation_timeout": 30
+    "conversation_timeout": 30,
+    "memory_backend": "json",  # "json" (snapshot + journal) or "sqlite"
+    "lazy_session_loading": False,  # Load session headers only, bodies on demand
+    "history_token_budget": 2000,  # Max tokens of chat history sent with each prompt
+    "context_window": 8192,  # Default num_ctx for Ollama models (tool schemas alone are ~4k tokens)
+    "model_context_windows": {},  # Per-model overrides, e.g. {"llama3.1": 16384}
+    "chat_scrollback": 2000,  # Messages kept in the chat window (0 = unlimited)
+    "ollama_keep_alive": "30m",  # How long Ollama keeps the active model in memory
+    "tool_routing": True,  # Bind only the tool group (profile) relevant to each request
+    "fast_path_intents": True,  # Run simple, unambiguous commands without the LLM
+    "response_cache": True,  # Reuse answers to repeated tool-free questions
+    "response_cache_ttl": 86400,  # Seconds a cached answer stays valid
+    "response_cache_size": 256,  # Answers kept before the least recently used is evicted
+    "concurrent_tool_calls": True,  # Run the tool calls of one model step at the same time
+    "tool_workers": 4,  # Threads available to concurrently running tools
+    "tool_timeout": 30,  # Seconds a tool may run before it is stopped
+    "tool_budgets": {},  # Per-tool overrides, e.g. {"execute_command": 60}
+    "trace_buffer_size": 500,  # Turns kept in memory for the latency dashboard
+    "trace_log": False,  # Also append every finished turn to turn_traces.jsonl
+    "speech_backend": "auto",  # "auto" (Vosk if installed, else Google), "vosk" or "google"
+    "vosk_model_path": VOSK_MODEL_PATH,  # Unpacked model from https://alphacephei.com/vosk/models
+    "wake_word_gate": True,  # Only recognize phrases that start with the wake word (needs Vosk or training)
+    "wake_word_sensitivity": 1.0,  # Template matcher threshold scale; higher accepts more
+    "barge_in": True  # Speaking over JARVIS stops its speech and takes the turn
 }
 
 class SettingsManager:
@@ -519,6 +727,22 @@ class SettingsManager:
 # Initialize settings manager
 settings_manager = SettingsManager()
 
+# Seconds each slow tool may run before it is stopped (everything else gets tool_timeout)
+TOOL_BUDGETS = {
+    "execute_command": 20,  # Its process is killed at 18 s, so a timeout is reported as one
+    "network_speed_test": 15,
+    "record_audio": lambda arguments: int(arguments.get("duration") or 5) + 10,
+    "rescan_apps": 60,
+    "open_app": 30,  # The first call may scan for installed apps
+    "arp_scan_terminal": 30,
+    "duckduckgo_search": 15,
+    "get_network_info": 10,
+}
+# Twice the agent's tool workers, so a few abandoned calls don't starve new ones
+tool_runtime = ToolRuntime(settings_manager.get('tool_timeout', 30),
+                           {**TOOL_BUDGETS, **settings_manager.get('tool_budgets', {})},
+                           max_workers=2 * settings_manager.get('tool_workers', 4))
+
 print(f"\n{'='*60}")
 print(f"🚀 JARVIS AI - ADVANCED HYPERREALISTIC ASSISTANT")
 print(f"{'='*60}\n")
@@ -535,6 +759,10 @@ class ConversationMemory:
     messages: List[Dict[str, str]]
     summary: str = ""
     tags: List[str] = None
+    message_count: int = 0  # Only meaningful while messages is None (not loaded yet)
+    
+    def get_message_count(self) -> int:
+        return len(self.messages) if self.messages is not None else self.message_count
     
     def to_dict(self):
         return {
@@ -552,18 +780,588 @@ class ConversationMemory:
             session_id=data["session_id"],
             timestamp=data["timestamp"],
             title=data["title"],
-            messages=data["messages"],
+            messages=data.get("messages", []),
             summary=data.get("summary", ""),
             tags=data.get("tags", [])
         )
 
+class JournaledConversationStore:
+    """
+    Conversation storage made of a JSON snapshot plus an append-only journal.
+    Each message costs one appended line; the snapshot is only rewritten on
+    compaction, after which the journal is truncated.
+    
+    The snapshot holds one conversation per line and a sidecar index records
+    each line's byte range, so in lazy mode only headers are read at startup
+    and a session's messages are parsed from its own line when it is opened.
+    """
+    
+    def __init__(self, snapshot_file: str = CHAT_HISTORY_FILE,
+                 journal_file: str = CHAT_JOURNAL_FILE, index_file: str = CHAT_INDEX_FILE,
+                 compact_every: int = 500, lazy: bool = False):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.index_file = index_file
+        self.compact_every = compact_every
+        self.supports_lazy_loading = lazy
+        self.pending_records = 0
+        self.sequence = 0
+        self._journal = None
+        self._index: Dict[str, Dict] = {}  # session_id -> byte range in snapshot
+        self._tail: Dict[str, List[Dict]] = {}  # Journaled messages of unloaded sessions
+        self._lock = threading.Lock()
+    
+    @property
+    def needs_compaction(self) -> bool:
+        return self.pending_records >= self.compact_every
+    
+    def load_all(self) -> Dict[str, ConversationMemory]:
+        """Load the snapshot and replay any journal records written after it"""
+        conversations = {}
+        snapshot_sequence = 0
+        
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            snapshot_sequence = data.get("journal_sequence", 0)
+            for conv_data in data.get("conversations", []):
+                conv = ConversationMemory.from_dict(conv_data)
+                conversations[conv.session_id] = conv
+        
+        self.sequence = snapshot_sequence
+        self._index = {}
+        self._tail = {}
+        self.pending_records = self._replay(conversations, snapshot_sequence)
+        return conversations
+    
+    def load_headers(self) -> Dict[str, ConversationMemory]:
+        """Load session headers from the index; falls back to load_all() if it is stale"""
+        index = self._read_index()
+        if index is None:
+            logging.info("Session index missing or stale, loading full history")
+            conversations = self.load_all()
+            # Count the missing index as pending work so the next auto-save writes it
+            self.pending_records += 1
+            return conversations
+        
+        conversations = {}
+        for session_id, entry in index["sessions"].items():
+            conversations[session_id] = ConversationMemory(
+                session_id=session_id,
+                timestamp=entry["timestamp"],
+                title=entry["title"],
+                messages=None,  # Loaded on demand
+                summary=entry.get("summary", ""),
+                tags=entry.get("tags", []),
+                message_count=entry["message_count"]
+            )
+        
+        self.sequence = index.get("journal_sequence", 0)
+        self._index = index["sessions"]
+        self._tail = {}
+        self.pending_records = self._replay(conversations, self.sequence)
+        return conversations
+    
+    def _read_index(self) -> Optional[Dict]:
+        if not (os.path.exists(self.index_file) and os.path.exists(self.snapshot_file)):
+            return None
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            stat = os.stat(self.snapshot_file)
+            if index.get("snapshot_size") != stat.st_size or index.get("snapshot_mtime_ns") != stat.st_mtime_ns:
+                return None
+            return index
+        except Exception as e:
+            logging.warning(f"Could not read session index: {e}")
+            return None
+    
+    def load_messages(self, session_id: str) -> List[Dict[str, str]]:
+        """Parse one session's messages from its snapshot line plus journaled tail"""
+        with self._lock:
+            return self._load_messages_unlocked(session_id)
+    
+    def _load_messages_unlocked(self, session_id: str) -> List[Dict[str, str]]:
+        messages = []
+        entry = self._index.get(session_id)
+        if entry:
+            with open(self.snapshot_file, 'rb') as f:
+                f.seek(entry["offset"])
+                messages = json.loads(f.read(entry["length"]).decode('utf-8'))["messages"]
+        return messages + self._tail.get(session_id, [])
+    
+    def _replay(self, conversations: Dict[str, ConversationMemory], after_sequence: int) -> int:
+        if not os.path.exists(self.journal_file):
+            return 0
+        
+        replayed = 0
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write after a crash - everything before it is intact
+                    logging.warning(f"Skipping unreadable journal record at line {line_no}")
+                    continue
+                
+                # Records already folded into the snapshot are skipped, so a crash
+                # between writing the snapshot and truncating the journal is harmless
+                sequence = record.get("seq", 0)
+                if sequence <= after_sequence:
+                    continue
+                
+                self._apply(conversations, record)
+                self.sequence = max(self.sequence, sequence)
+                replayed += 1
+        
+        if replayed:
+            logging.info(f"🧾 Replayed {replayed} journal record(s)")
+        return replayed
+    
+    def _apply(self, conversations: Dict[str, ConversationMemory], record: Dict):
+        op = record.get("op")
+        if op == "session":
+            header = record["session"]
+            conv = conversations.get(header["session_id"])
+            if conv:
+                conv.title = header.get("title", conv.title)
+                conv.summary = header.get("summary", conv.summary)
+                conv.tags = header.get("tags", conv.tags)
+            else:
+                conversations[header["session_id"]] = ConversationMemory.from_dict(header)
+        elif op == "message":
+            conv = conversations.get(record["session_id"])
+            if conv and conv.messages is None:
+                self._tail.setdefault(conv.session_id, []).append(record["message"])
+                conv.message_count += 1
+            elif conv:
+                conv.messages.append(record["message"])
+        elif op == "delete":
+            conversations.pop(record["session_id"], None)
+    
+    def _append(self, record: Dict):
+        with self._lock:
+            self.sequence += 1
+            record["seq"] = self.sequence
+            if self._journal is None:
+                self._journal = self._open_journal()
+            self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self.pending_records += 1
+    
+    def _open_journal(self):
+        # Start on a fresh line if the last write was torn by a crash
+        needs_newline = False
+        if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        
+        journal = open(self.journal_file, 'a', encoding='utf-8')
+        if needs_newline:
+            journal.write("\n")
+        return journal
+    
+    def save_session(self, conversation: ConversationMemory):
+        """Journal the session header (title, summary, tags) without its messages"""
+        header = conversation.to_dict()
+        header.pop("messages")
+        self._append({"op": "session", "session": header})
+    
+    def append_message(self, session_id: str, message: Dict[str, str]):
+        self._append({"op": "message", "session_id": session_id, "message": message})
+    
+    def delete_session(self, session_id: str):
+        self._append({"op": "delete", "session_id": session_id})
+    
+    def compact(self, conversations: Dict[str, ConversationMemory]):
+        """Write a fresh snapshot and index atomically, then truncate the journal"""
+        with self._lock:
+            prefix = json.dumps({
+                "last_updated": datetime.now().isoformat(),
+                "journal_sequence": self.sequence
+            })[:-1] + ', "conversations": [\n'
+            
+            index_sessions = {}
+            temp_file = self.snapshot_file + ".tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(prefix.encode('utf-8'))
+                offset = len(prefix.encode('utf-8'))
+                
+                for position, conv in enumerate(conversations.values()):
+                    data = conv.to_dict()
+                    if conv.messages is None:
+                        data["messages"] = self._load_messages_unlocked(conv.session_id)
+                    line = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                    separator = b",\n" if position < len(conversations) - 1 else b"\n"
+                    f.write(line + separator)
+                    
+                    index_sessions[conv.session_id] = {
+                        "offset": offset,
+                        "length": len(line),
+                        "timestamp": conv.timestamp,
+                        "title": conv.title,
+                        "summary": conv.summary,
+                        "tags": conv.tags or [],
+                        "message_count": len(data["messages"])
+                    }
+                    offset += len(line) + len(separator)
+                
+                f.write(b"]}\n")
+            os.replace(temp_file, self.snapshot_file)
+            
+            stat = os.stat(self.snapshot_file)
+            index = {
+                "snapshot_size": stat.st_size,
+                "snapshot_mtime_ns": stat.st_mtime_ns,
+                "journal_sequence": self.sequence,
+                "sessions": index_sessions
+            }
+            with open(self.index_file + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(self.index_file + ".tmp", self.index_file)
+            self._index = index_sessions
+            self._tail = {}
+            
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_file, 'w', encoding='utf-8')
+            self.pending_records = 0
+    
+    def clear(self):
+        self.compact({})
+
+class SQLiteConversationStore:
+    """
+    SQLite conversation storage. Sessions and messages live in separate tables
+    so session headers can be listed without touching message bodies, and an
+    FTS5 index over message content backs search_messages().
+    """
+    supports_lazy_loading = True
+    pending_records = 0
+    needs_compaction = False
+    
+    def __init__(self, db_file: str = CHAT_DATABASE_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self.has_fts = False
+        self._create_schema()
+    
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT NOT NULL DEFAULT '',
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    message_count INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions(timestamp DESC);
+                
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+                
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+            
+            try:
+                self._conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+                        USING fts5(content, content='messages', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    END;
+                """)
+                self.has_fts = True
+            except sqlite3.OperationalError as e:
+                logging.warning(f"FTS5 not available, search will use LIKE: {e}")
+    
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is None
+    
+    def import_completed(self) -> bool:
+        """Whether the JSON history has been migrated in full"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_import'").fetchone() is not None
+    
+    @staticmethod
+    def _header_from_row(row) -> ConversationMemory:
+        return ConversationMemory(
+            session_id=row["session_id"],
+            timestamp=row["timestamp"],
+            title=row["title"],
+            messages=None,  # Loaded on demand
+            summary=row["summary"],
+            tags=json.loads(row["tags"] or "[]"),
+            message_count=row["message_count"]
+        )
+    
+    def load_headers(self) -> Dict[str, ConversationMemory]:
+        """Load every session header without any message bodies"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, timestamp, title, summary, tags, message_count FROM sessions"
+            ).fetchall()
+        return {row["session_id"]: self._header_from_row(row) for row in rows}
+    
+    def load_messages(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, title, timestamp, message_count, summary FROM sessions "
+                "ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [{
+            "id": row["session_id"],
+            "title": row["title"],
+            "timestamp": row["timestamp"],
+            "message_count": row["message_count"],
+            "summary": row["summary"]
+        } for row in rows]
+    
+    def search_messages(self, query: str, limit: int = 50) -> List[Dict]:
+        terms = query.split()
+        if not terms:
+            return []
+        
+        with self._lock:
+            if self.has_fts:
+                # Quote each term so user input can't be parsed as FTS syntax
+                match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+                rows = self._conn.execute(
+                    "SELECT m.session_id, s.title, m.role, m.timestamp, "
+                    "snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet "
+                    "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                    "JOIN sessions s ON s.session_id = m.session_id "
+                    "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT m.session_id, s.title, m.role, m.timestamp, m.content AS snippet "
+                    "FROM messages m JOIN sessions s ON s.session_id = m.session_id "
+                    "WHERE m.content LIKE ? ORDER BY m.id DESC LIMIT ?",
+                    (f"%{query}%", limit)
+                ).fetchall()
+        
+        return [{
+            "session_id": row["session_id"],
+            "title": row["title"],
+            "role": row["role"],
+            "timestamp": row["timestamp"],
+            "snippet": row["snippet"]
+        } for row in rows]
+    
+    def save_session(self, conversation: ConversationMemory):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, timestamp, title, summary, tags) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET title = excluded.title, "
+                "summary = excluded.summary, tags = excluded.tags",
+                (conversation.session_id, conversation.timestamp, conversation.title,
+                 conversation.summary, json.dumps(conversation.tags or []))
+            )
+    
+    def append_message(self, session_id: str, message: Dict[str, str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (session_id, message["role"], message["content"], message.get("timestamp"))
+            )
+            self._conn.execute(
+                "UPDATE sessions SET message_count = message_count + 1 WHERE session_id = ?",
+                (session_id,)
+            )
+    
+    def delete_session(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+    
+    def import_conversations(self, conversations: Dict[str, ConversationMemory]):
+        """
+        One-time migration from the JSON store, in a single transaction that
+        also records its completion. Sessions already holding messages are
+        kept, so an import cut short by an older version is finished rather
+        than duplicated.
+        """
+        imported = 0
+        with self._lock, self._conn:
+            existing = {row["session_id"]: row["message_count"] for row in
+                        self._conn.execute("SELECT session_id, message_count FROM sessions")}
+            for conv in conversations.values():
+                if existing.get(conv.session_id):
+                    continue
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (conv.session_id,))
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, timestamp, title, summary, tags, message_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (conv.session_id, conv.timestamp, conv.title, conv.summary,
+                     json.dumps(conv.tags or []), len(conv.messages))
+                )
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                    [(conv.session_id, m["role"], m["content"], m.get("timestamp")) for m in conv.messages]
+                )
+                imported += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_import', ?)",
+                (datetime.now().isoformat(),)
+            )
+        logging.info(f"📥 Imported {imported} conversation(s) into {self.db_file}")
+    
+    def compact(self, conversations: Dict[str, ConversationMemory]):
+        """Messages are committed as they arrive; only sync session headers"""
+        for conv in conversations.values():
+            self.save_session(conv)
+    
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for context budgeting"""
+    return max(1, len(text) // 4)
+
+class SessionChatHistory(BaseChatMessageHistory):
+    """
+    LangChain view of one session. AdvancedMemoryManager.add_message appends to
+    it as messages arrive, so it is built once per session instead of per turn.
+    `messages` returns only the newest messages that fit in token_budget.
+    """
+    
+    def __init__(self, token_budget: int = 2000):
+        self.token_budget = token_budget
+        self._all: List[BaseMessage] = []
+        self._tokens: List[int] = []
+        self._window_start = 0
+        self._window_tokens = 0
+    
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self._all[self._window_start:]
+    
+    @property
+    def window_tokens(self) -> int:
+        return self._window_tokens
+    
+    @property
+    def evicted_count(self) -> int:
+        """Number of older messages that no longer fit in the window"""
+        return self._window_start
+    
+    def messages_between(self, start: int, end: int) -> List[BaseMessage]:
+        return self._all[start:end]
+    
+    def append(self, role: str, content: str):
+        if role == "user":
+            message = HumanMessage(content=content)
+        elif role == "assistant":
+            message = AIMessage(content=content)
+        else:
+            return
+        
+        tokens = estimate_tokens(content)
+        self._all.append(message)
+        self._tokens.append(tokens)
+        self._window_tokens += tokens
+        self._trim()
+    
+    def _trim(self):
+        # Always keep at least the newest message, even if it alone exceeds the budget
+        while self._window_tokens > self.token_budget and self._window_start < len(self._all) - 1:
+            self._window_tokens -= self._tokens[self._window_start]
+            self._window_start += 1
+    
+    def set_token_budget(self, token_budget: int):
+        self.token_budget = token_budget
+        # A larger budget pulls older messages back into the window
+        while (self._window_start > 0 and
+               self._window_tokens + self._tokens[self._window_start - 1] <= token_budget):
+            self._window_start -= 1
+            self._window_tokens += self._tokens[self._window_start]
+        self._trim()
+    
+    def add_message(self, message: BaseMessage) -> None:
+        # Writes go through AdvancedMemoryManager.add_message; ignoring LangChain's
+        # own writes keeps every message from being stored twice
+        pass
+    
+    def clear(self) -> None:
+        self._all.clear()
+        self._tokens.clear()
+        self._window_start = 0
+        self._window_tokens = 0
+
 class AdvancedMemoryManager:
     def __init__(self):
         self.conversations: Dict[str, ConversationMemory] = {}
         self.current_session: Optional[ConversationMemory] = None
+        self._histories: Dict[str, SessionChatHistory] = {}
+        self._lock = threading.RLock()  # Commands run on worker threads concurrently
+        self.store = self._create_store()
         self.load_all_conversations()
     
+    def _create_store(self):
+        """Pick the storage backend configured in settings"""
+        if settings_manager.get('memory_backend', 'json') == 'sqlite':
+            try:
+                store = SQLiteConversationStore()
+                if not store.import_completed() and (os.path.exists(CHAT_HISTORY_FILE) or os.path.exists(CHAT_JOURNAL_FILE)):
+                    store.import_conversations(JournaledConversationStore().load_all())
+                logging.info("🗄️ Using SQLite conversation store")
+                return store
+            except Exception as e:
+                logging.error(f"SQLite store unavailable, falling back to JSON: {e}")
+        return JournaledConversationStore(lazy=settings_manager.get('lazy_session_loading', False))
+    
+    def _ensure_messages(self, conversation: ConversationMemory):
+        """Pull message bodies for a header-only session"""
+        if conversation.messages is None:
+            conversation.messages = self.store.load_messages(conversation.session_id)
+    
     def create_session(self, initial_message: str = "") -> str:
+        with self._lock:
+            return self._create_session(initial_message)
+    
+    def ensure_session(self, initial_message: str = "") -> str:
+        """Current session id, starting a new session if there is none"""
+        with self._lock:
+            if self.current_session:
+                return self.current_session.session_id
+            return self._create_session(initial_message)
+    
+    def _create_session(self, initial_message: str) -> str:
         session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         title = initial_message[:50] + "..." if len(initial_message) > 50 else initial_message or "New Chat"
         
@@ -573,31 +1371,49 @@ class AdvancedMemoryManager:
             title=title,
             messages=[]
         )
+        self.save_conversation(self.current_session)
         
         if initial_message:
-            self.add_message("user", initial_message)
+            self._add_message("user", initial_message)
         
-        self.save_conversation(self.current_session)
         return session_id
     
     def load_session(self, session_id: str) -> bool:
-        if session_id in self.conversations:
-            self.current_session = self.conversations[session_id]
-            return True
-        return False
+        with self._lock:
+            if session_id in self.conversations:
+                self.current_session = self.conversations[session_id]
+                self._ensure_messages(self.current_session)
+                return True
+            return False
     
     def add_message(self, role: str, content: str):
+        with self._lock:
+            self._add_message(role, content)
+    
+    def _add_message(self, role: str, content: str):
         if self.current_session:
-            self.current_session.messages.append({
+            message = {
                 "role": role,
                 "content": content,
                 "timestamp": datetime.now().isoformat()
-            })
+            }
+            self.current_session.messages.append(message)
             
-            if self.current_session.title == "New Chat" and role == "user" and len(content) > 10:
-                self.current_session.title = content[:30] + "..."
+            history = self._histories.get(self.current_session.session_id)
+            if history:
+                history.append(role, content)
             
-            self.save_conversation(self.current_session)
+            try:
+                self.store.append_message(self.current_session.session_id, message)
+                
+                if self.current_session.title == "New Chat" and role == "user" and len(content) > 10:
+                    self.current_session.title = content[:30] + "..."
+                    self.store.save_session(self.current_session)
+            except Exception as e:
+                logging.error(f"Failed to journal message: {e}")
+            
+            if self.store.needs_compaction:
+                self.save_all_conversations()
     
     def get_recent_messages(self, limit: int = 10) -> List[Dict]:
         if not self.current_session:
@@ -606,33 +1422,54 @@ class AdvancedMemoryManager:
     
     def save_conversation(self, conversation: ConversationMemory):
         self.conversations[conversation.session_id] = conversation
-        self.save_all_conversations()
+        try:
+            self.store.save_session(conversation)
+        except Exception as e:
+            logging.error(f"Failed to journal session: {e}")
+    
+    def set_summary(self, conversation: ConversationMemory, summary: str) -> bool:
+        """Store a background summary, unless the session was deleted meanwhile"""
+        with self._lock:
+            if self.conversations.get(conversation.session_id) is not conversation:
+                return False
+            conversation.summary = summary
+            self.save_conversation(conversation)
+            return True
     
     def save_all_conversations(self):
+        """Compact the journal into a full snapshot of every conversation"""
         try:
-            data = {
-                "conversations": [conv.to_dict() for conv in self.conversations.values()],
-                "last_updated": datetime.now().isoformat()
-            }
-            
-            with open(CHAT_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
+            with self._lock:
+                self.store.compact(self.conversations)
             logging.info(f"💾 Saved {len(self.conversations)} conversations")
         except Exception as e:
             logging.error(f"Failed to save conversations: {e}")
     
+    def get_memory_usage(self) -> Dict:
+        """Rough size of the conversation history currently held in memory"""
+        loaded = [conv for conv in self.conversations.values() if conv.messages is not None]
+        message_bytes = sum(
+            sys.getsizeof(msg) + sum(sys.getsizeof(v) for v in msg.values())
+            for conv in loaded for msg in conv.messages
+        )
+        return {
+            "sessions": len(self.conversations),
+            "loaded_sessions": len(loaded),
+            "loaded_messages": sum(len(conv.messages) for conv in loaded),
+            "message_bytes": message_bytes
+        }
+    
+    def has_unsaved_changes(self) -> bool:
+        return self.store.pending_records > 0
+    
     def load_all_conversations(self):
         try:
-            if os.path.exists(CHAT_HISTORY_FILE):
-                with open(CHAT_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                self.conversations = {}
-                for conv_data in data.get("conversations", []):
-                    conv = ConversationMemory.from_dict(conv_data)
-                    self.conversations[conv.session_id] = conv
-                
+            if self.store.supports_lazy_loading:
+                self.conversations = self.store.load_headers()
+            else:
+                self.conversations = self.store.load_all()
+            
+            if self.conversations:
                 logging.info(f"📂 Loaded {len(self.conversations)} conversation(s)")
             else:
                 logging.info("No existing conversations found")
@@ -641,47 +1478,94 @@ class AdvancedMemoryManager:
             self.conversations = {}
     
     def delete_session(self, session_id: str):
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-            if self.current_session and self.current_session.session_id == session_id:
-                self.current_session = None
-            self.save_all_conversations()
-            return True
-        return False
+        with self._lock:
+            if session_id in self.conversations:
+                del self.conversations[session_id]
+                self._histories.pop(session_id, None)
+                if self.current_session and self.current_session.session_id == session_id:
+                    self.current_session = None
+                try:
+                    self.store.delete_session(session_id)
+                except Exception as e:
+                    logging.error(f"Failed to journal session delete: {e}")
+                return True
+            return False
+    
+    def clear_all_sessions(self):
+        with self._lock:
+            self.conversations.clear()
+            self._histories.clear()
+            self.current_session = None
+            try:
+                self.store.clear()
+            except Exception as e:
+                logging.error(f"Failed to clear conversations: {e}")
     
-    def get_session_list(self) -> List[Dict]:
+    def get_session_list(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Sessions newest first; pass offset/limit to page through them"""
+        if hasattr(self.store, "list_sessions"):
+            return self.store.list_sessions(offset, limit)
+        
         sessions = []
         for conv in self.conversations.values():
             sessions.append({
                 "id": conv.session_id,
                 "title": conv.title,
                 "timestamp": conv.timestamp,
-                "message_count": len(conv.messages),
+                "message_count": conv.get_message_count(),
                 "summary": conv.summary
             })
         
         sessions.sort(key=lambda x: x["timestamp"], reverse=True)
-        return sessions
+        end = None if limit is None else offset + limit
+        return sessions[offset:end]
     
-    def get_message_history(self, session_id: str):
-        """Get message history for LangChain integration"""
-        from langchain_community.chat_message_histories import ChatMessageHistory
-        from langchain_core.messages import HumanMessage, AIMessage
-        
-        history = ChatMessageHistory()
+    def search_messages(self, query: str, limit: int = 50) -> List[Dict]:
+        """Find messages containing query across all sessions"""
+        if hasattr(self.store, "search_messages"):
+            return self.store.search_messages(query, limit)
         
-        if session_id in self.conversations:
-            conv = self.conversations[session_id]
-            for msg in conv.messages:
-                if msg["role"] == "user":
-                    history.add_message(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    history.add_message(AIMessage(content=msg["content"]))
+        query_lower = query.lower().strip()
+        if not query_lower:
+            return []
         
+        results = []
+        for conv in self.conversations.values():
+            # Unloaded sessions are read for the scan but not kept in memory
+            messages = conv.messages if conv.messages is not None else self.store.load_messages(conv.session_id)
+            for msg in messages:
+                if query_lower in msg["content"].lower():
+                    results.append({
+                        "session_id": conv.session_id,
+                        "title": conv.title,
+                        "role": msg["role"],
+                        "timestamp": msg.get("timestamp"),
+                        "snippet": msg["content"][:120]
+                    })
+                    if len(results) >= limit:
+                        return results
+        return results
+    
+    def get_message_history(self, session_id: str) -> SessionChatHistory:
+        """LangChain history for a session, built once and then kept current by add_message"""
+        with self._lock:
+            return self._get_message_history(session_id)
+    
+    def _get_message_history(self, session_id: str) -> SessionChatHistory:
+        history = self._histories.get(session_id)
+        if history is None:
+            history = SessionChatHistory(settings_manager.get('history_token_budget', 2000))
+            conv = self.conversations.get(session_id)
+            if conv:
+                self._ensure_messages(conv)
+                for msg in conv.messages:
+                    history.append(msg["role"], msg["content"])
+            self._histories[session_id] = history
         return history
 
 # Initialize memory manager
 memory_manager = AdvancedMemoryManager()
+startup_timeline.mark("conversation memory loaded")
 
 # ============================================================================
 # AI BRAIN SETUP WITH ALL TOOLS
@@ -695,120 +1579,111 @@ ai_mode_enabled = False  # Track if AI mode is available
 def get_ollama_models():
     """Get list of installed Ollama models"""
     try:
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            models = []
-            for line in lines:
-                if line.strip():
-                    # Extract model name (first column)
-                    model_name = line.split()[0]
-                    models.append(model_name)
-            return models
-        return []
+        return ollama_client.list_models()
     except Exception as e:
         logging.error(f"Failed to get Ollama models: {e}")
         return []
 
-def initialize_llm(model_name=None):
+def get_context_window(model_name: str) -> int:
+    """Context window (num_ctx) used for a model, from settings"""
+    for prefix, size in settings_manager.get('model_context_windows', {}).items():
+        if model_name.startswith(prefix):
+            return size
+    return settings_manager.get('context_window', 8192)
+
+# One ChatOllama per model, so switching back reuses its HTTP client
+llm_cache: Dict[str, ChatOllama] = {}
+
+def get_llm(model_name: str) -> ChatOllama:
+    num_ctx = get_context_window(model_name)
+    cached = llm_cache.get(model_name)
+    if cached is None or cached.num_ctx != num_ctx:
+        cached = ChatOllama(
+            model=model_name,
+            base_url=ollama_client.base_url,
+            temperature=0,
+            num_predict=512,
+            num_ctx=num_ctx,
+            top_p=0.9,
+            keep_alive=settings_manager.get('ollama_keep_alive', '30m')
+        )
+        llm_cache[model_name] = cached
+    return cached
+
+def initialize_llm(model_name=None, preload=True):
     """Initialize or reinitialize the LLM with specified model"""
-    global llm, executor, executor_with_history, current_model, ai_mode_enabled
+    global llm, agent_executor, current_model, ai_mode_enabled
     
     if model_name:
         current_model = model_name
     
     try:
-        llm = ChatOllama(
-            model=current_model,
-            temperature=0,
-            num_predict=512,
-            top_p=0.9
-        )
+        llm = get_llm(current_model)
         
         # Recreate the agent with new LLM
-        agent = create_tool_calling_agent(llm, tools, prompt)
-        executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
-        
-        # Recreate executor with history
-        executor_with_history = RunnableWithMessageHistory(
-            executor,
-            lambda session_id: memory_manager.get_message_history(session_id),
-            input_messages_key="input",
-            history_messages_key="chat_history",
-        )
+        agent_executor = build_agent_executor(llm, tools)
+        routed_executors.clear()
         
         ai_mode_enabled = True
         logging.info(f"🤖 LLM initialized with model: {current_model}")
+        if preload:
+            model_llm = llm
+            
+            def warm_up():
+                try:
+                    warm_up_llm(model_llm)
+                except Exception as e:
+                    logging.error(f"Failed to warm up {model_llm.model}: {e}")
+            
+            threading.Thread(target=warm_up, name="llm-warmup", daemon=True).start()
         return llm
     except Exception as e:
         logging.error(f"Failed to initialize LLM: {e}")
         ai_mode_enabled = False
         return None
 
-# Check Ollama on startup
-ai_mode_enabled = setup_ollama_automatically()
-
-# Get available models on startup
-if ai_mode_enabled:
-    available_models = get_ollama_models()
-    if available_models:
-        logging.info(f"📦 Found {len(available_models)} Ollama models: {', '.join(available_models)}")
-    else:
-        logging.warning("⚠️ No Ollama models found")
-
-# Initialize LLM only if AI mode is enabled
+# The LLM and agent are created by the background bootstrap (see OllamaBootstrap)
 llm = None
 agent_executor = None
-executor_with_history = None
-
-if ai_mode_enabled:
-    try:
-        llm = ChatOllama(
-            model=current_model,
-            temperature=0,
-            num_predict=512,
-            top_p=0.9
-        )
-        print(f"✅ AI Model: {current_model} - Ready!")
-    except Exception as e:
-        print(f"⚠️ AI Model error: {e}")
-        print("⚠️ Running in basic mode (AI features disabled)")
-        ai_mode_enabled = False
+ollama_bootstrap = OllamaBootstrap(startup_timeline)
 
 # Complete tool list with ALL advanced capabilities
-tools = [
-    # Core PC Control
-    open_notepad_with_context, quick_note, list_notes, test_note_creation,
-    open_app, close_app, rescan_apps, list_installed_apps,
-    list_running_apps, execute_command, system_info, create_file_smart,
-    
-    # Screenshot & OCR
-    take_screenshot, screenshot_all_monitors, annotate_screenshot, screenshot_window,
-    read_text_from_latest_image, read_text_from_image_file, ocr_to_file, read_screen_area,
-    
-    # Automation
-    type_text, press_key, copy_to_clipboard, paste_from_clipboard,
-    click_mouse, move_mouse, get_mouse_position, scroll_screen,
-    minimize_all_windows, switch_window, lock_computer, get_screen_size,
-    
-    # File Management
-    search_files, organize_files, create_zip, extract_zip,
-    delete_file, rename_file, copy_file, get_file_info,
-    
-    # Network & System
-    get_network_info, network_speed_test, list_connections,
-    monitor_system_resources, list_processes, kill_process, get_battery_status,
-    
-    # Media & Audio
-    control_volume, play_sound, open_url, take_picture,
-    record_audio, text_to_speech_file, get_clipboard_history,
-    
-    # Misc
-    get_time, arp_scan_terminal, duckduckgo_search_tool, matrix_mode
-]
+# Tool groups in prompt order. Each group is also a fixed routing profile
+# (see TOOL ROUTING), so keep related tools in the same group.
+TOOL_GROUPS = {
+    "pc": (
+        "open_notepad_with_context", "quick_note", "list_notes", "test_note_creation",
+        "open_app", "close_app", "rescan_apps", "list_installed_apps",
+        "list_running_apps", "execute_command", "system_info", "create_file_smart",
+    ),
+    "screen": (
+        "take_screenshot", "screenshot_all_monitors", "annotate_screenshot", "screenshot_window",
+        "read_text_from_latest_image", "read_text_from_image_file", "ocr_to_file", "read_screen_area",
+    ),
+    "automation": (
+        "type_text", "press_key", "copy_to_clipboard", "paste_from_clipboard",
+        "click_mouse", "move_mouse", "get_mouse_position", "scroll_screen",
+        "minimize_all_windows", "switch_window", "lock_computer", "get_screen_size",
+    ),
+    "files": (
+        "search_files", "organize_files", "create_zip", "extract_zip",
+        "delete_file", "rename_file", "copy_file", "get_file_info",
+    ),
+    "system": (
+        "get_network_info", "network_speed_test", "list_connections",
+        "monitor_system_resources", "list_processes", "kill_process", "get_battery_status",
+    ),
+    "media": (
+        "control_volume", "play_sound", "open_url", "take_picture",
+        "record_audio", "text_to_speech_file", "get_clipboard_history",
+    ),
+    "misc": (
+        "get_time", "arp_scan_terminal", "duckduckgo_search_tool", "matrix_mode",
+    ),
+}
+tools = [tool_registry.tools[name] for group in TOOL_GROUPS.values() for name in group]
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", """YOU ARE JARVIS - AN ADVANCED HYPERREALISTIC AI ASSISTANT
+JARVIS_SYSTEM_PROMPT = """YOU ARE JARVIS - AN ADVANCED HYPERREALISTIC AI ASSISTANT
 
 **YOUR CAPABILITIES:**
 You have access to 60+ powerful tools for complete system control:
@@ -847,103 +1722,1422 @@ User: "type hello world" → USE type_text tool
 User: "take screenshot" → USE take_screenshot tool
 User: "find all python files" → USE search_files tool
 
-Be smart, capable, and ACTUALLY HELPFUL!
+Be smart, capable, and ACTUALLY HELPFUL!"""
 
-Current chat: {recent_history}"""),
+# The system prompt and tool schemas come first and never change, so Ollama
+# can reuse their KV cache from the previous turn. Anything that varies per
+# turn (the rolling summary) goes in the last human message, after the prefix;
+# a variable in the system message would force a full re-prefill every turn.
+prompt = ChatPromptTemplate.from_messages([
+    ("system", JARVIS_SYSTEM_PROMPT),
     MessagesPlaceholder(variable_name="chat_history"),
-    ("human", "{input}"),
+    ("human", "{conversation_context}{input}"),
     MessagesPlaceholder(variable_name="agent_scratchpad"),
 ])
 
-# Initialize agent only if AI mode is enabled
-if ai_mode_enabled and llm:
-    agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
-    agent_executor = AgentExecutor(
-        agent=agent, 
-        tools=tools, 
-        verbose=True, 
+def warm_up_llm(model_llm: Optional[ChatOllama] = None) -> float:
+    """
+    Send the static prefix (system prompt + tool schemas) once with a single
+    output token, so the weights are loaded and the prefix is already in
+    Ollama's KV cache when the first real question arrives. Only the full tool
+    set is prefilled: Ollama keeps just the latest prefix, so warming each
+    routing profile as well would only be evicted again.
+    """
+    model_llm = model_llm or llm
+    start = time.perf_counter()
+    model_llm.bind_tools(tools).invoke(
+        [SystemMessage(content=JARVIS_SYSTEM_PROMPT), HumanMessage(content="hello")],
+        options={"num_ctx": model_llm.num_ctx, "num_predict": 1, "temperature": 0}
+    )
+    elapsed = time.perf_counter() - start
+    logging.info(f"🔥 Warmed up {model_llm.model} in {elapsed:.1f}s")
+    return elapsed
+
+# ============================================================================
+# CONCURRENT TOOL EXECUTION
+# ============================================================================
+
+# Read-only tools that may run while other tools of the same step are running.
+# Everything else changes the desktop (keys, windows, files, volume...) and runs
+# one at a time in the order the model asked for it.
+CONCURRENT_TOOLS = {
+    "get_time", "duckduckgo_search", "arp_scan_terminal", "list_notes", "list_running_apps",
+    "system_info", "list_installed_apps", "get_mouse_position", "get_screen_size",
+    "search_files", "get_file_info", "get_network_info", "network_speed_test",
+    "list_connections", "monitor_system_resources", "list_processes", "get_battery_status",
+    "get_clipboard_history",
+}
+
+class AsyncAgentRunner:
+    """
+    Runs agents with ainvoke on one long-lived event loop thread. AgentExecutor
+    gathers the tool calls of a model step on that loop, and the sync tools
+    run on a bounded thread pool (the loop's default executor).
+    """
+    
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._ordered_tails: Dict[object, asyncio.Future] = {}  # Agent run -> its last side-effecting call (loop thread only)
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.loop is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="jarvis-tool")
+                self.loop = asyncio.new_event_loop()
+                self.loop.set_default_executor(self._pool)
+                self._thread = threading.Thread(target=self.loop.run_forever, name="jarvis-agent-loop", daemon=True)
+                self._thread.start()
+            return self.loop
+    
+    def invoke(self, executor: AgentExecutor, inputs: dict, config: Optional[dict] = None) -> dict:
+        """Blocking call from any worker thread"""
+        loop = self._ensure_loop()
+        cancel_event = command_cancel_event.get()
+        
+        async def run():
+            # Tasks don't inherit the caller's context; the tools need its cancel event
+            command_cancel_event.set(cancel_event)
+            return await executor.ainvoke(inputs, config=config)
+        
+        return asyncio.run_coroutine_threadsafe(run(), loop).result()
+    
+    def ordered(self, coroutine, run_key=None):
+        """
+        Chain a side-effecting tool call after the previous one of the same
+        agent run (run_key), so concurrent commands don't wait on each other.
+        Called on the loop thread while a step's calls are created, i.e. in
+        the model's order.
+        """
+        previous = self._ordered_tails.get(run_key)
+        done = asyncio.get_running_loop().create_future()
+        self._ordered_tails[run_key] = done
+        
+        async def run_in_order():
+            try:
+                if previous is not None:
+                    await asyncio.wait({previous})
+                return await coroutine
+            finally:
+                if not done.done():
+                    done.set_result(None)
+                if self._ordered_tails.get(run_key) is done:
+                    del self._ordered_tails[run_key]
+        
+        return run_in_order()
+    
+    def shutdown(self):
+        with self._lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self.loop = None
+
+agent_runner = AsyncAgentRunner(settings_manager.get('tool_workers', 4))
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """AgentExecutor whose async steps run read-only tools concurrently and the rest in order"""
+    
+    def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        # AgentExecutor builds the coroutines for all of a step's actions before
+        # gathering them, so this runs in the order the model emitted the calls
+        coroutine = super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        if agent_action.tool in CONCURRENT_TOOLS:
+            return coroutine
+        return agent_runner.ordered(coroutine, run_manager.run_id if run_manager else None)
+
+# ============================================================================
+# TOOL ROUTING
+# ============================================================================
+
+ROUTER_DIMENSIONS = 2048  # Hashed feature space for the TF-IDF vectors
+ROUTER_NAME_WEIGHT = 3  # Tool name words count this many times in the index
+ROUTER_KEYWORD_WEIGHT = 0.35  # Bonus for input words that appear in the tool name
+ROUTER_MIN_SCORE = 0.15  # Below this nothing is confident and all tools are bound
+ROUTER_AMBIGUITY = 0.8  # Another profile scoring this close to the best one binds all tools
+ROUTER_STOPWORDS = {
+    "a", "an", "the", "to", "of", "in", "on", "for", "and", "or", "is", "it", "me", "my", "i",
+    "you", "your", "please", "can", "could", "would", "with", "from", "this", "that", "be",
+    "jarvis", "sir", "what", "how", "do", "does", "use", "using", "example", "examples", "args",
+    "returns", "str", "int", "none", "default"
+}
+
+def routing_tokens(text: str) -> List[str]:
+    """Lowercased words without stopwords, with plurals and -ing/-ed folded"""
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+        if word in ROUTER_STOPWORDS:
+            continue
+        if len(word) > 5 and word.endswith("ing"):
+            word = word[:-3]
+        elif len(word) > 4 and word.endswith("ed"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+class ToolRouter:
+    """
+    Picks the tool group (profile) for the user's request so each call binds
+    one group's schemas instead of all of them. Tools are scored by the cosine
+    similarity of hashed TF-IDF vectors built from tool names and docstrings,
+    plus a bonus for words of the tool name itself. No model or extra
+    dependency needed.
+    
+    Routing only ever chooses between the fixed profiles and the full set, so
+    each bound tool list (and with it the prompt prefix, where Ollama renders
+    the schemas) is one of a few stable ones that stay KV-cacheable.
+    """
+    
+    def __init__(self, profiles: Dict[str, List[StructuredTool]]):
+        self.profiles = {name: list(agent_tools) for name, agent_tools in profiles.items()}
+        self.tools = [t for agent_tools in self.profiles.values() for t in agent_tools]
+        self.profile_of = {t.name: name for name, agent_tools in self.profiles.items() for t in agent_tools}
+        documents = [routing_tokens(t.name) * ROUTER_NAME_WEIGHT + routing_tokens(t.description)
+                     for t in self.tools]
+        self.name_words = [set(routing_tokens(t.name)) for t in self.tools]
+        
+        document_frequency: Dict[str, int] = {}
+        for words in documents:
+            for word in set(words):
+                document_frequency[word] = document_frequency.get(word, 0) + 1
+        self.idf = {word: math.log((len(documents) + 1) / (count + 1)) + 1
+                    for word, count in document_frequency.items()}
+        self.vectors = [self._vector(words) for words in documents]
+    
+    def _vector(self, words: List[str]) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        for word in words:
+            bucket = zlib.crc32(word.encode()) % ROUTER_DIMENSIONS
+            vector[bucket] = vector.get(bucket, 0.0) + self.idf.get(word, 1.0)
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {bucket: v / norm for bucket, v in vector.items()}
+    
+    def rank(self, text: str) -> List[tuple]:
+        """(score, tool) for every tool, best first"""
+        words = routing_tokens(text)
+        query = self._vector(words)
+        query_words = set(words)
+        ranked = []
+        for t, vector, name_words in zip(self.tools, self.vectors, self.name_words):
+            score = sum(weight * vector.get(bucket, 0.0) for bucket, weight in query.items())
+            if name_words:
+                score += ROUTER_KEYWORD_WEIGHT * len(name_words & query_words) / len(name_words)
+            ranked.append((score, t))
+        ranked.sort(key=lambda pair: pair[0], reverse=True)
+        return ranked
+    
+    def select(self, text: str) -> Optional[str]:
+        """
+        The profile holding the best match for this request, or None when
+        nothing is a confident match or another profile scores nearly as well
+        (the request may need both) and the full set should be bound.
+        """
+        best: Dict[str, float] = {}
+        for score, t in self.rank(text):
+            best.setdefault(self.profile_of[t.name], score)
+        ranked = sorted(best.items(), key=lambda pair: pair[1], reverse=True)
+        if not ranked or ranked[0][1] < ROUTER_MIN_SCORE:
+            return None
+        if len(ranked) > 1 and ranked[1][1] >= ranked[0][1] * ROUTER_AMBIGUITY:
+            return None
+        return ranked[0][0]
+
+def build_agent_executor(model_llm: ChatOllama, agent_tools: List[StructuredTool]) -> AgentExecutor:
+    agent = create_tool_calling_agent(model_llm, agent_tools, prompt)
+    return ConcurrentAgentExecutor(
+        agent=agent,
+        tools=agent_tools,
+        verbose=True,
         max_iterations=3,
         handle_parsing_errors=True,
-        return_intermediate_steps=False
+        return_intermediate_steps=True  # Lets the response cache skip answers that used tools
     )
-else:
-    agent_executor = None
-    print("⚠️ AI Mode: Disabled - Running in Basic Mode")
 
-# LangChain memory
-memory_store = {}
+tool_router = ToolRouter({name: [tool_registry.tools[key] for key in group]
+                          for name, group in TOOL_GROUPS.items()})
+routed_executors: Dict[str, AgentExecutor] = {}  # Profile -> executor for the current llm (reset by initialize_llm)
+
+def select_agent(user_input: str) -> tuple:
+    """(executor, bound tools) for a request: one routing profile, or everything"""
+    if not settings_manager.get('tool_routing', True):
+        return agent_executor, tools
+    profile = tool_router.select(user_input)
+    if profile is None:
+        logging.info("🧭 Tool routing: no single confident profile, binding all tools")
+        return agent_executor, tools
+    
+    selected = tool_router.profiles[profile]
+    executor = routed_executors.get(profile)
+    if executor is None:
+        executor = routed_executors[profile] = build_agent_executor(llm, selected)
+    logging.info(f"🧭 Tool routing: {profile} profile ({len(selected)} tools)")
+    return executor, selected
+
+# Requests with the tool that should handle them, for --bench-tools
+TOOL_ROUTING_CASES = [
+    ("open chrome", "open_app"),
+    ("launch spotify for me", "open_app"),
+    ("close discord", "close_app"),
+    ("which apps are installed", "list_installed_apps"),
+    ("take a screenshot", "capture_screenshot"),
+    ("screenshot every monitor", "screenshot_all_monitors"),
+    ("read the text in my latest screenshot", "read_latest_screenshot"),
+    ("type hello world", "type_text"),
+    ("press ctrl+c", "press_key"),
+    ("copy this to the clipboard: meeting at 5", "copy_to_clipboard"),
+    ("click the mouse at 500, 300", "click_mouse"),
+    ("where is my mouse cursor", "get_mouse_position"),
+    ("scroll down", "scroll_screen"),
+    ("show the desktop", "minimize_all_windows"),
+    ("lock my computer", "lock_computer"),
+    ("what is my screen resolution", "get_screen_size"),
+    ("find all pdf files in downloads", "search_files"),
+    ("organize my downloads folder", "organize_files"),
+    ("zip the project folder", "create_zip"),
+    ("unzip archive.zip", "extract_zip"),
+    ("delete old_notes.txt", "delete_file"),
+    ("rename report.txt to final.txt", "rename_file"),
+    ("what is my ip address", "get_network_info"),
+    ("test my internet speed", "network_speed_test"),
+    ("how much cpu and memory am I using", "monitor_system_resources"),
+    ("kill notepad", "kill_process"),
+    ("how much battery is left", "get_battery_status"),
+    ("set the volume to 30", "control_volume"),
+    ("mute the sound", "control_volume"),
+    ("open youtube.com", "open_url"),
+    ("take a picture with the webcam", "take_picture"),
+    ("record audio for 10 seconds", "record_audio"),
+    ("what time is it in Tokyo", "get_time"),
+    ("search the web for python tutorials", "duckduckgo_search"),
+    ("enter matrix mode", "matrix_mode"),
+    ("make a quick note: buy milk", "quick_note"),
+    ("open notepad with meeting notes", "open_notepad_with_context"),
+    ("run the command ipconfig", "execute_command"),
+    ("show system information", "system_info"),
+    ("list running processes", "list_processes"),
+]
+
+def benchmark_tool_routing():
+    """
+    Routing recall and schema size, and with Ollama tool-call accuracy,
+    latency and prefill for routed vs. full tool sets
+    (python main.py --bench-tools).
+    """
+    full_tokens = conversation_context.fixed_prompt_tokens(tools)
+    
+    def routed(text: str) -> List[StructuredTool]:
+        profile = tool_router.select(text)
+        return tool_router.profiles[profile] if profile else tools
+    
+    hits, fallbacks, routed_tokens, route_ms = 0, 0, [], []
+    for text, expected in TOOL_ROUTING_CASES:
+        start = time.perf_counter()
+        selected = tool_router.select(text)
+        route_ms.append((time.perf_counter() - start) * 1000)
+        fallbacks += selected is None
+        bound = routed(text)
+        hits += any(t.name == expected for t in bound)
+        routed_tokens.append(conversation_context.fixed_prompt_tokens(bound))
+    
+    cases = len(TOOL_ROUTING_CASES)
+    print(f"📊 Tool routing, {cases} requests, {len(tool_router.profiles)} profiles over {len(tools)} tools:")
+    print(f"   expected tool bound: {hits}/{cases} ({hits * 100 // cases}%), full-set fallbacks: {fallbacks}")
+    print(f"   routing time: {sum(route_ms) / cases:.2f} ms avg")
+    print(f"   prompt (system + schemas): ~{sum(routed_tokens) // cases} tokens routed vs ~{full_tokens} full")
+    
+    if not ai_mode_enabled or llm is None:
+        print("   (Ollama not available: skipping latency, prefill and tool-call accuracy)")
+        return
+    
+    # Requests run back to back as in a session, so prompt_eval_count shows
+    # what the KV cache could not reuse after each switch of tool set
+    for label, pick in (("full", lambda text: tools), ("routed", routed)):
+        warm_up_llm(llm)
+        correct, seconds, evaluated, prefill = 0, [], [], []
+        for text, expected in TOOL_ROUTING_CASES:
+            bound = llm.bind_tools(pick(text))
+            start = time.perf_counter()
+            message = bound.invoke([SystemMessage(content=JARVIS_SYSTEM_PROMPT), HumanMessage(content=text)])
+            seconds.append(time.perf_counter() - start)
+            correct += bool(message.tool_calls) and message.tool_calls[0]["name"] == expected
+            info = message.response_metadata or {}
+            evaluated.append(info.get("prompt_eval_count") or 0)
+            prefill.append((info.get("prompt_eval_duration") or 0) / 1e9)
+        seconds.sort()
+        print(f"   {label:>6}: tool-call accuracy {correct}/{cases}, "
+              f"latency p50 {seconds[len(seconds) // 2]:.2f}s, p95 {seconds[int(len(seconds) * 0.95) - 1]:.2f}s, "
+              f"prefill {sum(evaluated) // cases} tokens / {sum(prefill) * 1000 / cases:.0f} ms avg")
+
+# ============================================================================
+# FAST-PATH INTENTS
+# ============================================================================
+
+# Wake word and politeness stripped before matching ("jarvis, could you please ...")
+INTENT_PREFIX = re.compile(
+    r"^(?:(?:hey |ok |okay )?jarvis[,.!]?\s*)?(?:(?:can|could|would|will) you\s+)?(?:please\s+)?", re.IGNORECASE)
+INTENT_SUFFIX = re.compile(r"(?:\s+(?:please|now|for me))*[\s.!?]*$", re.IGNORECASE)
+
+@dataclass
+class Intent:
+    name: str
+    pattern: "re.Pattern"
+    tool_name: Optional[str]  # Function name in the tool registry; None = answered by respond
+    arguments: object = None  # match -> dict of tool arguments
+    respond: object = None  # match -> response text, for intents that need no tool
+    accepts: object = None  # match -> bool, checks the pattern can't express
+    platforms: tuple = ()  # platform.system() values the tool handles; empty = all
+    retryable: bool = False  # Read-only or idempotent: the agent may run it again after a failure
+    hits: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+
+def intent(name: str, pattern: str, tool_name: Optional[str], arguments=None, respond=None,
+           accepts=None, platforms: tuple = (), retryable: bool = False) -> Intent:
+    # Patterns must match the whole (cleaned) utterance, which is what makes them high-confidence
+    return Intent(name, re.compile(rf"(?:{pattern})", re.IGNORECASE), tool_name, arguments, respond,
+                  accepts, platforms, retryable)
+
+def local_time_response(match) -> str:
+    return f"The current time is {datetime.now().strftime('%H:%M')}, sir."
+
+class InstalledApps:
+    """App names from the app launcher's scan cache, reloaded when a rescan rewrites it"""
+    
+    def __init__(self):
+        self._mtime = None
+        self._names = frozenset()
+        self._lock = threading.Lock()
+    
+    def names(self) -> frozenset:
+        from tools.app_launcher import APP_CACHE_FILE
+        try:
+            mtime = os.path.getmtime(APP_CACHE_FILE)
+        except OSError:
+            return frozenset()  # Never scanned (or not Windows): app requests go to the LLM
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(APP_CACHE_FILE, 'r') as f:
+                        self._names = frozenset(name.lower() for name in json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.error(f"Failed to read app cache: {e}")
+                    self._names = frozenset()
+                self._mtime = mtime
+            return self._names
+
+installed_apps = InstalledApps()
+
+def known_app(match) -> bool:
+    return match.group("app").lower() in installed_apps.names()
+
+INTENTS = [
+    intent("local_time", r"what(?:'s| is) the time|what time is it|tell me the time|current time", None, respond=local_time_response),
+    intent("city_time", r"what(?:'s| is) the time in (?P<city>[a-z .'-]+)|what time is it in (?P<city2>[a-z .'-]+)",
+           "get_time", lambda m: {"city": (m.group("city") or m.group("city2")).strip()}, retryable=True),
+    intent("screenshot", r"(?:take|capture|grab)(?: a| the)? screen ?shot|screen ?shot", "take_screenshot",
+           retryable=True),
+    intent("lock", r"lock(?: the| my)? (?:computer|pc|screen|workstation)", "lock_computer", retryable=True),
+    intent("volume_set", r"(?:set|change)(?: the)? volume to (?P<level>\d{1,3})(?: percent|%)?", "control_volume",
+           lambda m: {"action": "set", "level": min(100, int(m.group("level")))}, retryable=True),
+    # control_volume only steps the volume with NirCmd on Windows
+    intent("volume_up", r"(?:turn(?: the)? )?volume up|(?:increase|raise)(?: the)? volume|turn it up|louder", "control_volume",
+           lambda m: {"action": "up"}, platforms=("Windows",)),
+    intent("volume_down", r"(?:turn(?: the)? )?volume down|(?:decrease|lower|reduce)(?: the)? volume|turn it down|quieter",
+           "control_volume", lambda m: {"action": "down"}, platforms=("Windows",)),
+    intent("unmute", r"unmute(?: the)?(?: sound| audio| volume)?", "control_volume", lambda m: {"action": "unmute"},
+           retryable=True),
+    intent("mute", r"mute(?: the)?(?: sound| audio| volume)?", "control_volume", lambda m: {"action": "mute"},
+           retryable=True),
+    intent("show_desktop", r"show(?: the| me the)? desktop|minimi[sz]e (?:all|everything)(?: windows)?", "minimize_all_windows"),
+    intent("switch_window", r"switch(?: the)? windows?|alt tab", "switch_window"),
+    intent("screen_size", r"what(?:'s| is) (?:my|the) screen (?:size|resolution)", "get_screen_size", retryable=True),
+    intent("battery", r"(?:what(?:'s| is) (?:my|the) )?battery(?: status| level| percentage)?|how much battery(?: is left| do i have)?",
+           "get_battery_status", retryable=True),
+    intent("resources", r"(?:show |check )?(?:system resources|(?:cpu|memory|ram)(?: and (?:cpu|memory|ram))? usage)",
+           "monitor_system_resources", retryable=True),
+    intent("ip_address", r"what(?:'s| is) my ip(?: address)?|(?:show )?(?:my )?network info(?:rmation)?", "get_network_info",
+           retryable=True),
+    intent("scroll", r"scroll (?P<direction>up|down)(?: (?P<amount>\d+))?", "scroll_screen",
+           lambda m: {"direction": m.group("direction").lower(), "amount": int(m.group("amount") or 5)}),
+    intent("matrix", r"(?:enter |start |activate )?matrix mode", "matrix_mode"),
+    intent("open_url", r"(?:open|go to|visit) (?P<url>(?:https?://)?[\w-]+(?:\.[\w-]+)+(?:/\S*)?)", "open_url",
+           lambda m: {"url": m.group("url")}),
+    # Only names of scanned apps ("close the window" is not one); anything else goes to the LLM
+    intent("open_app", r"(?:open|launch) (?P<app>[a-z0-9][\w+.-]*(?: [\w+.-]+){0,3})", "open_app",
+           lambda m: {"app_name": m.group("app")}, accepts=known_app),
+    intent("close_app", r"(?:close|quit) (?P<app>[a-z0-9][\w+.-]*(?: [\w+.-]+){0,3})", "close_app",
+           lambda m: {"app_name": m.group("app")}, accepts=known_app),
+    intent("type_text", r"type (?P<text>.+)", "type_text", lambda m: {"text": m.group("text")}),
+    intent("press_key", r"press (?P<keys>[\w]+(?:\s*\+\s*[\w]+)*)", "press_key",
+           lambda m: {"key_combination": re.sub(r"\s+", "", m.group("keys"))}),
+    intent("quick_note", r"(?:quick )?note(?: down)?[:,]? (?P<content>.+)|save this: (?P<content2>.+)", "quick_note",
+           lambda m: {"content": m.group("content") or m.group("content2")}),
+]
+
+# Words that mean the request is more than one simple action
+INTENT_BLOCKERS = re.compile(r"\b(?:and then|and|then|after|if|with|but|using|from|into)\b", re.IGNORECASE)
+
+# Tools report failures in their return value, not by raising
+TOOL_FAILURE = re.compile(r"^\s*(?:❌|⚠️)")
+
+class IntentMatcher:
+    """
+    Deterministic fast path: utterances that fully match one of INTENTS go
+    straight to their tool with the extracted arguments, skipping the agent
+    (and its LLM round-trips). Anything else falls through unchanged, and so
+    does a request whose retryable tool reports a failure, if the agent can
+    retry it.
+    """
+    
+    def __init__(self, intents: List[Intent], system: str = platform.system()):
+        self.intents = [i for i in intents if not i.platforms or system in i.platforms]
+        self.requests = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def match(self, text: str):
+        """(intent, match) for a high-confidence utterance, else None"""
+        cleaned = INTENT_SUFFIX.sub("", INTENT_PREFIX.sub("", text.strip()))
+        if not cleaned:
+            return None
+        for candidate in self.intents:
+            match = candidate.pattern.fullmatch(cleaned)
+            if not match or (candidate.accepts and not candidate.accepts(match)):
+                continue
+            # Free-text arguments (type, notes) may contain anything; the rest must be a single action
+            free_text = candidate.name in ("type_text", "quick_note")
+            if not free_text and INTENT_BLOCKERS.search(cleaned):
+                return None
+            return candidate, match
+        return None
+    
+    def handle(self, text: str) -> Optional[str]:
+        """Run the matching tool and return its output, or None to fall through"""
+        with self._lock:
+            self.requests += 1
+        matched = self.match(text)
+        if matched is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        candidate, match = matched
+        start = time.perf_counter()
+        try:
+            if candidate.respond:
+                result = candidate.respond(match)
+            else:
+                arguments = candidate.arguments(match) if candidate.arguments else {}
+                result = tool_registry.tools[candidate.tool_name].invoke(arguments)
+        except Exception as e:
+            with self._lock:
+                candidate.errors += 1
+                self.misses += 1
+            logging.error(f"⚡ Fast path '{candidate.name}' failed, falling back: {e}")
+            return None
+        
+        # Without the agent nothing would do better than the tool's own message, and
+        # an action that may have partly happened (typing, keys, closing apps) must not run twice
+        if candidate.retryable and ai_mode_enabled and TOOL_FAILURE.match(str(result)):
+            with self._lock:
+                candidate.errors += 1
+                self.misses += 1
+            logging.warning(f"⚡ Fast path '{candidate.name}' reported a failure, falling back to the agent")
+            return None
+        
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            candidate.hits += 1
+            candidate.total_ms += elapsed
+        logging.info(f"⚡ Fast path: {candidate.name} in {elapsed:.0f} ms")
+        return str(result)
+    
+    def summary(self) -> str:
+        with self._lock:
+            hits = self.requests - self.misses
+            if not self.requests:
+                return "no requests yet"
+            lines = [f"{hits}/{self.requests} requests ({hits * 100 // self.requests}%)"]
+            for candidate in sorted(self.intents, key=lambda i: i.hits, reverse=True):
+                if candidate.hits or candidate.errors:
+                    lines.append(f"  {candidate.name}: {candidate.hits} hits "
+                                 f"({candidate.hits * 100 // self.requests}% of requests), "
+                                 f"{candidate.total_ms / max(1, candidate.hits):.0f} ms avg"
+                                 + (f", {candidate.errors} errors" if candidate.errors else ""))
+            return "\n".join(lines)
+
+intent_matcher = IntentMatcher(INTENTS)
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+# Requests whose answer depends on the conversation so far or on the moment they are asked
+UNCACHEABLE_REQUEST = re.compile(
+    r"\b(?:it|that|this|those|these|them|again|earlier|before|previous|last|said|remember|"
+    r"my|me|i|today|tonight|tomorrow|yesterday|now|current|currently|latest|news|weather|random|joke)\b",
+    re.IGNORECASE)
+
+class ResponseCache:
+    """
+    LRU cache of final answers to conversational requests that needed no tools
+    ("hello", "what can you do"). Keyed on the normalized request, the model and
+    a hash of the system prompt, so changing either invalidates old answers.
+    """
+    
+    def __init__(self, path: str = RESPONSE_CACHE_FILE, max_entries: int = 256, ttl: float = 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.prompt_hash = hashlib.sha256(JARVIS_SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:16]
+        self.load()
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = INTENT_SUFFIX.sub("", INTENT_PREFIX.sub("", text.strip()))
+        return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+    
+    def key(self, text: str, model: str) -> Optional[str]:
+        """Cache key for a request, or None if its answer must not be reused"""
+        normalized = self.normalize(text)
+        if not normalized or UNCACHEABLE_REQUEST.search(normalized):
+            return None
+        return hashlib.sha256(f"{model}\x00{self.prompt_hash}\x00{normalized}".encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl:
+                del self.entries[key]
+                self.dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            entry["hits"] = entry.get("hits", 0) + 1
+            self.hits += 1
+            return entry["response"]
+    
+    def put(self, key: str, request: str, response: str):
+        with self._lock:
+            self.entries[key] = {"request": request, "response": response,
+                                 "created": time.time(), "hits": 0}
+            self.entries.move_to_end(key)
+            self.stores += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.dirty = True
+    
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.dirty = True
+    
+    def load(self):
+        """Load unexpired answers saved by a previous run"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            for key, entry in data.get("entries", []):
+                if now - entry["created"] <= self.ttl:
+                    self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            logging.info(f"💬 Loaded {len(self.entries)} cached responses")
+        except Exception as e:
+            logging.error(f"Failed to load response cache: {e}")
+            self.entries.clear()
+    
+    def save(self):
+        """Write the cache (in LRU order) if it changed since the last save"""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {"entries": list(self.entries.items()), "last_updated": datetime.now().isoformat()}
+            self.dirty = False
+        try:
+            with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            logging.error(f"Failed to save response cache: {e}")
+            self.dirty = True
+    
+    def summary(self) -> str:
+        with self._lock:
+            lookups = self.hits + self.misses
+            rate = f" ({self.hits * 100 // lookups}% hit rate)" if lookups else ""
+            return (f"{self.hits} hits, {self.misses} misses{rate}, "
+                    f"{len(self.entries)}/{self.max_entries} entries, {self.evictions} evicted")
+
+response_cache = ResponseCache(
+    max_entries=settings_manager.get('response_cache_size', 256),
+    ttl=settings_manager.get('response_cache_ttl', 86400)
+)
+
+# ============================================================================
+# LATENCY TRACING
+# ============================================================================
+
+# Dashboard order; tool spans ("tool:<name>") are listed after llm
+TRACE_PHASES = ["listen", "wake_word", "recognize", "process", "fast_path", "context", "first_token", "llm",
+                "speak", "persist"]
+
+@dataclass
+class Span:
+    name: str
+    start: float  # Seconds after the turn started
+    duration: float
+    error: Optional[str] = None
+
+class TurnTrace:
+    """Timed phases of one voice or typed turn"""
+    _ids = itertools.count(1)
+    
+    def __init__(self, source: str, started: Optional[float] = None):
+        self.turn_id = next(self._ids)
+        self.source = source
+        self.timestamp = datetime.now().isoformat()
+        self.started = started if started is not None else time.perf_counter()
+        self.command = None
+        self.total = None
+        self.spans: List[Span] = []
+        self._holds = 1  # The owner's finish(), plus one per hold()
+        self._lock = threading.Lock()
+    
+    def hold(self):
+        """Keep the turn open until one more finish(), for work that ends elsewhere (persist, speech)"""
+        with self._lock:
+            self._holds += 1
+    
+    def release(self, command: Optional[str] = None) -> bool:
+        """True once the owner and every hold have finished"""
+        with self._lock:
+            if command is not None:
+                self.command = command
+            self._holds -= 1
+            return self._holds == 0
+    
+    def add(self, name: str, start: float, end: float, error: Optional[str] = None):
+        with self._lock:
+            self.spans.append(Span(name, start - self.started, end - start, error))
+    
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.add(name, start, time.perf_counter(), error)
+    
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"turn_id": self.turn_id, "source": self.source, "timestamp": self.timestamp,
+                    "command": self.command, "total": self.total, "spans": [asdict(s) for s in self.spans]}
+
+class TurnTracer:
+    """Keeps the last finished turns in a ring buffer and computes per-phase percentiles"""
+    
+    def __init__(self, size: int = 500):
+        self.turns: deque = deque(maxlen=size)
+        self._current = contextvars.ContextVar("turn_trace", default=None)
+        self._lock = threading.Lock()
+    
+    def start(self, source: str, started: Optional[float] = None) -> TurnTrace:
+        return TurnTrace(source, started)
+    
+    def current(self) -> Optional[TurnTrace]:
+        return self._current.get()
+    
+    @contextmanager
+    def activate(self, trace: TurnTrace):
+        token = self._current.set(trace)
+        try:
+            yield trace
+        finally:
+            self._current.reset(token)
+    
+    def span(self, name: str):
+        """Span on the active turn, or nothing when no turn is being traced"""
+        trace = self.current()
+        return trace.span(name) if trace else nullcontext()
+    
+    def finish(self, trace: TurnTrace, command: Optional[str] = None):
+        """Record the turn once its owner and everything holding it have finished"""
+        if not trace.release(command):
+            return
+        trace.total = time.perf_counter() - trace.started
+        with self._lock:
+            self.turns.append(trace)
+        if settings_manager.get('trace_log', False):
+            try:
+                with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            except Exception as e:
+                logging.error(f"Failed to write turn trace: {e}")
+    
+    @staticmethod
+    def percentile(sorted_values: List[float], p: float) -> float:
+        return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+    
+    def phase_stats(self) -> Dict[str, tuple]:
+        """phase -> (turns, p50 ms, p95 ms, max ms); a phase that ran twice in a turn counts once, summed"""
+        with self._lock:
+            turns = [trace.to_dict() for trace in self.turns]
+        per_phase: Dict[str, List[float]] = {}
+        for turn in turns:
+            totals: Dict[str, float] = {}
+            for span in turn["spans"]:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration"]
+            totals["total"] = turn["total"]
+            for name, duration in totals.items():
+                per_phase.setdefault(name, []).append(duration * 1000)
+        
+        order = {name: position for position, name in enumerate(TRACE_PHASES)}
+        def sort_key(name):
+            if name.startswith("tool:"):
+                return (order["llm"] + 0.5, name)
+            return (order.get(name, len(order)), name)
+        
+        stats = {}
+        for name in sorted(per_phase, key=sort_key):
+            values = sorted(per_phase[name])
+            stats[name] = (len(values), self.percentile(values, 50), self.percentile(values, 95), values[-1])
+        return stats
+    
+    def report(self) -> str:
+        stats = self.phase_stats()
+        if not stats:
+            return "No turns traced yet. Talk to JARVIS or send a chat message."
+        lines = [f"{'phase':<28}{'turns':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}", "-" * 64]
+        for name, (count, p50, p95, worst) in stats.items():
+            lines.append(f"{name:<28}{count:>6}{p50:>10.0f}{p95:>10.0f}{worst:>10.0f}")
+        with self._lock:
+            recent = list(self.turns)[-5:]
+        lines.append("")
+        lines.append("Recent turns:")
+        for trace in reversed(recent):
+            phases = ", ".join(f"{s.name} {s.duration * 1000:.0f}" for s in trace.spans)
+            lines.append(f"#{trace.turn_id} {trace.source} {trace.total * 1000:.0f} ms "
+                         f"'{(trace.command or '')[:30]}': {phases}")
+        return "\n".join(lines)
+    
+    def export(self, path: Optional[str] = None) -> str:
+        """Write the buffered turns as JSON lines; returns the file path"""
+        path = path or f"turn_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        with self._lock:
+            turns = [trace.to_dict() for trace in self.turns]
+        with open(path, 'w', encoding='utf-8') as f:
+            for turn in turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+        return path
+
+turn_tracer = TurnTracer(settings_manager.get('trace_buffer_size', 500))
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Records each LLM call, each tool call and the first token as spans of a turn"""
+    
+    run_inline = True  # Callbacks may fire on the agent loop thread; the trace is locked
+    
+    def __init__(self, trace: TurnTrace):
+        self.trace = trace
+        self.created = time.perf_counter()
+        self.first_token_seen = False
+        self._starts: Dict = {}
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = ("llm", time.perf_counter())
+    
+    def on_llm_new_token(self, token: str, **kwargs):
+        if token and not self.first_token_seen:
+            self.first_token_seen = True
+            self.trace.add("first_token", self.created, time.perf_counter())
+    
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._starts[run_id] = (f"tool:{(serialized or {}).get('name', 'unknown')}", time.perf_counter())
+    
+    def _end(self, run_id, error: Optional[BaseException] = None):
+        started = self._starts.pop(run_id, None)
+        if started:
+            name, start = started
+            self.trace.add(name, start, time.perf_counter(), type(error).__name__ if error else None)
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+    
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+    
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+# ============================================================================
+# ENHANCED RESPONSE HANDLER
+# ============================================================================
+
+class CommandCancelled(Exception):
+    """Raised inside a running command once its request has been cancelled"""
+
+RESPONSE_TOKEN_RESERVE = 512  # Matches num_predict
+MIN_HISTORY_TOKENS = 256
 
-def get_session_history(session_id: str):
-    if session_id not in memory_store:
-        memory_store[session_id] = ChatMessageHistory()
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and JARVIS, their desktop assistant.
+Merge the new conversation lines into the current summary. Keep names, decisions, preferences, open tasks and
+facts the assistant may need later. Write at most 120 words of plain prose. Reply with the summary only."""
+
+class ConversationContextManager:
+    """
+    Keeps every prompt inside the model's context window. Chat history gets
+    whatever the budget leaves after the system prompt, tool schemas and the
+    input; messages that fall out of the window are folded into
+    ConversationMemory.summary by a background summarizer.
+    """
+    SUMMARY_BATCH = 6  # Evicted messages to collect before re-summarizing
+    
+    def __init__(self, memory_manager):
+        self.memory_manager = memory_manager
+        self.last_prompt_tokens = 0
+        self._tool_tokens: Dict[str, int] = {}
+        self._summarized: Dict[str, int] = {}  # session_id -> messages already in summary
+        self._summarizing = set()
+        self._lock = threading.Lock()
+    
+    def fixed_prompt_tokens(self, agent_tools: List[StructuredTool]) -> int:
+        """System prompt plus the bound tool schemas, which are sent on every call"""
+        for t in agent_tools:
+            if t.name not in self._tool_tokens:
+                self._tool_tokens[t.name] = estimate_tokens(json.dumps(convert_to_openai_tool(t)))
+        return estimate_tokens(JARVIS_SYSTEM_PROMPT) + sum(self._tool_tokens[t.name] for t in agent_tools)
+    
+    def prepare(self, session_id: str, user_input: str, agent_tools: Optional[List[StructuredTool]] = None) -> Dict:
+        """Fit history to the budget and return the prompt variables for this turn"""
+        history = self.memory_manager.get_message_history(session_id)
+        conv = self.memory_manager.conversations.get(session_id)
+        summary = conv.summary if conv else ""
+        
+        fixed_tokens = self.fixed_prompt_tokens(agent_tools if agent_tools is not None else tools)
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        input_tokens = estimate_tokens(user_input)
+        available = (get_context_window(current_model) - RESPONSE_TOKEN_RESERVE
+                     - fixed_tokens - summary_tokens - input_tokens)
+        history.set_token_budget(max(MIN_HISTORY_TOKENS,
+                                     min(available, settings_manager.get('history_token_budget', 2000))))
+        
+        self.last_prompt_tokens = fixed_tokens + summary_tokens + history.window_tokens + input_tokens
+        logging.info(f"🧮 Prompt tokens: ~{self.last_prompt_tokens} (fixed {fixed_tokens}, "
+                     f"summary {summary_tokens}, history {history.window_tokens}, input {input_tokens})")
+        
+        if conv:
+            self._schedule_summary(conv, history)
+        
+        return {
+            "conversation_context": f"(Summary of our earlier conversation: {summary})\n\n" if summary else "",
+            "chat_history": history.messages
+        }
+    
+    def _schedule_summary(self, conv: ConversationMemory, history: SessionChatHistory):
+        with self._lock:
+            evicted = history.evicted_count
+            # A summary restored from disk already covers what is out of the window
+            done = self._summarized.setdefault(conv.session_id, evicted if conv.summary else 0)
+            if llm is None or conv.session_id in self._summarizing or evicted - done < self.SUMMARY_BATCH:
+                return
+            self._summarizing.add(conv.session_id)
+        
+        new_messages = history.messages_between(done, evicted)
+        threading.Thread(target=self._summarize, args=(conv, new_messages, evicted), daemon=True).start()
+    
+    def _summarize(self, conv: ConversationMemory, new_messages: List[BaseMessage], covered: int):
+        try:
+            transcript = "\n".join(
+                f"{'User' if isinstance(m, HumanMessage) else 'JARVIS'}: {m.content}" for m in new_messages
+            )
+            response = llm.invoke([
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(content=f"Current summary:\n{conv.summary or '(empty)'}\n\n"
+                                     f"New conversation lines:\n{transcript}")
+            ])
+            if not self.memory_manager.set_summary(conv, response.content.strip()):
+                return
+            with self._lock:
+                self._summarized[conv.session_id] = covered
+            logging.info(f"📝 Summarized {len(new_messages)} older message(s) for {conv.session_id}")
+        except Exception as e:
+            logging.error(f"Summary update failed: {e}")
+        finally:
+            with self._lock:
+                self._summarizing.discard(conv.session_id)
+
+conversation_context = ConversationContextManager(memory_manager)
+
+class PrefillMetrics(BaseCallbackHandler):
+    """
+    Per-call prefill accounting from Ollama's prompt_eval_count, which only
+    counts prompt tokens that were actually evaluated. The difference to the
+    (estimated) prompt size is what the KV cache prefix saved.
+    """
+    
+    run_inline = True  # Cheap; no need for a thread hop under ainvoke
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prompt_estimates: Dict[str, int] = {}
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+        self.last = None  # (estimated prompt tokens, evaluated tokens, prefill seconds)
+    
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.prompt_tokens - self.evaluated_tokens)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        tool_tokens = sum(estimate_tokens(json.dumps(schema)) for schema in kwargs.get("invocation_params", {}).get("tools", []))
+        text_tokens = sum(estimate_tokens(str(m.content)) for m in messages[0]) if messages else 0
+        with self._lock:
+            self._prompt_estimates[str(run_id)] = text_tokens + tool_tokens
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            estimate = self._prompt_estimates.pop(str(run_id), 0)
+        try:
+            generation = response.generations[0][0]
+            info = dict(getattr(generation.message, "response_metadata", {}) or {})
+            info.update(generation.generation_info or {})
+        except (IndexError, AttributeError):
+            return
+        evaluated = info.get("prompt_eval_count")
+        if evaluated is None:
+            return
         
-        if memory_manager.current_session:
-            for msg in memory_manager.current_session.messages:
-                if msg["role"] == "user":
-                    memory_store[session_id].add_user_message(msg["content"])
-                else:
-                    memory_store[session_id].add_ai_message(msg["content"])
+        prefill_seconds = (info.get("prompt_eval_duration") or 0) / 1e9
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += max(estimate, evaluated)
+            self.evaluated_tokens += evaluated
+            self.last = (max(estimate, evaluated), evaluated, prefill_seconds)
+        logging.info(f"🧮 Prefill: evaluated {evaluated} of ~{max(estimate, evaluated)} prompt tokens "
+                     f"(~{max(0, estimate - evaluated)} reused from cache) in {prefill_seconds:.2f}s")
     
-    return memory_store[session_id]
-
-# Initialize executor with history only if AI mode is enabled
-if ai_mode_enabled and agent_executor:
-    executor_with_history = RunnableWithMessageHistory(
-        agent_executor,
-        get_session_history,
-        input_messages_key="input",
-        history_messages_key="chat_history",
-    )
-else:
-    executor_with_history = None
+    def summary(self) -> str:
+        with self._lock:
+            if not self.calls:
+                return "no LLM calls yet"
+            prompt_tokens, evaluated, seconds = self.last
+            return (f"last {evaluated}/{prompt_tokens} tokens evaluated ({seconds:.2f}s), "
+                    f"~{self.saved_tokens // self.calls} saved per call")
 
-# ============================================================================
-# ENHANCED RESPONSE HANDLER
-# ============================================================================
+prefill_metrics = PrefillMetrics()
 
-def process_jarvis_command(user_input: str, orb) -> str:
+def process_jarvis_command(user_input: str, orb, callbacks: Optional[List[BaseCallbackHandler]] = None) -> str:
     """Process command through AI with context"""
     try:
+        # Deterministic commands skip the LLM entirely
+        if settings_manager.get('fast_path_intents', True):
+            with turn_tracer.span("fast_path"):
+                fast_response = intent_matcher.handle(user_input)
+            if fast_response is not None:
+                return fast_response
+        
         # If AI mode is disabled, use basic command handler
-        if not ai_mode_enabled or executor_with_history is None:
+        if not ai_mode_enabled or agent_executor is None:
             return handle_basic_command(user_input)
         
-        if not memory_manager.current_session:
-            memory_manager.create_session(user_input)
+        session_id = memory_manager.ensure_session(user_input)
         
-        session_id = memory_manager.current_session.session_id
-        recent_messages = memory_manager.get_recent_messages(5)
-        recent_history = "\n".join([f"{m['role']}: {m['content']}" for m in recent_messages[-3:]])
+        cache_key = None
+        if settings_manager.get('response_cache', True):
+            cache_key = response_cache.key(user_input, current_model)
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                logging.info("💬 Answered from the response cache")
+                return cached
         
-        result = executor_with_history.invoke(
-            {
-                "input": user_input,
-                "recent_history": recent_history
-            },
-            config={"configurable": {"session_id": session_id}}
-        )
+        executor, agent_tools = select_agent(user_input)
+        with turn_tracer.span("context"):
+            context = conversation_context.prepare(session_id, user_input, agent_tools)
+        
+        inputs = {"input": user_input, **context}
+        config = {"callbacks": (callbacks or []) + [prefill_metrics]}
+        if settings_manager.get('concurrent_tool_calls', True):
+            result = agent_runner.invoke(executor, inputs, config)
+        else:
+            result = executor.invoke(inputs, config=config)
         
         output = result.get("output", "I'm not sure how to help with that, sir.")
+        # Only plain answers are idempotent; anything that ran a tool must run again
+        if cache_key and not result.get("intermediate_steps") and output.strip():
+            response_cache.put(cache_key, user_input, output)
         return output
     
+    except CommandCancelled:
+        raise
     except Exception as e:
         logging.error(f"Command processing error: {e}")
         return f"I encountered an issue, sir: {str(e)}"
 
+# ============================================================================
+# STREAMING RESPONSES
+# ============================================================================
+
+MAX_SPOKEN_CHARS = 300  # Longest text spoken for a single response
+
+class SentenceChunker:
+    """Splits streamed text into sentences as soon as each one is complete"""
+    BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+    MIN_LENGTH = 12  # Merge tiny fragments like "Sure." into the next sentence
+    
+    def __init__(self):
+        self.buffer = ""
+    
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        sentences = []
+        while True:
+            match = self.BOUNDARY.search(self.buffer)
+            if not match or match.start() < self.MIN_LENGTH:
+                # Keep fragments too short to speak on their own, unless a later boundary exists
+                later = self.BOUNDARY.search(self.buffer, match.end()) if match else None
+                if not later:
+                    break
+                match = later
+            sentence = self.buffer[:match.start()].strip()
+            self.buffer = self.buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+    
+    def flush(self) -> Optional[str]:
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder or None
+
+class StreamingResponseHandler(BaseCallbackHandler):
+    """
+    LangChain callback that forwards ChatOllama tokens as they are generated:
+    raw tokens to on_token (chat window) and whole sentences to on_sentence (TTS).
+    """
+    
+    raise_error = True  # Lets CommandCancelled abort the agent mid-generation
+    run_inline = True  # Keep tokens in order when the agent runs on the async loop
+    
+    def __init__(self, on_token=None, on_sentence=None, on_first_token=None,
+                 cancel_event: Optional[threading.Event] = None):
+        self.cancel_event = cancel_event
+        self.on_token = on_token
+        self.on_sentence = on_sentence
+        self.on_first_token = on_first_token
+        self.streamed_text = ""
+        self.answer_text = ""  # Streamed since the last tool call: the final answer, if the model wrote one
+        self.chunker = SentenceChunker()
+    
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.cancel_event and self.cancel_event.is_set():
+            raise CommandCancelled()
+        if not token:
+            return
+        if not self.streamed_text and self.on_first_token:
+            self.on_first_token()
+        self.streamed_text += token
+        self.answer_text += token
+        if self.on_token:
+            self.on_token(token)
+        for sentence in self.chunker.feed(token):
+            if self.on_sentence:
+                self.on_sentence(sentence)
+    
+    def on_llm_end(self, response, **kwargs):
+        # Each agent iteration is a separate generation; don't join sentences across them
+        remainder = self.chunker.flush()
+        if remainder and self.on_sentence:
+            self.on_sentence(remainder)
+    
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        # Text before a tool call is a preamble ("Sure, let me open that."), not the answer
+        self.answer_text = ""
+
+class StreamingSpeaker:
+    """Queues sentences on the speech worker as they arrive, so speech overlaps generation"""
+    
+    def __init__(self, orb=None):
+        self.orb = orb
+        self.spoken_chars = 0
+        self.last_utterance = None
+        self.generation = speech_worker.generation
+        self.pending = 0  # Queued sentences not spoken (or cancelled) yet
+        self.on_finished = None
+        self._lock = threading.Lock()
+    
+    def say(self, sentence: str):
+        if self.spoken_chars >= MAX_SPOKEN_CHARS:
+            return
+        if speech_worker.generation != self.generation:
+            return  # Speech was stopped (barge-in or orb click); keep quiet for the rest
+        self.spoken_chars += len(sentence)
+        if self.orb and self.last_utterance is None:
+            self.orb.set_status("🗣️ Responding...")
+        with self._lock:
+            self.pending += 1
+        utterance = speak_text(sentence, self.orb, wait=False, on_done=self._spoken)
+        if utterance is None:
+            self._spoken()  # Nothing left to say after cleaning
+        self.last_utterance = utterance or self.last_utterance
+    
+    def _spoken(self):
+        with self._lock:
+            self.pending -= 1
+            callback = self.on_finished if self.pending == 0 else None
+            if callback:
+                self.on_finished = None
+        if callback:
+            callback()
+    
+    def finish(self, wait: bool = True, on_finished=None):
+        """Wait for the last sentence, or call on_finished (on the speech thread) once all are spoken"""
+        if wait and self.last_utterance:
+            self.last_utterance.wait()
+        if on_finished:
+            with self._lock:
+                if self.pending:
+                    self.on_finished = on_finished
+                    return
+            on_finished()
+
+def run_streamed_turn(command: str, orb, wait_for_speech: bool = True, echo_command: bool = True,
+                      cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Process a command while streaming the answer: tokens appear in the chat
+    window as they are generated and each finished sentence is spoken right
+    away. Falls back to showing and speaking the whole response when the
+    model didn't stream it (basic mode, return_direct tools, errors), even
+    after a streamed preamble.
+    """
+    chat = orb.chat_window if orb.chat_window and orb.chat_window.isVisible() else None
+    if chat and echo_command:
+        chat.add_message_signal.emit("You", command, True)
+    
+    speaker = StreamingSpeaker(orb)
+    handler = StreamingResponseHandler(
+        on_token=chat.stream_token_signal.emit if chat else None,
+        on_sentence=speaker.say,
+        on_first_token=(lambda: chat.stream_started_signal.emit("JARVIS")) if chat else None,
+        cancel_event=cancel_event
+    )
+    
+    # Voice turns arrive with their trace active; typed and tool commands start their own
+    trace = turn_tracer.current()
+    owns_trace = trace is None
+    if owns_trace:
+        trace = turn_tracer.start("typed")
+    
+    scope = command_cancel_event.set(cancel_event)  # Cancelling the command stops its tools
+    try:
+        with turn_tracer.activate(trace), trace.span("process"):
+            response = process_jarvis_command(command, orb, callbacks=[handler, TraceCallbackHandler(trace)])
+    except CommandCancelled:
+        if chat and handler.streamed_text:
+            chat.stream_token_signal.emit(" [cancelled]")
+            chat.stream_finished_signal.emit()
+        if owns_trace:
+            turn_tracer.finish(trace, command)  # The process span carries the CommandCancelled error
+        raise
+    finally:
+        command_cancel_event.reset(scope)
+    
+    answered = bool(handler.answer_text.strip())
+    if chat and handler.streamed_text.strip():
+        chat.stream_finished_signal.emit()
+    if chat and not answered:
+        chat.add_message_signal.emit("JARVIS", response, False)
+    trace.hold()  # Released by add_conversation_to_chat once the turn is persisted
+    orb.update_chat_signal.emit(command, response, True, trace)
+    
+    if not answered:
+        speaker.say(response)
+    if wait_for_speech:
+        with trace.span("speak"):
+            speaker.finish(wait=True)
+    else:
+        # Typed turns return right away; the speak span ends when the last sentence has been spoken
+        speak_start = time.perf_counter()
+        
+        def spoken():
+            trace.add("speak", speak_start, time.perf_counter())
+            turn_tracer.finish(trace)
+        
+        trace.hold()
+        speaker.finish(wait=False, on_finished=spoken)
+    if owns_trace:
+        turn_tracer.finish(trace, command)
+    return response
+
+# ============================================================================
+# COMMAND DISPATCH (OFF THE GUI THREAD)
+# ============================================================================
+
+@dataclass
+class CommandRequest:
+    request_id: int
+    command: str
+    cancel_event: threading.Event
+    dispatcher: "CommandDispatcher"
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+    
+    def report(self, message: str):
+        """Send a progress message to the GUI thread"""
+        self.dispatcher.command_progress.emit(self.request_id, message)
+
+class CommandDispatcher(QObject):
+    """
+    Runs commands on a worker pool so the Qt event loop never waits on the
+    LLM, tools or speech. Every command gets a request id; progress and
+    results come back as signals, delivered on the GUI thread.
+    """
+    command_started = pyqtSignal(int, str)        # request_id, command
+    command_progress = pyqtSignal(int, str)       # request_id, message
+    command_finished = pyqtSignal(int, str, str)  # request_id, command, response
+    command_failed = pyqtSignal(int, str, str)    # request_id, command, error
+    command_cancelled = pyqtSignal(int, str)      # request_id, command
+    
+    def __init__(self, max_workers: int = 3):
+        super().__init__()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="command")
+        self._ids = itertools.count(1)
+        self._requests: Dict[int, CommandRequest] = {}
+        self._futures = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self.command_finished.connect(self._deliver_result)
+    
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._requests)
+    
+    def submit(self, command: str, handler, on_finished=None) -> int:
+        """
+        Run handler(request) on the pool and return the request id.
+        on_finished(response) is called on the GUI thread when it succeeds.
+        """
+        request = CommandRequest(next(self._ids), command, threading.Event(), self)
+        with self._lock:
+            self._requests[request.request_id] = request
+            if on_finished:
+                self._callbacks[request.request_id] = on_finished
+            self._futures[request.request_id] = self.pool.submit(self._run, request, handler)
+        return request.request_id
+    
+    def _run(self, request: CommandRequest, handler):
+        try:
+            if request.cancelled:
+                raise CommandCancelled()
+            self.command_started.emit(request.request_id, request.command)
+            response = handler(request)
+            if request.cancelled:
+                raise CommandCancelled()
+            self._forget(request.request_id)
+            self.command_finished.emit(request.request_id, request.command, response)
+        except CommandCancelled:
+            logging.info(f"🚫 Request {request.request_id} cancelled: {request.command[:50]}")
+            self._forget(request.request_id, drop_callback=True)
+            self.command_cancelled.emit(request.request_id, request.command)
+        except Exception as e:
+            logging.error(f"Request {request.request_id} failed: {e}")
+            self._forget(request.request_id, drop_callback=True)
+            self.command_failed.emit(request.request_id, request.command, str(e))
+    
+    def _forget(self, request_id: int, drop_callback: bool = False):
+        # Done before the result signal so in_flight is already current in its slots
+        with self._lock:
+            self._requests.pop(request_id, None)
+            self._futures.pop(request_id, None)
+            if drop_callback:
+                self._callbacks.pop(request_id, None)
+    
+    def _deliver_result(self, request_id: int, command: str, response: str):
+        callback = self._callbacks.pop(request_id, None)
+        if callback:
+            callback(response)
+    
+    def cancel(self, request_id: int) -> bool:
+        """Cancel a queued request, or make a running one stop at its next token"""
+        with self._lock:
+            request = self._requests.get(request_id)
+            future = self._futures.get(request_id)
+        if not request:
+            return False
+        
+        request.cancel_event.set()
+        if future and future.cancel():
+            # Never started, so _run won't clean up or report it
+            self._forget(request_id, drop_callback=True)
+            self.command_cancelled.emit(request_id, request.command)
+        return True
+    
+    def cancel_all(self) -> int:
+        with self._lock:
+            request_ids = list(self._requests)
+        return sum(1 for request_id in request_ids if self.cancel(request_id))
+    
+    def shutdown(self):
+        """Cancel everything and let the workers exit without blocking the GUI"""
+        self.cancel_all()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
 # ============================================================================
 # COMPACT RED & BLACK TERMINAL CHAT UI
 # ============================================================================
 
+MESSAGE_RULE_HTML = "<hr style='border: none; border-top: 1px dashed #222; margin: 6px 0;'>"
+BLOCKS_PER_MESSAGE = 3  # Message, rule and the empty block after the rule, used to turn the scrollback into a block count
+
 class ChatUI(QWidget):
     """Compact red & black terminal-style chat interface"""
     message_sent = pyqtSignal(str)
     add_message_signal = pyqtSignal(str, str, bool)
+    stream_started_signal = pyqtSignal(str)
+    stream_token_signal = pyqtSignal(str)
+    stream_finished_signal = pyqtSignal()
+    voice_result_signal = pyqtSignal(str, str)  # "heard" / "no_speech" / "error", text or error
     
     def __init__(self, memory_manager):
         super().__init__()
         self.memory_manager = memory_manager
+        self.listening = False
         self.setup_ui()
         self.add_message_signal.connect(self.add_message_safe)
+        self.stream_started_signal.connect(self.begin_stream_message)
+        self.stream_token_signal.connect(self.append_stream_text)
+        self.stream_finished_signal.connect(self.end_stream_message)
+        self.voice_result_signal.connect(self.finish_voice_input)
         
     def setup_ui(self):
         self.setWindowTitle("🔥 JARVIS TERMINAL")
@@ -1034,6 +3228,7 @@ class ChatUI(QWidget):
         self.chat_area = QTextEdit()
         self.chat_area.setReadOnly(True)
         self.chat_area.setHtml(self.get_terminal_welcome())
+        self.apply_scrollback_limit()
         chat_layout.addWidget(self.chat_area, 1)
         
         # Input area
@@ -1204,7 +3399,7 @@ class ChatUI(QWidget):
     def add_message_safe(self, sender: str, message: str, is_user: bool = True):
         self.add_message(sender, message, is_user)
     
-    def add_message(self, sender: str, message: str, is_user: bool = True):
+    def message_header_html(self, is_user: bool) -> str:
         from datetime import datetime
         timestamp = datetime.now().strftime("%H:%M")
         
@@ -1217,20 +3412,58 @@ class ChatUI(QWidget):
             sender_name = "JARVIS"
             prefix = "[AI]─❯"
         
-        msg_html = message.replace('\n', '<br>')
-        message_html = (
-            f"<div style='font-family: Consolas; margin: 6px 0; font-size: 11px;'>"
+        return (
             f"<span style='color: #666;'>[{timestamp}]</span> "
             f"<span style='color: {color}; font-weight: bold;'>[{sender_name}]</span><br>"
             f"<span style='color: {color};'>{prefix}</span> "
+        )
+    
+    def add_message(self, sender: str, message: str, is_user: bool = True):
+        msg_html = message.replace('\n', '<br>')
+        self.append_html(
+            f"<div style='font-family: Consolas; margin: 6px 0; font-size: 11px;'>"
+            f"{self.message_header_html(is_user)}"
             f"<span style='color: #ffffff;'>{msg_html}</span>"
             f"</div>"
-            f"<hr style='border: none; border-top: 1px dashed #222; margin: 6px 0;'>"
         )
-        
-        self.chat_area.setHtml(self.chat_area.toHtml() + message_html)
+        self.append_html(MESSAGE_RULE_HTML)
+    
+    def append_html(self, fragment: str):
+        """
+        Append a fragment at the end of the document. Only the new blocks are
+        laid out, so the cost per message no longer grows with the scrollback.
+        """
+        scrollbar = self.chat_area.verticalScrollBar()
+        cursor = QTextCursor(self.chat_area.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        # New block first, otherwise the text joins the previous message's rule and is lost
+        cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+        cursor.insertHtml(fragment)
+        scrollbar.setValue(scrollbar.maximum())
+    
+    def apply_scrollback_limit(self):
+        """Drop the oldest messages once the chat holds more than the scrollback setting"""
+        limit = settings_manager.get('chat_scrollback', 2000)
+        self.chat_area.document().setMaximumBlockCount(limit * BLOCKS_PER_MESSAGE if limit else 0)
+    
+    def begin_stream_message(self, sender: str):
+        """Open a JARVIS message that streamed tokens are appended to"""
+        self.append_html(
+            f"<div style='font-family: Consolas; margin: 6px 0; font-size: 11px;'>"
+            f"{self.message_header_html(is_user=False)}</div>"
+        )
+    
+    def append_stream_text(self, text: str):
+        cursor = QTextCursor(self.chat_area.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        text_html = html.escape(text).replace('\n', '<br>')
+        # pre-wrap keeps the leading space most tokens start with
+        cursor.insertHtml(f"<span style='font-family: Consolas; font-size: 11px; color: #ffffff; white-space: pre-wrap;'>{text_html}</span>")
         self.chat_area.verticalScrollBar().setValue(self.chat_area.verticalScrollBar().maximum())
     
+    def end_stream_message(self):
+        self.append_html(MESSAGE_RULE_HTML)
+    
     def send_message(self):
         message = self.message_input.text().strip()
         if message:
@@ -1251,6 +3484,7 @@ class ChatUI(QWidget):
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             self.chat_area.setHtml(self.get_terminal_welcome())
+            self.apply_scrollback_limit()
             self.add_message("SYSTEM", "Chat cleared", is_user=False)
     
     def export_chat(self):
@@ -1269,41 +3503,59 @@ class ChatUI(QWidget):
             self.add_message("SYSTEM", f"Export failed: {str(e)}", is_user=False)
     
     def start_voice_input(self):
-        import speech_recognition as sr
+        if self.listening:
+            return
+        self.listening = True
+        self.message_input.setPlaceholderText("🎤 Listening...")
+        self.message_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #111111;
+                border: 1px solid #00ff00;
+                color: #00ff00;
+            }
+        """)
         
-        try:
-            self.message_input.setPlaceholderText("🎤 Listening...")
-            self.message_input.setStyleSheet("""
-                QLineEdit {
-                    background-color: #111111;
-                    border: 1px solid #00ff00;
-                    color: #00ff00;
-                }
-            """)
-            QApplication.processEvents()
-            
-            recognizer = sr.Recognizer()
-            with sr.Microphone() as source:
-                audio = recognizer.listen(source, timeout=5)
-                text = recognizer.recognize_google(audio)
-                self.message_input.setText(text)
-                self.add_message("VOICE", f"Heard: {text}", is_user=False)
-                self.send_message()
-                
-        except sr.WaitTimeoutError:
+        def listen():
+            # Waiting for speech and recognizing it can take seconds; keep it off the GUI thread
+            try:
+                deadline = time.monotonic() + 5
+                while True:
+                    # Shares the engine's open, calibrated microphone and its recognizer
+                    utterance = microphone_service.claim_next(timeout=max(0.0, deadline - time.monotonic()))
+                    if utterance is None:
+                        self.voice_result_signal.emit("no_speech", "")
+                        return
+                    audio = utterance.audio_data()
+                    if not utterance.discarded:
+                        break  # Noise blips (and audio cut by a capture error) don't count
+                text = microphone_service.backend.transcribe(audio).strip()
+                self.voice_result_signal.emit("heard" if text else "no_speech", text)
+            except (sr.WaitTimeoutError, sr.UnknownValueError):
+                self.voice_result_signal.emit("no_speech", "")
+            except Exception as e:
+                self.voice_result_signal.emit("error", str(e))
+        
+        threading.Thread(target=listen, name="chat-voice-input", daemon=True).start()
+    
+    def finish_voice_input(self, result: str, text: str):
+        self.listening = False
+        self.message_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #111111;
+                border: 1px solid #ff0000;
+                color: #ff4444;
+            }
+        """)
+        self.message_input.setPlaceholderText("└─❯ Enter command...")
+        if result == "heard":
+            self.message_input.setText(text)
+            self.add_message("VOICE", f"Heard: {text}", is_user=False)
+            self.send_message()
+        elif result == "no_speech":
             self.message_input.setPlaceholderText("⏰ No speech")
             QTimer.singleShot(1500, lambda: self.message_input.setPlaceholderText("└─❯ Enter command..."))
-        except Exception as e:
-            self.add_message("SYSTEM", f"Voice error: {str(e)}", is_user=False)
-        finally:
-            self.message_input.setStyleSheet("""
-                QLineEdit {
-                    background-color: #111111;
-                    border: 1px solid #ff0000;
-                    color: #ff4444;
-                }
-            """)
-            self.message_input.setPlaceholderText("└─❯ Enter command...")
+        else:
+            self.add_message("SYSTEM", f"Voice error: {text}", is_user=False)
     
     def load_chat_history(self):
         if self.memory_manager.current_session:
@@ -1405,22 +3657,176 @@ class ChatUI(QWidget):
         chat_text = self.chat_area.toPlainText()
         QApplication.clipboard().setText(chat_text)
         self.add_message("SYSTEM", "Chat copied to clipboard", is_user=False)
+
+def benchmark_chat_rendering(count: int = 5000, bucket: int = 500, legacy_count: int = 400):
+    """
+    Time ChatUI.add_message over a long session (python main.py --bench-chat).
+    Scrollback is unlimited so the document really holds every message; the
+    old setHtml(toHtml() + html) path is timed on a shorter run for comparison.
+    """
+    settings_manager.settings['chat_scrollback'] = 0
+    chat = ChatUI(memory_manager)
+    chat.show()
+    app = QApplication.instance()
+    
+    def run(add, total, size):
+        timings = []
+        for i in range(total):
+            start = time.perf_counter()
+            add(i)
+            app.processEvents()
+            timings.append((time.perf_counter() - start) * 1000)
+        return [sum(timings[i:i + size]) / len(timings[i:i + size]) for i in range(0, total, size)]
+    
+    text = "The quick brown fox jumps over the lazy dog. " * 3
+    print(f"📊 Incremental rendering, {count} messages (avg ms per message per {bucket}):")
+    averages = run(lambda i: chat.add_message("USER" if i % 2 == 0 else "JARVIS", f"{i}: {text}", i % 2 == 0), count, bucket)
+    for n, avg in enumerate(averages, 1):
+        print(f"   up to {n * bucket:>5}: {avg:.3f} ms")
+    print(f"   last/first bucket: {averages[-1] / averages[0]:.2f}x")
+    
+    chat.chat_area.setHtml(chat.get_terminal_welcome())
+    legacy_bucket = max(1, legacy_count // 4)
+    
+    def legacy_add(i):
+        chat.chat_area.setHtml(chat.chat_area.toHtml() + f"<div>{i}: {text}</div>{MESSAGE_RULE_HTML}")
+    
+    print(f"📊 Old setHtml(toHtml() + html) path, {legacy_count} messages (per {legacy_bucket}):")
+    averages = run(legacy_add, legacy_count, legacy_bucket)
+    for n, avg in enumerate(averages, 1):
+        print(f"   up to {n * legacy_bucket:>5}: {avg:.3f} ms")
+    print(f"   last/first bucket: {averages[-1] / averages[0]:.2f}x")
+    chat.close()
+
 # ============================================================================
 # HYPERREALISTIC ORB UI WITH TASKBAR ICON
 # ============================================================================
 
+class OrbFrameCache:
+    """
+    Pre-rendered orb bodies (glow rings, 3D core, inner ring) keyed by colors,
+    radius bucket and widget size. paintEvent blits one pixmap and only draws
+    the rotating arc and the status text itself.
+    """
+    RADIUS_STEP = 2  # Pixels per bucket; the pulse spans 20px, so ~11 frames per color
+    MAX_FRAMES = 48
+    
+    def __init__(self):
+        self.frames: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def bucket(self, radius: float) -> int:
+        return int(round(radius / self.RADIUS_STEP) * self.RADIUS_STEP)
+    
+    def get(self, core: QColor, glow: QColor, radius: int, base_radius: int,
+            width: int, height: int, ratio: float) -> QPixmap:
+        key = (core.rgba(), glow.rgba(), radius, base_radius, width, height, ratio)
+        pixmap = self.frames.get(key)
+        if pixmap is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return pixmap
+        
+        self.misses += 1
+        pixmap = self.render(core, glow, radius, base_radius, width, height, ratio)
+        self.frames[key] = pixmap
+        if len(self.frames) > self.MAX_FRAMES:
+            self.frames.popitem(last=False)
+        return pixmap
+    
+    def clear(self):
+        self.frames.clear()
+    
+    @staticmethod
+    def render(core: QColor, glow: QColor, radius: int, base_radius: int,
+               width: int, height: int, ratio: float) -> QPixmap:
+        pixmap = QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        center_x = width // 2
+        center_y = height // 2 - 20
+        
+        # The pulse offset is the same sine as the radius itself
+        pulse_offset = radius - base_radius
+        
+        # Multiple layered outer glow rings for depth
+        for i in range(8):
+            glow_radius = radius + pulse_offset + (i * 12)
+            alpha = max(0, 80 - (i * 10))
+            gradient = QRadialGradient(center_x, center_y, glow_radius)
+            gradient.setColorAt(0, QColor(glow.red(), glow.green(), glow.blue(), alpha))
+            gradient.setColorAt(0.7, QColor(glow.red(), glow.green(), glow.blue(), alpha // 3))
+            gradient.setColorAt(1, QColor(glow.red(), glow.green(), glow.blue(), 0))
+            painter.setBrush(QBrush(gradient))
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.drawEllipse(QPointF(center_x, center_y), glow_radius, glow_radius)
+        
+        # Main orb with 3D effect
+        gradient = QRadialGradient(center_x - 15, center_y - 15, radius * 1.5)
+        gradient.setColorAt(0, QColor(255, 255, 255, 250))  # Bright highlight
+        gradient.setColorAt(0.3, core)
+        gradient.setColorAt(0.7, QColor(core.red()//2, core.green()//2, core.blue()//2))
+        gradient.setColorAt(1, QColor(core.red()//3, core.green()//3, core.blue()//3))
+        painter.setBrush(QBrush(gradient))
+        
+        # Glowing edge
+        painter.setPen(QPen(QColor(255, 255, 255, 150), 3))
+        painter.drawEllipse(QPointF(center_x, center_y), radius, radius)
+        
+        # Inner glow ring
+        inner_ring_radius = radius - 10
+        inner_gradient = QRadialGradient(center_x, center_y, inner_ring_radius)
+        inner_gradient.setColorAt(0, QColor(255, 255, 255, 0))
+        inner_gradient.setColorAt(0.8, QColor(255, 255, 255, 0))
+        inner_gradient.setColorAt(1, QColor(255, 255, 255, 100))
+        painter.setBrush(QBrush(inner_gradient))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.drawEllipse(QPointF(center_x, center_y), inner_ring_radius, inner_ring_radius)
+        
+        painter.end()
+        return pixmap
+
+# Animation frame intervals: full speed while something is happening, slower
+# once idle, and a cheap state check with no repaints once dormant
+ACTIVE_FRAME_MS = 30
+IDLE_FRAME_MS = 80
+DORMANT_CHECK_MS = 250
+IDLE_AFTER_SECONDS = 5
+DORMANT_AFTER_SECONDS = 30
+
 class JarvisOrb(QWidget):
     # Add a signal for thread-safe chat updates
-    update_chat_signal = pyqtSignal(str, str)
+    update_chat_signal = pyqtSignal(str, str, bool, object)  # user, response, already shown, TurnTrace
+    loaded_models_signal = pyqtSignal(object)  # Models Ollama holds in memory (model selector)
+    installed_models_signal = pyqtSignal(object)  # Models Ollama has installed (opens the model selector)
+    refreshed_models_signal = pyqtSignal(object)  # Same, for the model selector's refresh button
     
     def __init__(self, memory_manager):
         super().__init__()
         self.memory_manager = memory_manager
         self.status_text = "🚀 Initializing..."
         self.chat_window = None
+        self._activities = 0  # Background work in progress (voice turns), see activity()
+        self._activity_lock = threading.Lock()
         
         # Connect the signal
         self.update_chat_signal.connect(self.add_conversation_to_chat)
+        self.installed_models_signal.connect(self.open_model_selector)
+        self.scanning_models = False
+        
+        # Typed and tool commands run on worker threads, never on the GUI thread
+        self.dispatcher = CommandDispatcher()
+        self.dispatcher.command_started.connect(lambda request_id, command: self.set_status("🧠 Thinking..."))
+        self.dispatcher.command_progress.connect(lambda request_id, message: self.set_status(message))
+        self.dispatcher.command_finished.connect(self.on_command_done)
+        self.dispatcher.command_failed.connect(self.on_command_failed)
+        self.dispatcher.command_cancelled.connect(self.on_command_cancelled)
+        tool_runtime.on_slow_call = lambda call: self.set_status(f"⏳ {call.name}... (click to cancel)")
         
         # Set window icon for taskbar
         try:
@@ -1448,10 +3854,13 @@ class JarvisOrb(QWidget):
         self.setGeometry(100, 100, 300, 300)
         self.setWindowTitle("JARVIS AI")
         
-        # Animation timer
+        # Animation timer; the frame rate adapts to activity in update_animation
+        self.frame_cache = OrbFrameCache()
+        self.last_activity = time.monotonic()
+        self.last_frame = time.monotonic()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_animation)
-        self.timer.start(30)
+        self.timer.start(ACTIVE_FRAME_MS)
         
         # Make draggable
         self.dragging = False
@@ -1471,29 +3880,76 @@ class JarvisOrb(QWidget):
         painter.end()
         return QIcon(pixmap)
     
-    def add_conversation_to_chat(self, user_message: str, ai_response: str):
+    def add_conversation_to_chat(self, user_message: str, ai_response: str, already_shown: bool = False,
+                                 trace: Optional[TurnTrace] = None):
         """Thread-safe method to add conversation to chat"""
         # Add to memory manager
         if memory_manager.current_session:
-            memory_manager.add_message("user", user_message)
-            memory_manager.add_message("assistant", ai_response)
+            with trace.span("persist") if trace else nullcontext():
+                memory_manager.add_message("user", user_message)
+                memory_manager.add_message("assistant", ai_response)
+        if trace:
+            turn_tracer.finish(trace)  # The hold taken by run_streamed_turn
         
-        # Add to chat UI if open (using thread-safe signal)
-        if self.chat_window and self.chat_window.isVisible():
+        # Add to chat UI if open (using thread-safe signal) unless the caller already did
+        if self.chat_window and self.chat_window.isVisible() and not already_shown:
             self.chat_window.add_message_signal.emit("You", user_message, True)
             self.chat_window.add_message_signal.emit("JARVIS", ai_response, False)
         
         # Log the conversation
         logging.info(f"💬 Conversation: User: {user_message[:50]}... -> AI: {ai_response[:50]}...")
     
+    @contextmanager
+    def activity(self):
+        """Keep the orb animating at full speed while the calling thread works"""
+        with self._activity_lock:
+            self._activities += 1
+        try:
+            yield
+        finally:
+            with self._activity_lock:
+                self._activities -= 1
+            self.wake_animation()
+    
+    def is_busy(self) -> bool:
+        return (self._activities > 0 or not ollama_bootstrap.finished.is_set() or speech_worker.busy
+                or self.dispatcher.in_flight > 0)
+    
     def update_animation(self):
-        self.pulse_phase += self.pulse_speed
-        self.rotation += 2
+        now = time.monotonic()
+        if self.is_busy():
+            self.last_activity = now
+        idle_for = now - self.last_activity
+        
+        interval = ACTIVE_FRAME_MS
+        if idle_for > DORMANT_AFTER_SECONDS:
+            interval = DORMANT_CHECK_MS
+        elif idle_for > IDLE_AFTER_SECONDS:
+            interval = IDLE_FRAME_MS
+        if self.timer.interval() != interval:
+            self.timer.setInterval(interval)
+        
+        # Advance by elapsed time so the motion keeps its speed at any frame rate
+        steps = min((now - self.last_frame) * 1000 / ACTIVE_FRAME_MS, 10)
+        self.last_frame = now
+        if interval == DORMANT_CHECK_MS:
+            return  # Frozen until the next activity; set_status still repaints
+        
+        self.pulse_phase += self.pulse_speed * steps
+        self.rotation += 2 * steps
         self.current_radius = self.base_radius + math.sin(self.pulse_phase) * 10
         self.update()
     
+    def wake_animation(self):
+        self.last_activity = time.monotonic()
+    
+    def enterEvent(self, event):
+        self.wake_animation()
+        super().enterEvent(event)
+    
     def set_status(self, status: str):
         self.status_text = status
+        self.wake_animation()
         
         # Change colors based on status
         if "error" in status.lower() or "❌" in status:
@@ -1505,6 +3961,9 @@ class JarvisOrb(QWidget):
         elif "processing" in status.lower() or "🔍" in status:
             self.core_color = QColor(255, 200, 50)
             self.glow_color = QColor(255, 220, 100)
+        elif "warming" in status.lower() or "🔥" in status:
+            self.core_color = QColor(255, 120, 30)
+            self.glow_color = QColor(255, 170, 80)
         elif "basic" in status.lower():
             self.core_color = QColor(150, 150, 150)
             self.glow_color = QColor(200, 200, 200)
@@ -1515,9 +3974,11 @@ class JarvisOrb(QWidget):
         self.update()
     
     def stop_speaking(self):
-        """Stop current speech output"""
+        """Stop current speech output and any commands still running"""
+        cancelled = self.dispatcher.cancel_all()
+        tool_runtime.cancel_all()  # Includes tools run by voice commands
         stop_speech()
-        self.set_status("🔇 Speech Stopped")
+        self.set_status(f"🚫 Cancelled {cancelled} command(s)" if cancelled else "🔇 Speech Stopped")
         QTimer.singleShot(1000, lambda: self.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode"))
     
     def paintEvent(self, event):
@@ -1526,48 +3987,17 @@ class JarvisOrb(QWidget):
         
         center_x = self.width() // 2
         center_y = self.height() // 2 - 20
+        radius = self.frame_cache.bucket(self.current_radius)
         
-        # Animated pulse effect
-        pulse_offset = math.sin(self.pulse_phase) * 10
-        
-        # Multiple layered outer glow rings for depth
-        for i in range(8):
-            glow_radius = self.current_radius + pulse_offset + (i * 12)
-            alpha = max(0, 80 - (i * 10))
-            gradient = QRadialGradient(center_x, center_y, glow_radius)
-            gradient.setColorAt(0, QColor(self.glow_color.red(), self.glow_color.green(), self.glow_color.blue(), alpha))
-            gradient.setColorAt(0.7, QColor(self.glow_color.red(), self.glow_color.green(), self.glow_color.blue(), alpha // 3))
-            gradient.setColorAt(1, QColor(self.glow_color.red(), self.glow_color.green(), self.glow_color.blue(), 0))
-            painter.setBrush(QBrush(gradient))
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.drawEllipse(QPointF(center_x, center_y), glow_radius, glow_radius)
-        
-        # Main orb with 3D effect
-        gradient = QRadialGradient(center_x - 15, center_y - 15, self.current_radius * 1.5)
-        gradient.setColorAt(0, QColor(255, 255, 255, 250))  # Bright highlight
-        gradient.setColorAt(0.3, self.core_color)
-        gradient.setColorAt(0.7, QColor(self.core_color.red()//2, self.core_color.green()//2, self.core_color.blue()//2))
-        gradient.setColorAt(1, QColor(self.core_color.red()//3, self.core_color.green()//3, self.core_color.blue()//3))
-        painter.setBrush(QBrush(gradient))
-        
-        # Glowing edge
-        painter.setPen(QPen(QColor(255, 255, 255, 150), 3))
-        painter.drawEllipse(QPointF(center_x, center_y), self.current_radius, self.current_radius)
-        
-        # Inner glow ring
-        inner_ring_radius = self.current_radius - 10
-        inner_gradient = QRadialGradient(center_x, center_y, inner_ring_radius)
-        inner_gradient.setColorAt(0, QColor(255, 255, 255, 0))
-        inner_gradient.setColorAt(0.8, QColor(255, 255, 255, 0))
-        inner_gradient.setColorAt(1, QColor(255, 255, 255, 100))
-        painter.setBrush(QBrush(inner_gradient))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawEllipse(QPointF(center_x, center_y), inner_ring_radius, inner_ring_radius)
+        # Glow rings, core and inner ring come pre-rendered for this color and size
+        painter.drawPixmap(0, 0, self.frame_cache.get(
+            self.core_color, self.glow_color, radius, self.base_radius,
+            self.width(), self.height(), self.devicePixelRatioF()))
         
         # Rotating arc effect
         arc_path = QPainterPath()
-        arc_rect = QRectF(center_x - self.current_radius - 5, center_y - self.current_radius - 5,
-                         (self.current_radius + 5) * 2, (self.current_radius + 5) * 2)
+        arc_rect = QRectF(center_x - radius - 5, center_y - radius - 5,
+                         (radius + 5) * 2, (radius + 5) * 2)
         arc_path.arcMoveTo(arc_rect, self.rotation)
         arc_path.arcTo(arc_rect, self.rotation, 120)
         
@@ -1577,11 +4007,11 @@ class JarvisOrb(QWidget):
         # Status text with shadow
         painter.setPen(QColor(0, 0, 0, 150))
         painter.setFont(QFont("Arial", 11, QFont.Weight.Bold))
-        text_rect_shadow = QRectF(1, center_y + self.current_radius + 21, self.width(), 40)
+        text_rect_shadow = QRectF(1, center_y + radius + 21, self.width(), 40)
         painter.drawText(text_rect_shadow, Qt.AlignmentFlag.AlignCenter, self.status_text)
         
         painter.setPen(QColor(255, 255, 255))
-        text_rect = QRectF(0, center_y + self.current_radius + 20, self.width(), 40)
+        text_rect = QRectF(0, center_y + radius + 20, self.width(), 40)
         painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, self.status_text)
     
     def mousePressEvent(self, event):
@@ -1632,11 +4062,14 @@ class JarvisOrb(QWidget):
         menu.addSeparator()
         menu.addAction("⚙️ Settings", lambda: self.show_settings_dialog())
         menu.addAction("📊 System Info", lambda: self.show_info())
+        menu.addAction("⏱️ Latency Dashboard", lambda: self.show_latency_dashboard())
         
         if ai_mode_enabled:
             menu.addAction("🤖 Change AI Model", lambda: self.show_model_selector())
         
         menu.addAction("💾 Memory Manager", lambda: self.show_memory_dialog())
+        if np is not None:
+            menu.addAction("🎙️ Train Wake Word", lambda: self.request_wake_word_training())
         menu.addAction("🎨 Change Color", lambda: self.change_color())
         menu.addAction("📋 Show Tools", lambda: self.show_tools())
         menu.addSeparator()
@@ -1660,20 +4093,36 @@ class JarvisOrb(QWidget):
     
     def handle_chat_message(self, message: str):
         """Handle message from chat UI"""
-        # Process through JARVIS
-        response = process_jarvis_command(message, self)
-        
-        # Add to chat and speak (using thread-safe method)
-        self.add_conversation_to_chat(message, response)
-        
-        # Speak the response
-        speak_text(response, self)
+        # The chat window already shows the user's message; stream the reply into it
+        self.dispatcher.submit(message, lambda request: run_streamed_turn(
+            message, self, wait_for_speech=False, echo_command=False,
+            cancel_event=request.cancel_event))
+    
+    def idle_status(self) -> str:
+        return "👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode"
+    
+    def on_command_done(self, request_id: int, command: str, response: str):
+        if self.dispatcher.in_flight == 0 and not speech_worker.busy:
+            self.set_status(self.idle_status())
+    
+    def on_command_failed(self, request_id: int, command: str, error: str):
+        logging.error(f"Command '{command[:50]}' failed: {error}")
+        if self.chat_window and self.chat_window.isVisible():
+            self.chat_window.add_message("JARVIS", f"⚠️ Error: {error}", False)
+        self.set_status("⚠️ Command Failed")
+        QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
+    
+    def on_command_cancelled(self, request_id: int, command: str):
+        if self.dispatcher.in_flight == 0:
+            QTimer.singleShot(1000, lambda: self.set_status(self.idle_status()))
     
     def show_info(self):
         import platform
         
         cpu = psutil.cpu_percent()
         mem = psutil.virtual_memory().percent
+        process_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+        history = self.memory_manager.get_memory_usage()
         
         info = f"""🖥️ JARVIS SYSTEM STATUS
         
@@ -1683,8 +4132,16 @@ Python: {platform.python_version()}
 AI Mode: {'✅ Enabled' if ai_mode_enabled else '⚠️ Disabled'}
 Model: {current_model if ai_mode_enabled else 'Not available'}
 CPU Usage: {cpu}%
-Memory: {mem}%
-Sessions: {len(self.memory_manager.conversations)}
+Memory: {mem}% (JARVIS: {process_mb:.0f} MB)
+Last Prompt: ~{conversation_context.last_prompt_tokens} tokens
+Prefill: {prefill_metrics.summary()}
+Fast Path: {intent_matcher.summary()}
+Response Cache: {response_cache.summary()}
+Tools: {tool_runtime.summary()}
+Wake Word: {wake_word_gate.summary()}
+Microphone: {microphone_service.summary()}
+Sessions: {history['sessions']} ({history['loaded_sessions']} loaded)
+History In Memory: {history['loaded_messages']} messages, {history['message_bytes'] / 1024:.0f} KB
 Tools Loaded: {len(tools)}
 {'='*40}"""
         
@@ -1692,16 +4149,23 @@ Tools Loaded: {len(tools)}
     
     def show_model_selector(self):
         """Show dialog to select Ollama model"""
-        global available_models, current_model
-        
         if not ai_mode_enabled:
             QMessageBox.warning(self, "AI Disabled", 
                               "AI mode is disabled. Please install Ollama first.")
             return
+        if self.scanning_models:
+            return
         
-        # Refresh models list
+        # Ask Ollama off the GUI thread (it may still be starting); the dialog opens when it answers
+        self.scanning_models = True
         self.set_status("🔄 Scanning models...")
-        available_models = get_ollama_models()
+        threading.Thread(target=lambda: self.installed_models_signal.emit(get_ollama_models()),
+                         name="installed-models", daemon=True).start()
+    
+    def open_model_selector(self, models: list):
+        global available_models, current_model
+        self.scanning_models = False
+        available_models = models
         
         if not available_models:
             QMessageBox.warning(self, "No Models Found", 
@@ -1709,6 +4173,7 @@ Tools Loaded: {len(tools)}
                               "Make sure Ollama is running and you have models installed.\n"
                               "Install models with: ollama pull <model_name>")
             self.set_status("⚠️ No models")
+            QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
             return
         
         dialog = QDialog(self)
@@ -1723,16 +4188,31 @@ Tools Loaded: {len(tools)}
         layout.addWidget(current_label)
         
         # Model list
-        layout.addWidget(QLabel("📦 Available Ollama Models:"))
+        layout.addWidget(QLabel("📦 Available Ollama Models (🔥 = loaded in memory):"))
         model_list = QListWidget()
         
-        for model in available_models:
-            item = QListWidgetItem(f"🔹 {model}")
-            if model == current_model:
-                item.setBackground(QColor(200, 255, 200))
-                item.setText(f"✅ {model} (Current)")
-            model_list.addItem(item)
+        def mark_loaded(loaded):
+            for row in range(model_list.count()):
+                item = model_list.item(row)
+                if item.data(Qt.ItemDataRole.UserRole) in loaded and not item.text().endswith("🔥"):
+                    item.setText(f"{item.text()} 🔥")
+        
+        def fill_models(models):
+            model_list.clear()
+            for model in models:
+                item = QListWidgetItem(f"🔹 {model}")
+                item.setData(Qt.ItemDataRole.UserRole, model)
+                if model == current_model:
+                    item.setBackground(QColor(200, 255, 200))
+                    item.setText(f"✅ {model} (Current)")
+                model_list.addItem(item)
+            # Ask Ollama off the GUI thread; the 🔥 marks appear when it answers
+            threading.Thread(target=lambda: self.loaded_models_signal.emit(ollama_client.loaded_models()),
+                             name="loaded-models", daemon=True).start()
         
+        self.loaded_models_signal.connect(mark_loaded)
+        dialog.finished.connect(lambda: self.loaded_models_signal.disconnect(mark_loaded))
+        fill_models(available_models)
         layout.addWidget(model_list)
         
         # Info label
@@ -1750,9 +4230,7 @@ Tools Loaded: {len(tools)}
         def select_model():
             selected_item = model_list.currentItem()
             if selected_item:
-                # Extract model name (remove emoji and markers)
-                model_text = selected_item.text()
-                model_name = model_text.replace('🔹 ', '').replace('✅ ', '').replace(' (Current)', '')
+                model_name = selected_item.data(Qt.ItemDataRole.UserRole)
                 
                 if model_name != current_model:
                     self.set_status(f"🔄 Switching to {model_name}...")
@@ -1763,6 +4241,7 @@ Tools Loaded: {len(tools)}
                                               "The new model will be used for all future responses.")
                         dialog.close()
                         self.set_status("✅ Model changed")
+                        QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
                     except Exception as e:
                         QMessageBox.critical(self, "Error", 
                                            f"Failed to switch model:\n{str(e)}")
@@ -1772,17 +4251,21 @@ Tools Loaded: {len(tools)}
                                           f"Model {model_name} is already active.")
         
         def refresh_models():
+            refresh_btn.setEnabled(False)
             self.set_status("🔄 Refreshing...")
-            model_list.clear()
-            available_models = get_ollama_models()
-            for model in available_models:
-                item = QListWidgetItem(f"🔹 {model}")
-                if model == current_model:
-                    item.setBackground(QColor(200, 255, 200))
-                    item.setText(f"✅ {model} (Current)")
-                model_list.addItem(item)
+            threading.Thread(target=lambda: self.refreshed_models_signal.emit(get_ollama_models()),
+                             name="installed-models", daemon=True).start()
+        
+        def refreshed(models):
+            global available_models
+            available_models = models
+            fill_models(available_models)
+            refresh_btn.setEnabled(True)
             self.set_status("✅ Refreshed")
+            QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
         
+        self.refreshed_models_signal.connect(refreshed)
+        dialog.finished.connect(lambda: self.refreshed_models_signal.disconnect(refreshed))
         select_btn.clicked.connect(select_model)
         refresh_btn.clicked.connect(refresh_models)
         close_btn.clicked.connect(dialog.close)
@@ -1795,6 +4278,50 @@ Tools Loaded: {len(tools)}
         dialog.setLayout(layout)
         dialog.exec()
         self.set_status("✅ Ready")
+        QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
+    
+    def request_wake_word_training(self):
+        """Ask the engine to record wake word samples after its current phrase"""
+        wake_word_training.set()
+        self.set_status(f"🎙️ Get ready to say '{TRIGGER_WORD}'...")
+    
+    def show_latency_dashboard(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Latency Dashboard")
+        dialog.setMinimumSize(640, 420)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"⏱️ Per-phase latency over the last {turn_tracer.turns.maxlen} turns:"))
+        
+        report = QTextEdit()
+        report.setReadOnly(True)
+        font = QFont("Consolas", 9)
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        report.setFont(font)
+        report.setPlainText(turn_tracer.report())
+        layout.addWidget(report)
+        
+        def export_traces():
+            try:
+                path = turn_tracer.export()
+                QMessageBox.information(dialog, "Export", f"Saved {len(turn_tracer.turns)} turns to {path}")
+            except Exception as e:
+                QMessageBox.warning(dialog, "Export", f"Export failed: {e}")
+        
+        buttons = QHBoxLayout()
+        refresh_btn = QPushButton("🔄 Refresh")
+        export_btn = QPushButton("💾 Export JSONL")
+        close_btn = QPushButton("✖️ Close")
+        refresh_btn.clicked.connect(lambda: report.setPlainText(turn_tracer.report()))
+        export_btn.clicked.connect(export_traces)
+        close_btn.clicked.connect(dialog.close)
+        buttons.addWidget(refresh_btn)
+        buttons.addWidget(export_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        
+        dialog.setLayout(layout)
+        dialog.exec()
     
     def show_memory_dialog(self):
         dialog = QDialog(self)
@@ -1802,22 +4329,51 @@ Tools Loaded: {len(tools)}
         dialog.setMinimumSize(500, 400)
         
         layout = QVBoxLayout()
+        page_size = 50
+        
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("🔍 Search messages (Enter)...")
+        layout.addWidget(search_input)
         
         sessions_list = QListWidget()
-        for session in self.memory_manager.get_session_list():
-            item_text = f"{session['title']} - {session['message_count']} messages"
-            sessions_list.addItem(item_text)
+        loaded = {"count": 0}
+        
+        def load_more_sessions():
+            page = self.memory_manager.get_session_list(offset=loaded["count"], limit=page_size)
+            for session in page:
+                item_text = f"{session['title']} - {session['message_count']} messages"
+                sessions_list.addItem(item_text)
+            loaded["count"] += len(page)
+            more_btn.setEnabled(len(page) == page_size)
+        
+        def search_sessions():
+            query = search_input.text().strip()
+            sessions_list.clear()
+            loaded["count"] = 0
+            if not query:
+                load_more_sessions()
+                return
+            
+            for hit in self.memory_manager.search_messages(query):
+                sessions_list.addItem(f"{hit['title']} [{hit['role']}]: {hit['snippet']}")
+            more_btn.setEnabled(False)
         
         layout.addWidget(QLabel("📚 Conversation Sessions:"))
         layout.addWidget(sessions_list)
         
         buttons = QHBoxLayout()
+        more_btn = QPushButton("⬇️ Load More")
         clear_btn = QPushButton("🗑️ Clear All")
         close_btn = QPushButton("✖️ Close")
         
+        search_input.returnPressed.connect(search_sessions)
+        more_btn.clicked.connect(load_more_sessions)
         clear_btn.clicked.connect(lambda: self.clear_memory(dialog))
         close_btn.clicked.connect(dialog.close)
         
+        load_more_sessions()
+        
+        buttons.addWidget(more_btn)
         buttons.addWidget(clear_btn)
         buttons.addWidget(close_btn)
         layout.addLayout(buttons)
@@ -1831,9 +4387,7 @@ Tools Loaded: {len(tools)}
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         
         if reply == QMessageBox.StandardButton.Yes:
-            self.memory_manager.conversations.clear()
-            self.memory_manager.current_session = None
-            self.memory_manager.save_all_conversations()
+            self.memory_manager.clear_all_sessions()
             QMessageBox.information(self, "Success", "All conversations cleared!")
             dialog.close()
     
@@ -1853,7 +4407,7 @@ Tools Loaded: {len(tools)}
     
     def show_settings_dialog(self):
         """Show comprehensive settings dialog"""
-        from PyQt6.QtWidgets import QSlider, QComboBox, QSpinBox
+        from PyQt6.QtWidgets import QSlider, QComboBox, QSpinBox, QCheckBox
         
         dialog = QDialog(self)
         dialog.setWindowTitle("⚙️ JARVIS Settings")
@@ -1883,16 +4437,13 @@ Tools Loaded: {len(tools)}
         voice_layout.addWidget(QLabel("Voice:"))
         voice_combo = QComboBox()
         
-        # Get available voices
-        try:
-            temp_engine = pyttsx3.init()
-            voices = temp_engine.getProperty('voices')
-            for i, voice in enumerate(voices):
+        # Voices come from the speech worker's engine - a second engine would share its driver
+        speech_worker.ready.wait(timeout=2)
+        if speech_worker.voices:
+            for i, voice in enumerate(speech_worker.voices):
                 voice_combo.addItem(f"{i}: {voice.name}", i)
             voice_combo.setCurrentIndex(settings_manager.get('voice_id', 0))
-            temp_engine.stop()
-            del temp_engine
-        except:
+        else:
             voice_combo.addItem("Default Voice", 0)
         
         voice_layout.addWidget(voice_combo)
@@ -1948,6 +4499,21 @@ Tools Loaded: {len(tools)}
         mic_layout.addWidget(mic_combo)
         scroll_layout.addLayout(mic_layout)
         
+        # Speech recognition backend
+        recognition_layout = QHBoxLayout()
+        recognition_layout.addWidget(QLabel("Speech Recognition:"))
+        recognition_combo = QComboBox()
+        recognition_combo.addItem("Auto (offline Vosk if installed)", "auto")
+        recognition_combo.addItem("Vosk (offline, streaming)", "vosk")
+        recognition_combo.addItem("Google (online)", "google")
+        recognition_combo.setCurrentIndex(max(0, recognition_combo.findData(settings_manager.get('speech_backend', 'auto'))))
+        recognition_layout.addWidget(recognition_combo)
+        scroll_layout.addLayout(recognition_layout)
+        
+        barge_in_check = QCheckBox("Interrupt JARVIS by speaking over it (barge-in)")
+        barge_in_check.setChecked(settings_manager.get('barge_in', True))
+        scroll_layout.addWidget(barge_in_check)
+        
         # === CONVERSATION SETTINGS ===
         conv_group = QLabel("💬 Conversation")
         conv_group.setFont(QFont("Arial", 12, QFont.Weight.Bold))
@@ -1963,6 +4529,20 @@ Tools Loaded: {len(tools)}
         timeout_layout.addWidget(timeout_spin)
         scroll_layout.addLayout(timeout_layout)
         
+        # History storage backend
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("History Storage:"))
+        backend_combo = QComboBox()
+        backend_combo.addItem("JSON (snapshot + journal)", "json")
+        backend_combo.addItem("SQLite (indexed, searchable)", "sqlite")
+        backend_combo.setCurrentIndex(max(0, backend_combo.findData(settings_manager.get('memory_backend', 'json'))))
+        backend_layout.addWidget(backend_combo)
+        scroll_layout.addLayout(backend_layout)
+        
+        lazy_check = QCheckBox("Load session headers only at startup (faster with long history)")
+        lazy_check.setChecked(settings_manager.get('lazy_session_loading', False))
+        scroll_layout.addWidget(lazy_check)
+        
         # === APPEARANCE ===
         appear_group = QLabel("🎨 Appearance")
         appear_group.setFont(QFont("Arial", 12, QFont.Weight.Bold))
@@ -1990,7 +4570,11 @@ Tools Loaded: {len(tools)}
             settings_manager.set('voice_rate', rate_slider.value())
             settings_manager.set('voice_volume', volume_slider.value() / 100.0)
             settings_manager.set('microphone_index', mic_combo.currentData())
+            settings_manager.set('speech_backend', recognition_combo.currentData())
             settings_manager.set('conversation_timeout', timeout_spin.value())
+            settings_manager.set('memory_backend', backend_combo.currentData())
+            settings_manager.set('lazy_session_loading', lazy_check.isChecked())
+            settings_manager.set('barge_in', barge_in_check.isChecked())
             
             QMessageBox.information(dialog, "✅ Success", "Settings saved successfully!\nRestart JARVIS for some changes to take effect.")
         
@@ -2001,7 +4585,7 @@ Tools Loaded: {len(tools)}
             settings_manager.set('voice_volume', volume_slider.value() / 100.0)
             
             # Test speech
-            speak_text("Hello sir, this is a voice test. How do I sound?", self)
+            speak_text("Hello sir, this is a voice test. How do I sound?", self, wait=False)
         
         save_btn.clicked.connect(save_settings)
         test_voice_btn.clicked.connect(test_voice)
@@ -2229,19 +4813,28 @@ Tools Loaded: {len(tools)}
             # Show executing status
             self.set_status(f"🔧 Executing: {display_name}...")
             
-            # Process the command through JARVIS
-            try:
-                ai_response = process_jarvis_command(command, self)
-                memory_manager.add_message("user", command)
-                memory_manager.add_message("assistant", ai_response)
-                
-                # Show result in message box
+            # Process the command through JARVIS on a worker thread
+            def run_tool(request: CommandRequest) -> str:
+                trace = turn_tracer.start("tool")
+                try:
+                    with turn_tracer.activate(trace):
+                        with trace.span("process"):
+                            ai_response = process_jarvis_command(
+                                command, self, callbacks=[TraceCallbackHandler(trace)])
+                        with trace.span("persist"):
+                            memory_manager.add_message("user", command)
+                            memory_manager.add_message("assistant", ai_response)
+                finally:
+                    turn_tracer.finish(trace, command)
+                return ai_response
+            
+            def show_result(ai_response: str):
                 QMessageBox.information(self, f"✅ {display_name}", 
                                       f"{ai_response[:500]}..." if len(ai_response) > 500 else ai_response)
-            except Exception as e:
-                QMessageBox.warning(self, "⚠️ Error", f"Failed to execute tool:\n{str(e)}")
+                self.set_status("✅ Ready")
+                QTimer.singleShot(2000, lambda: self.set_status(self.idle_status()))
             
-            self.set_status("✅ Ready")
+            self.dispatcher.submit(command, run_tool, on_finished=show_result)
             
         except Exception as e:
             QMessageBox.critical(self, "❌ Error", f"Error executing tool:\n{str(e)}")
@@ -2250,209 +4843,1121 @@ Tools Loaded: {len(tools)}
 # TEXT-TO-SPEECH WITH CLEANUP
 # ============================================================================
 
-speech_active = False
-speech_paused = False
-current_engine = None
-
-def speak_text(text: str, orb: JarvisOrb = None):
-    """Speak text using TTS - reinitializes engine each time for thread safety"""
-    global speech_active, speech_paused, current_engine
+class SpeechWorker(threading.Thread):
+    """
+    Long-lived TTS thread that owns the only pyttsx3 engine. Utterances are
+    queued with a priority (lower runs first); cancel() drops everything queued
+    and stops the utterance being spoken.
+    """
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    ECHO_SECONDS = 30  # How long spoken text is remembered to recognize it coming back through the mic
+    ECHO_OVERLAP = 0.6  # Share of a transcript's words from recent speech that makes it an echo
     
-    try:
-        print(f"🔊 Attempting to speak: {text[:50]}...")
-        speech_active = True
-        speech_paused = False
-        
-        # Reinitialize engine each time for thread safety
-        current_engine = pyttsx3.init()
-        
-        # Apply voice settings from settings_manager
-        current_engine.setProperty('rate', settings_manager.get('voice_rate', 180))
-        current_engine.setProperty('volume', settings_manager.get('voice_volume', 0.9))
-        
-        # Set voice if available
-        voices = current_engine.getProperty('voices')
-        voice_id = settings_manager.get('voice_id', 0)
-        if voices and 0 <= voice_id < len(voices):
-            current_engine.setProperty('voice', voices[voice_id].id)
-        
-        # Clean text
-        clean_text = text
-        clean_text = clean_text.replace('```', '')
-        clean_text = re.sub(r'http\S+', '', clean_text)
-        clean_text = re.sub(r'[^\w\s.,!?\-:;()\[\]{}]', ' ', clean_text)
-        clean_text = ' '.join(clean_text.split())
-        
-        if len(clean_text) > 300:
-            speak_text_content = clean_text[:300] + "..."
-        else:
-            speak_text_content = clean_text
+    def __init__(self):
+        super().__init__(daemon=True, name="SpeechWorker")
+        self.utterances = queue.PriorityQueue()
+        self.recent = deque(maxlen=50)  # (monotonic time, words) of what was spoken
+        self.engine = None
+        self.voices = []
+        self.speaking = threading.Event()
+        self.ready = threading.Event()
+        self.generation = 0  # Bumped by cancel(); utterances queued before it are skipped
+        self._sequence = itertools.count()
+        self._applied_settings = None
+    
+    @property
+    def busy(self) -> bool:
+        return self.speaking.is_set() or not self.utterances.empty()
+    
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        return re.findall(r"[a-z0-9']+", text.lower())
+    
+    def is_echo(self, transcript: str) -> bool:
+        """Whether something heard during playback is mostly what JARVIS itself just said"""
+        words = self._words(transcript)
+        if not words:
+            return False
+        now = time.monotonic()
+        spoken = set()
+        for spoken_at, spoken_words in list(self.recent):
+            if now - spoken_at <= self.ECHO_SECONDS:
+                spoken.update(spoken_words)
+        return sum(word in spoken for word in words) / len(words) >= self.ECHO_OVERLAP
+    
+    def say(self, text: str, priority: int = PRIORITY_NORMAL, on_done=None) -> threading.Event:
+        """Queue an utterance; the returned event is set once it is spoken or cancelled"""
+        done = threading.Event()
+        self.utterances.put((priority, next(self._sequence), self.generation, text, done, on_done))
+        return done
+    
+    def cancel(self):
+        self.generation += 1
+        while True:
+            try:
+                item = self.utterances.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(item[4], item[5])
         
-        if not speak_text_content.strip():
-            print("⚠️ No text to speak after cleaning")
-            speech_active = False
-            current_engine = None
+        if self.speaking.is_set() and self.engine:
+            try:
+                self.engine.stop()
+            except Exception as e:
+                logging.error(f"Error stopping speech: {e}")
+    
+    def _init_engine(self):
+        self.engine = pyttsx3.init()
+        self.voices = list(self.engine.getProperty('voices') or [])
+        self._applied_settings = None
+    
+    def _apply_settings(self):
+        """Push voice settings to the engine only when they changed"""
+        wanted = (settings_manager.get('voice_rate', 180),
+                  settings_manager.get('voice_volume', 0.9),
+                  settings_manager.get('voice_id', 0))
+        if wanted == self._applied_settings:
             return
         
-        print(f"🔊 Speaking: {speak_text_content[:50]}...")
-        current_engine.say(speak_text_content)
-        current_engine.runAndWait()
-        
-        # Clean up engine
+        rate, volume, voice_id = wanted
+        self.engine.setProperty('rate', rate)
+        self.engine.setProperty('volume', volume)
+        if self.voices and 0 <= voice_id < len(self.voices):
+            self.engine.setProperty('voice', self.voices[voice_id].id)
+        self._applied_settings = wanted
+    
+    @staticmethod
+    def _finish(done: threading.Event, on_done):
+        done.set()
+        if on_done:
+            try:
+                on_done()
+            except Exception as e:
+                logging.error(f"Speech callback failed: {e}")
+    
+    def run(self):
         try:
-            current_engine.stop()
-            del current_engine
-            current_engine = None
-        except:
-            pass
-            
-        print("✅ Speech completed")
-        speech_active = False
-        
-        # Small delay to let audio device release
-        time.sleep(0.2)
+            self._init_engine()
+        except Exception as e:
+            logging.error(f"TTS Error: could not start speech engine: {e}")
+        self.ready.set()
         
-        if orb:
+        while True:
+            priority, _, generation, text, done, on_done = self.utterances.get()
+            try:
+                if generation != self.generation or self.engine is None:
+                    continue
+                self._apply_settings()
+                self.recent.append((time.monotonic(), frozenset(self._words(text))))
+                self.speaking.set()
+                print(f"🔊 Speaking: {text[:50]}...")
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                logging.error(f"TTS Error: {e}")
+                # Start over with a fresh engine rather than reuse a broken one
+                try:
+                    self._init_engine()
+                except Exception as init_error:
+                    logging.error(f"TTS Error: could not restart speech engine: {init_error}")
+                    self.engine = None
+            finally:
+                self.speaking.clear()
+                self._finish(done, on_done)
+
+speech_worker = SpeechWorker()
+speech_worker.start()
+
+def clean_text_for_speech(text: str) -> str:
+    clean_text = text
+    clean_text = clean_text.replace('```', '')
+    clean_text = re.sub(r'http\S+', '', clean_text)
+    clean_text = re.sub(r'[^\w\s.,!?\-:;()\[\]{}]', ' ', clean_text)
+    clean_text = ' '.join(clean_text.split())
+    
+    if len(clean_text) > MAX_SPOKEN_CHARS:
+        return clean_text[:MAX_SPOKEN_CHARS] + "..."
+    return clean_text
+
+def speak_text(text: str, orb: JarvisOrb = None, wait: bool = True,
+               priority: int = SpeechWorker.PRIORITY_NORMAL, on_done=None) -> Optional[threading.Event]:
+    """
+    Speak text on the shared speech worker. Blocks until it has been spoken
+    unless wait=False, in which case the completion event is returned.
+    on_done runs on the speech thread once it is spoken or cancelled.
+    """
+    speak_text_content = clean_text_for_speech(text)
+    if not speak_text_content.strip():
+        print("⚠️ No text to speak after cleaning")
+        return None
+    
+    def spoken():
+        if orb and not speech_worker.busy:
             orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
-            
-    except Exception as e:
-        print(f"❌ TTS Error: {e}")
-        logging.error(f"TTS Error: {e}")
-        import traceback
-        traceback.print_exc()
-        speech_active = False
-        current_engine = None
-        if orb:
-            orb.set_status("⚠️ TTS Error")
+        if on_done:
+            on_done()
+    
+    done = speech_worker.say(speak_text_content, priority=priority, on_done=spoken if orb or on_done else None)
+    if wait:
+        done.wait()
+    return done
 
 def stop_speech():
-    """Stop the current speech immediately"""
-    global speech_active, current_engine, speech_paused
+    """Stop the current speech immediately and drop anything queued"""
+    speech_worker.cancel()
+    print("🔇 Speech stopped")
+
+# ============================================================================
+# SPEECH RECOGNITION BACKENDS
+# ============================================================================
+
+class RecognitionStream(ABC):
+    """Incremental recognition of one utterance, fed while the user is still speaking"""
+    
+    @abstractmethod
+    def feed(self, pcm: bytes) -> Optional[str]:
+        """Add 16-bit mono audio; returns the transcript so far when it changed"""
+    
+    @abstractmethod
+    def finish(self) -> str:
+        """Final transcript (empty if nothing was understood)"""
+
+class RecognizerBackend(ABC):
+    """
+    Speech-to-text engine used by run_jarvis_engine. Streaming backends get the
+    audio chunk by chunk through start_stream(); the others get the finished
+    phrase through transcribe().
+    """
+    name = "base"
+    streaming = False
+    offline = False
+    
+    @abstractmethod
+    def transcribe(self, audio: sr.AudioData) -> str:
+        """Text of a captured phrase; raises sr.UnknownValueError if nothing was understood"""
+    
+    def start_stream(self, sample_rate: int) -> RecognitionStream:
+        """Only streaming backends (streaming = True) implement this"""
+        raise NotImplementedError(f"{self.name} backend does not stream")
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API (online, whole phrase at once)"""
+    name = "google"
+    
+    def __init__(self, recognizer: sr.Recognizer):
+        self.recognizer = recognizer
+    
+    def transcribe(self, audio: sr.AudioData) -> str:
+        return self.recognizer.recognize_google(audio)
+
+class VoskStream(RecognitionStream):
+    def __init__(self, kaldi_recognizer):
+        self.recognizer = kaldi_recognizer
+        self.segments: List[str] = []  # Vosk finalizes long utterances in pieces
+        self.text = ""
+    
+    def feed(self, pcm: bytes) -> Optional[str]:
+        if self.recognizer.AcceptWaveform(pcm):
+            segment = json.loads(self.recognizer.Result()).get("text", "")
+            if segment:
+                self.segments.append(segment)
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        
+        text = " ".join(self.segments + ([partial] if partial else []))
+        if text == self.text:
+            return None
+        self.text = text
+        return text
+    
+    def finish(self) -> str:
+        segment = json.loads(self.recognizer.FinalResult()).get("text", "")
+        return " ".join(self.segments + ([segment] if segment else []))
+
+class VoskBackend(RecognizerBackend):
+    """Offline streaming recognition with Vosk (pip install vosk, plus a model directory)"""
+    name = "vosk"
+    streaming = True
+    offline = True
+    
+    def __init__(self, model_path: str):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        start = time.perf_counter()
+        self.model = Model(model_path)
+        logging.info(f"🎙️ Vosk model loaded from {model_path} in {time.perf_counter() - start:.1f}s")
+    
+    @staticmethod
+    def available(model_path: str) -> bool:
+        return importlib.util.find_spec("vosk") is not None and os.path.isdir(model_path)
+    
+    def start_stream(self, sample_rate: int) -> RecognitionStream:
+        from vosk import KaldiRecognizer
+        return VoskStream(KaldiRecognizer(self.model, sample_rate))
+    
+    def transcribe(self, audio: sr.AudioData) -> str:
+        stream = self.start_stream(audio.sample_rate)
+        stream.feed(audio.get_raw_data(convert_width=2))
+        text = stream.finish()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+def create_recognizer_backend(recognizer: sr.Recognizer) -> RecognizerBackend:
+    """Backend chosen in settings; falls back to Google when Vosk can't be used"""
+    choice = settings_manager.get('speech_backend', 'auto')
+    model_path = settings_manager.get('vosk_model_path', VOSK_MODEL_PATH)
+    
+    if choice in ("auto", "vosk"):
+        if VoskBackend.available(model_path):
+            try:
+                return VoskBackend(model_path)
+            except Exception as e:
+                logging.error(f"Failed to load Vosk model: {e}")
+        elif choice == "vosk":
+            logging.error(f"Vosk not available: pip install vosk and unpack a model to {model_path}")
+    
+    return GoogleBackend(recognizer)
+
+# ============================================================================
+# CONTINUOUS AUDIO CAPTURE
+# ============================================================================
+
+RING_BUFFER_SECONDS = 30  # Audio kept for utterances waiting to be recognized
+MAX_QUEUED_UTTERANCES = 8
+BARGE_IN_RATIO = 1.5  # Speech must be this much louder than the peaks of JARVIS's own echo
+BARGE_IN_SECONDS = 0.3  # ...for this long to interrupt it
+MAX_UTTERANCE_SECONDS = 15  # Longer than any phrase (limit 8 s); waiting longer means capture stopped
+
+class AudioRingBuffer:
+    """
+    Preallocated circular buffer of raw audio. Positions are absolute byte
+    counts since capture started; audio older than the buffer is overwritten.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.buffer = bytearray(size)
+        self.written = 0
+        self._condition = threading.Condition()
+    
+    def write(self, data: bytes):
+        with self._condition:
+            offset = self.written % self.size
+            first = min(len(data), self.size - offset)
+            self.buffer[offset:offset + first] = data[:first]
+            if first < len(data):
+                self.buffer[:len(data) - first] = data[first:]
+            self.written += len(data)
+            self._condition.notify_all()
+    
+    def read(self, start: int, end: int) -> bytes:
+        with self._condition:
+            start = max(start, self.written - self.size)
+            end = min(end, self.written)
+            if end <= start:
+                return b""
+            offset, length = start % self.size, end - start
+            if offset + length <= self.size:
+                return bytes(self.buffer[offset:offset + length])
+            return bytes(self.buffer[offset:]) + bytes(self.buffer[:length - (self.size - offset)])
+    
+    def wait_beyond(self, position: int, timeout: float) -> int:
+        """Wait until audio past position has been written; returns the write position"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.written > position, timeout)
+            return self.written
+
+@dataclass
+class Utterance:
+    """A span of speech in the ring buffer; queued as soon as speech starts"""
+    ring: AudioRingBuffer
+    sample_rate: int
+    sample_width: int
+    start: int
+    started_at: float  # perf_counter when speech was detected
+    end: Optional[int] = None
+    ended_at: Optional[float] = None
+    discarded: bool = False  # Too short to be speech
+    during_playback: bool = False  # Overlapped JARVIS speaking (may be its own voice)
+    barge_in: bool = False  # The user interrupted JARVIS with this utterance
+    done: threading.Event = None
+    
+    def __post_init__(self):
+        self.done = threading.Event()
+    
+    def close(self, end: int, discarded: bool = False):
+        """End the utterance at ring position end (capture thread only)"""
+        self.discarded = self.discarded or discarded
+        self.end = end
+        self.ended_at = time.perf_counter()
+        self.done.set()
+    
+    def _time_left(self) -> float:
+        return self.started_at + MAX_UTTERANCE_SECONDS - time.perf_counter()
+    
+    def chunks(self):
+        """Yield the utterance's audio as it is captured, until it ends"""
+        position = self.start
+        while True:
+            finished = self.done.is_set()
+            if not finished and self._time_left() <= 0:
+                raise sr.WaitTimeoutError("utterance was never finished")
+            limit = self.ring.wait_beyond(position, 0.05) if not finished else self.end
+            if self.end is not None:
+                limit = min(limit, self.end)
+            if limit > position:
+                yield self.ring.read(position, limit)
+                position = limit
+            if finished:
+                return
+    
+    def audio_data(self) -> sr.AudioData:
+        """The whole utterance once it has ended; raises sr.WaitTimeoutError if it never does"""
+        if not self.done.wait(max(0.0, self._time_left())):
+            raise sr.WaitTimeoutError("utterance was never finished")
+        return sr.AudioData(self.ring.read(self.start, self.end), self.sample_rate, self.sample_width)
+
+class VoiceCapture:
+    """
+    Reads the microphone without pause on its own thread, so nothing said
+    while JARVIS is recognizing or thinking is lost. Speech is segmented with
+    the recognizer's energy VAD settings (energy_threshold, pause_threshold,
+    phrase_threshold) and each utterance is queued the moment it starts.
+    
+    While JARVIS speaks, the peak level of its own voice coming back through
+    the microphone is tracked; speech clearly louder than that for
+    BARGE_IN_SECONDS calls on_barge_in() and starts a barge-in utterance.
+    
+    With calibrate_seconds, the first audio only sets the energy threshold
+    (like adjust_for_ambient_noise, but without blocking the caller).
+    """
+    
+    def __init__(self, recognizer: sr.Recognizer, source: sr.Microphone, phrase_time_limit: float = 8,
+                 calibrate_seconds: float = 0):
+        self.recognizer = recognizer
+        self.source = source
+        self.phrase_time_limit = phrase_time_limit
+        self.calibrate_seconds = calibrate_seconds
+        self.calibrated = threading.Event()
+        bytes_per_second = source.SAMPLE_RATE * source.SAMPLE_WIDTH
+        self.ring = AudioRingBuffer(int(RING_BUFFER_SECONDS * bytes_per_second))
+        self.utterances: "queue.Queue[Utterance]" = queue.Queue()
+        self.on_barge_in = None
+        self.count = 0
+        self.dropped = 0
+        self.barge_ins = 0
+        self._claims = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="voice-capture", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def next_utterance(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def claim_next(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        """Take the next utterance before the queue does (chat voice input, wake word training)"""
+        box = queue.Queue(maxsize=1)
+        with self._lock:
+            self._claims.append(box)
+        try:
+            return box.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        finally:
+            with self._lock:
+                if box in self._claims:
+                    self._claims.remove(box)
+    
+    def _queue(self, utterance: Utterance):
+        self.count += 1
+        with self._lock:
+            box = self._claims.popleft() if self._claims else None
+        if box is not None:
+            box.put(utterance)
+            return
+        self.utterances.put(utterance)
+        # A consumer that fell far behind gets the most recent speech, not the oldest
+        while self.utterances.qsize() > MAX_QUEUED_UTTERANCES:
+            try:
+                stale = self.utterances.get_nowait()
+            except queue.Empty:
+                break
+            stale.discarded = True
+            self.dropped += 1
+    
+    def _barge_in(self, start: int) -> Utterance:
+        """Hand the turn to the user: stop JARVIS and open an utterance at start"""
+        self.barge_ins += 1
+        print("✋ Barge-in: user is speaking over JARVIS")
+        if self.on_barge_in:
+            try:
+                self.on_barge_in()
+            except Exception as e:
+                logging.error(f"Barge-in handler failed: {e}")
+        utterance = Utterance(self.ring, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH,
+                              start=start, started_at=time.perf_counter(), barge_in=True)
+        self._queue(utterance)
+        return utterance
+    
+    def _run(self):
+        recognizer, source = self.recognizer, self.source
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        pause_buffer_count = math.ceil(recognizer.pause_threshold / seconds_per_buffer)
+        phrase_buffer_count = math.ceil(recognizer.phrase_threshold / seconds_per_buffer)
+        barge_in_buffer_count = math.ceil(BARGE_IN_SECONDS / seconds_per_buffer)
+        chunk_bytes = source.CHUNK * source.SAMPLE_WIDTH
+        preroll_bytes = math.ceil(recognizer.non_speaking_duration / seconds_per_buffer) * chunk_bytes
+        
+        utterance = None
+        speech_count = pause_count = 0
+        echo_decay = 0.5 ** seconds_per_buffer  # Echo peak halves every second
+        echo_energy = 0.0  # Peak level of JARVIS's own voice at the microphone
+        playback_count = barge_in_count = 0
+        calibration_count = math.ceil(self.calibrate_seconds / seconds_per_buffer)
+        if not calibration_count:
+            self.calibrated.set()
+        try:
+            while not self._stop.is_set():
+                try:
+                    buffer = source.stream.read(source.CHUNK)
+                except Exception as e:
+                    logging.error(f"Audio capture error: {e}")
+                    if utterance is not None:
+                        utterance.close(self.ring.written, discarded=True)  # Its audio has a gap
+                        utterance = None
+                    time.sleep(0.1)
+                    continue
+                if not buffer:
+                    break
+                chunk_start = self.ring.written
+                self.ring.write(buffer)
+                energy = audioop.rms(buffer, source.SAMPLE_WIDTH)
+                damping = recognizer.dynamic_energy_adjustment_damping ** seconds_per_buffer
+                target_energy = energy * recognizer.dynamic_energy_ratio
+                if calibration_count:
+                    recognizer.energy_threshold = recognizer.energy_threshold * damping + target_energy * (1 - damping)
+                    calibration_count -= 1
+                    if not calibration_count:
+                        self.calibrated.set()
+                    continue
+                speaking = energy > recognizer.energy_threshold
+                
+                playing = speech_worker.busy
+                interrupted = utterance is not None and utterance.barge_in
+                if playing and not interrupted and settings_manager.get('barge_in', True):
+                    playback_count += 1
+                    # The first chunks of playback only teach the echo level
+                    if (playback_count > barge_in_buffer_count
+                            and energy > max(echo_energy, recognizer.energy_threshold) * BARGE_IN_RATIO):
+                        barge_in_count += 1
+                        if barge_in_count >= barge_in_buffer_count:
+                            if utterance is not None:
+                                utterance.close(chunk_start + len(buffer))
+                            run_start = chunk_start + len(buffer) - barge_in_count * chunk_bytes
+                            utterance = self._barge_in(max(0, run_start - chunk_bytes))
+                            speech_count, pause_count, barge_in_count = barge_in_count, 0, 0
+                            continue
+                    else:
+                        barge_in_count = 0
+                        echo_energy = max(energy, echo_energy * echo_decay)
+                else:
+                    echo_energy = 0.0
+                    playback_count = barge_in_count = 0
+                
+                if utterance is None:
+                    if speaking:
+                        utterance = Utterance(self.ring, source.SAMPLE_RATE, source.SAMPLE_WIDTH,
+                                              start=max(0, chunk_start - preroll_bytes), started_at=time.perf_counter(),
+                                              during_playback=playing)
+                        speech_count, pause_count = 1, 0
+                        self._queue(utterance)
+                    elif recognizer.dynamic_energy_threshold and not playing:
+                        # The noise profile keeps following the room (but not JARVIS's own voice)
+                        recognizer.energy_threshold = recognizer.energy_threshold * damping + target_energy * (1 - damping)
+                    continue
+                
+                if not utterance.barge_in:
+                    utterance.during_playback = utterance.during_playback or playing
+                if speaking:
+                    speech_count += 1
+                    pause_count = 0
+                else:
+                    pause_count += 1
+                duration = (self.ring.written - utterance.start) / (source.SAMPLE_RATE * source.SAMPLE_WIDTH)
+                if pause_count > pause_buffer_count or (self.phrase_time_limit and duration >= self.phrase_time_limit):
+                    utterance.close(self.ring.written, discarded=speech_count < phrase_buffer_count)
+                    utterance = None
+        finally:
+            # Nobody waiting on an utterance should wait for a capture that is gone
+            if utterance is not None:
+                utterance.close(self.ring.written, discarded=True)
+
+class MicrophoneService:
+    """
+    The one open microphone. The engine loop, chat voice input and wake word
+    training all share its capture, its recognizer (whose energy threshold is
+    the device's noise profile) and its recognition backend.
+    
+    Noise profiles are stored per device in noise_profiles.json; a device
+    without one is calibrated on the capture thread during its first second.
+    """
+    CALIBRATION_SECONDS = 1.0
+    
+    def __init__(self, path: str = NOISE_PROFILE_FILE):
+        self.path = path
+        self.recognizer = sr.Recognizer()
+        self.device_name = None
+        self.source = None
+        self.capture: Optional[VoiceCapture] = None
+        self.profile_loaded = False
+        self._backend = None
+        self._lock = threading.Lock()
+    
+    @property
+    def backend(self) -> RecognizerBackend:
+        with self._lock:
+            if self._backend is None:
+                self._backend = create_recognizer_backend(self.recognizer)
+            return self._backend
+    
+    def start(self) -> VoiceCapture:
+        """Open the configured microphone and start capturing (once)"""
+        with self._lock:
+            if self.capture is not None:
+                return self.capture
+            
+            mic_index = settings_manager.get('microphone_index')
+            self.device_name = self._device_name(mic_index)
+            self.source = sr.Microphone(device_index=mic_index).__enter__()
+            print(f"🎤 Using microphone: {self.device_name}")
+            
+            profile = self._load_profiles().get(self.device_name)
+            if profile:
+                self.recognizer.energy_threshold = profile["energy_threshold"]
+                self.profile_loaded = True
+            self.capture = VoiceCapture(self.recognizer, self.source, phrase_time_limit=8,
+                                        calibrate_seconds=0 if profile else self.CALIBRATION_SECONDS)
+            self.capture.start()
+            return self.capture
+    
+    def stop(self):
+        with self._lock:
+            if self.capture is None:
+                return
+            self.save_profile()
+            self.capture.stop()
+            try:
+                self.source.__exit__(None, None, None)
+            except Exception as e:
+                logging.error(f"Error closing microphone: {e}")
+            self.capture = self.source = None
+    
+    def claim_next(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        """Next utterance for a one-off listener; the engine loop won't see it"""
+        return self.start().claim_next(timeout)
+    
+    @staticmethod
+    def _device_name(mic_index: Optional[int]) -> str:
+        if mic_index is None:
+            return "default"
+        try:
+            return sr.Microphone.list_microphone_names()[mic_index]
+        except Exception:
+            return f"device {mic_index}"
+    
+    def _load_profiles(self) -> Dict[str, dict]:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logging.error(f"Failed to load noise profiles: {e}")
+        return {}
+    
+    def save_profile(self):
+        """Store the current energy threshold for this device"""
+        if self.capture is None or not self.capture.calibrated.is_set():
+            return
+        profiles = self._load_profiles()
+        profiles[self.device_name] = {
+            "energy_threshold": round(self.recognizer.energy_threshold, 1),
+            "updated": datetime.now().isoformat()
+        }
+        try:
+            with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            logging.error(f"Failed to save noise profile: {e}")
+    
+    def summary(self) -> str:
+        if self.capture is None:
+            return "not started"
+        origin = "stored profile" if self.profile_loaded else "calibrated at start"
+        return (f"{self.device_name}, threshold {self.recognizer.energy_threshold:.0f} ({origin}), "
+                f"{self.capture.count} utterances, {self.capture.barge_ins} barge-ins, {self.capture.dropped} dropped")
+
+microphone_service = MicrophoneService()
+
+def stream_utterance(utterance: Utterance, backend: RecognizerBackend, on_partial=None,
+                     gate=None, gate_window: float = 1.5) -> Optional[RecognitionStream]:
+    """
+    Feed an utterance to a streaming backend while it is still being spoken,
+    so only the final decode is left when the user stops.
+    
+    With a gate, the first gate_window seconds of speech are passed to
+    gate(pcm16) first and the backend only starts if it returns True;
+    otherwise None is returned once the utterance has ended.
+    """
+    def to_pcm16(buffer: bytes) -> bytes:
+        return buffer if utterance.sample_width == 2 else audioop.lin2lin(buffer, utterance.sample_width, 2)
+    
+    stream = None
+    pending = b""  # Held back until the gate decides
+    gate_bytes = int(gate_window * utterance.sample_rate) * 2
+    
+    def feed(chunk: bytes):
+        partial = stream.feed(chunk)
+        if partial and on_partial:
+            on_partial(partial)
+    
+    for chunk in utterance.chunks():
+        chunk = to_pcm16(chunk)
+        if stream is not None:
+            feed(chunk)
+            continue
+        if gate is None:
+            stream = backend.start_stream(utterance.sample_rate)
+            feed(chunk)
+            continue
+        if pending is None:
+            continue  # Rejected; let the utterance run out
+        pending += chunk
+        if len(pending) >= gate_bytes:
+            if gate(pending):
+                stream = backend.start_stream(utterance.sample_rate)
+                feed(pending)
+            pending = None
+    
+    if stream is None and pending and gate(pending):
+        # The utterance was shorter than the gate window
+        stream = backend.start_stream(utterance.sample_rate)
+        feed(pending)
+    return stream
+
+# ============================================================================
+# WAKE WORD
+# ============================================================================
+
+WAKE_WORD_NORM_FRAMES = 15  # Features are normalized by the mean of voiced frames within this many frames
+
+def mfcc_features(pcm: bytes, sample_rate: int, trim: bool = False):
+    """
+    13 MFCCs per 10 ms frame (25 ms window) of 16-bit mono audio. Each frame is
+    normalized by the mean of the nearby voiced frames, so the silence before
+    the wake word and the speech after it don't shift the frames of the word.
+    """
+    if sample_rate != 16000:
+        pcm = audioop.ratecv(pcm, 2, 1, sample_rate, 16000, None)[0]
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    frame_length, hop = 400, 160
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    count = 1 + (len(emphasized) - frame_length) // hop
+    frames = emphasized[np.arange(frame_length)[None, :] + hop * np.arange(count)[:, None]] * np.hamming(frame_length)
+    power = np.abs(np.fft.rfft(frames, 512)) ** 2 / 512
+    energy = power.sum(axis=1)
+    voiced = energy > energy.max() * 0.05
+    
+    if trim:
+        # Enrollment recordings: drop the silence around the word
+        edges = np.nonzero(voiced)[0]
+        if len(edges):
+            power = power[edges[0]:edges[-1] + 1]
+            voiced = voiced[edges[0]:edges[-1] + 1]
+    
+    # 26 triangular mel filters between 0 Hz and 8 kHz
+    mel_points = np.linspace(0, 2595 * np.log10(1 + 8000 / 700), 28)
+    bins = np.floor(513 * (700 * (10 ** (mel_points / 2595) - 1)) / 16000).astype(int)
+    filters = np.zeros((26, 257))
+    for m in range(1, 27):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        filters[m - 1, left:center] = (np.arange(left, center) - left) / max(1, center - left)
+        filters[m - 1, center:right] = (right - np.arange(center, right)) / max(1, right - center)
+    log_energies = np.log(power @ filters.T + 1e-10)
+    
+    dct = np.cos(np.pi / 26 * (np.arange(26)[None, :] + 0.5) * np.arange(13)[:, None])
+    coefficients = log_energies @ dct.T
+    
+    # Sliding mean over the voiced frames, from running sums
+    weights = voiced.astype(np.float64)
+    sums = np.concatenate((np.zeros((1, 13)), np.cumsum(coefficients * weights[:, None], axis=0)))
+    counts = np.concatenate(([0.0], np.cumsum(weights)))
+    index = np.arange(len(coefficients))
+    low = np.maximum(index - WAKE_WORD_NORM_FRAMES, 0)
+    high = np.minimum(index + WAKE_WORD_NORM_FRAMES + 1, len(coefficients))
+    mean = (sums[high] - sums[low]) / np.maximum(counts[high] - counts[low], 1)[:, None]
+    return coefficients - mean
+
+def dtw_distance(template, query, start_slack: int = 60) -> float:
+    """
+    Average frame distance of the best alignment of the whole template to part
+    of the query, starting within its first start_slack frames. Each template
+    frame advances the query by 0-2 frames, so rows only depend on the previous one.
+    """
+    query = query[:start_slack + int(len(template) * 2)]
+    cost = np.linalg.norm(template[:, None, :] - query[None, :, :], axis=2)
+    previous = np.full(len(query) + 2, np.inf)
+    previous[2:2 + start_slack] = 0.0
+    for row in cost:
+        best = np.minimum(np.minimum(previous[2:], previous[1:-1]), previous[:-2])
+        previous = np.concatenate(([np.inf, np.inf], row + best))
+    return float(previous[2:].min() / len(template))
+
+class TemplateWakeWord:
+    """Matches the start of each phrase against a few recordings of the user saying the wake word"""
+    name = "template"
+    MARGIN = 1.3  # Accept up to this much more distance than between the enrollment samples
+    
+    def __init__(self, templates: list, threshold: float):
+        self.templates = [np.asarray(template, dtype=np.float32) for template in templates]
+        self.threshold = threshold
+    
+    @classmethod
+    def enroll(cls, recordings: List[bytes], sample_rate: int) -> "TemplateWakeWord":
+        templates = [mfcc_features(pcm, sample_rate, trim=True) for pcm in recordings]
+        distances = [dtw_distance(a, b, start_slack=5) for a in templates for b in templates if a is not b]
+        return cls(templates, max(distances) * cls.MARGIN if distances else 25.0)
+    
+    @classmethod
+    def load(cls, path: str = WAKE_WORD_FILE) -> Optional["TemplateWakeWord"]:
+        try:
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data["templates"], data["threshold"])
+        except Exception as e:
+            logging.error(f"Failed to load wake word templates: {e}")
+            return None
+    
+    def save(self, path: str = WAKE_WORD_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"threshold": self.threshold,
+                       "templates": [template.round(3).tolist() for template in self.templates]}, f)
+    
+    def detect(self, pcm: bytes, sample_rate: int) -> bool:
+        query = mfcc_features(pcm, sample_rate)
+        score = min(dtw_distance(template, query) for template in self.templates)
+        return score <= self.threshold * settings_manager.get('wake_word_sensitivity', 1.0)
+
+class VoskKeywordSpotter:
+    """Vosk restricted to a one-word grammar: far cheaper than full recognition"""
+    name = "vosk keyword"
+    
+    def __init__(self, model):
+        self.model = model
+        self.grammar = json.dumps([TRIGGER_WORD, "[unk]"])
+    
+    def detect(self, pcm: bytes, sample_rate: int) -> bool:
+        from vosk import KaldiRecognizer
+        spotter = KaldiRecognizer(self.model, sample_rate, self.grammar)
+        spotter.AcceptWaveform(pcm)
+        return TRIGGER_WORD in json.loads(spotter.FinalResult()).get("text", "").split()
+
+class WakeWordGate:
+    """
+    Runs a wake-word detector on the start of each phrase outside a
+    conversation, so only phrases addressed to JARVIS reach the recognizer.
+    """
+    WINDOW_SECONDS = 1.5  # Speech checked for the wake word, after up to 0.5 s of lead-in
+    
+    def __init__(self, detector=None):
+        self.detector = detector
+        self.phrases = 0
+        self.accepted = 0
+        self.false_accepts = 0
+        self.cpu_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.detector is not None and settings_manager.get('wake_word_gate', True)
+    
+    def check(self, pcm: bytes, sample_rate: int) -> bool:
+        """pcm: 16-bit mono audio starting at the phrase"""
+        start = time.thread_time()
+        try:
+            accepted = self.detector.detect(pcm, sample_rate)
+        except Exception as e:
+            logging.error(f"Wake word detector failed, letting the phrase through: {e}")
+            accepted = True
+        with self._lock:
+            self.cpu_seconds += time.thread_time() - start
+            self.phrases += 1
+            self.accepted += accepted
+        return accepted
+    
+    def check_phrase(self, audio: sr.AudioData) -> bool:
+        """check() on a phrase captured by recognizer.listen()"""
+        window = int((self.WINDOW_SECONDS + 0.5) * audio.sample_rate) * 2
+        return self.check(audio.get_raw_data(convert_width=2)[:window], audio.sample_rate)
+    
+    def confirm(self, transcript: str):
+        """Count accepted phrases whose transcript has no wake word as false accepts"""
+        if TRIGGER_WORD not in transcript:
+            with self._lock:
+                self.false_accepts += 1
+    
+    def summary(self) -> str:
+        if self.detector is None:
+            return "off (install Vosk or train the wake word)"
+        with self._lock:
+            if not self.phrases:
+                return f"{self.detector.name}, no phrases yet"
+            rejected = self.phrases - self.accepted
+            return (f"{self.detector.name}: {self.phrases} phrases, {rejected} skipped recognition, "
+                    f"{self.false_accepts}/{self.accepted} false accepts, "
+                    f"{self.cpu_seconds * 1000 / self.phrases:.1f} ms CPU per phrase")
+
+def create_wake_word_detector(backend: RecognizerBackend):
+    """Vosk keyword spotting when Vosk is the recognizer, else trained templates, else None"""
+    if isinstance(backend, VoskBackend):
+        return VoskKeywordSpotter(backend.model)
+    if np is not None:
+        return TemplateWakeWord.load()
+    return None
+
+wake_word_gate = WakeWordGate()
+
+# Set from the orb menu; the engine thread records the samples from its own capture
+wake_word_training = threading.Event()
+
+def train_wake_word(orb, capture: VoiceCapture, samples: int = 3):
+    """Record the user saying the wake word a few times and save the templates"""
+    recordings = []
     try:
-        if current_engine and speech_active:
-            current_engine.stop()
-            speech_active = False
-            speech_paused = False
-            current_engine = None
-            print("🔇 Speech stopped")
+        while len(recordings) < samples:
+            orb.set_status(f"🎙️ Say '{TRIGGER_WORD}' ({len(recordings) + 1}/{samples})")
+            utterance = capture.next_utterance(timeout=5)
+            if utterance is None:
+                continue
+            audio = utterance.audio_data()
+            if utterance.discarded:
+                continue
+            recordings.append(audio.get_raw_data(convert_rate=16000, convert_width=2))
+        
+        detector = TemplateWakeWord.enroll(recordings, 16000)
+        detector.save()
+        if not isinstance(wake_word_gate.detector, VoskKeywordSpotter):
+            wake_word_gate.detector = detector
+        orb.set_status("✅ Wake word trained")
+        logging.info(f"🎙️ Wake word trained (threshold {detector.threshold:.1f})")
     except Exception as e:
-        print(f"Error stopping speech: {e}")
-        speech_active = False
-        speech_paused = False
+        logging.error(f"Wake word training failed: {e}")
+        orb.set_status("❌ Wake word training failed")
 
 # ============================================================================
 # MAIN JARVIS ENGINE WITH CHAT INTEGRATION
 # ============================================================================
 
 def run_jarvis_engine(orb: JarvisOrb):
-    global speech_active
-    
-    recognizer = sr.Recognizer()
-    
-    # Use configured microphone or default
-    mic_index = settings_manager.get('microphone_index')
-    if mic_index is not None:
-        mic = sr.Microphone(device_index=mic_index)
-        print(f"🎤 Using microphone index: {mic_index}")
-    else:
-        mic = sr.Microphone()
-        print("🎤 Using default microphone")
+    backend = microphone_service.backend
+    print(f"🎙️ Speech recognition: {backend.name}" + (" (offline, streaming)" if backend.offline else ""))
+    wake_word_gate.detector = create_wake_word_detector(backend)
+    print(f"👂 Wake word gate: {wake_word_gate.summary()}")
     
     conversation_mode = False
     last_interaction = time.time()
     
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source, duration=1)
+    # Capture runs from here on, also while JARVIS recognizes, thinks and speaks. A stored
+    # noise profile means no calibration pause; otherwise it calibrates in the background
+    capture = microphone_service.start()
+    startup_timeline.mark("microphone open")
+    
+    turn_cancel = None  # Cancel event of the voice turn being answered
+    
+    def barge_in():
+        # Stop talking, drop the rest of the answer and hand the turn to the user
+        speech_worker.cancel()
+        if turn_cancel is not None:
+            turn_cancel.set()
+        orb.set_status("🎤 Go ahead...")
+    
+    capture.on_barge_in = barge_in
+    
+    # Give the AI bootstrap a head start; if it is slower it announces itself
+    ollama_bootstrap.wait(timeout=BOOTSTRAP_WAIT_SECONDS)
+    
+    # Set status based on AI availability
+    if ai_mode_enabled:
+        orb.set_status("✅ Online (AI Mode)")
+        welcome_msg = "Jarvis AI advanced system ready. Say 'Jarvis' to begin."
+        speak_text(welcome_msg, orb)
         
-        # Set status based on AI availability
-        if ai_mode_enabled:
-            orb.set_status("✅ Online (AI Mode)")
-            welcome_msg = "Jarvis AI advanced system ready. Say 'Jarvis' to begin."
-            speak_text(welcome_msg, orb)
+        # Add welcome to chat (thread-safe)
+        if orb.chat_window and orb.chat_window.isVisible():
+            orb.chat_window.add_message_signal.emit("JARVIS", welcome_msg, False)
+    else:
+        orb.set_status("🛠️ Basic Mode")
+        welcome_msg = "Jarvis basic mode active. Install Ollama for AI features. Say 'Jarvis' to begin."
+        speak_text(welcome_msg, orb)
+        
+        # Add welcome to chat (thread-safe)
+        if orb.chat_window and orb.chat_window.isVisible():
+            orb.chat_window.add_message_signal.emit("JARVIS", welcome_msg, False)
+    
+    while True:
+        try:
+            if conversation_mode and (time.time() - last_interaction > CONVERSATION_TIMEOUT):
+                conversation_mode = False
+                orb.set_status("💤 Standby")
+                standby_msg = "Returning to standby."
+                speak_text(standby_msg, orb)
+                orb.update_chat_signal.emit("[Timeout]", standby_msg, False, None)
             
-            # Add welcome to chat (thread-safe)
-            if orb.chat_window and orb.chat_window.isVisible():
-                orb.chat_window.add_message_signal.emit("JARVIS", welcome_msg, False)
-        else:
-            orb.set_status("🛠️ Basic Mode")
-            welcome_msg = "Jarvis basic mode active. Install Ollama for AI features. Say 'Jarvis' to begin."
-            speak_text(welcome_msg, orb)
+            if wake_word_training.is_set():
+                # The engine doesn't listen for commands while the user records the wake word
+                wake_word_training.clear()
+                train_wake_word(orb, capture)
+                continue
             
-            # Add welcome to chat (thread-safe)
-            if orb.chat_window and orb.chat_window.isVisible():
-                orb.chat_window.add_message_signal.emit("JARVIS", welcome_msg, False)
-        
-        while True:
-            try:
-                if conversation_mode and (time.time() - last_interaction > CONVERSATION_TIMEOUT):
-                    conversation_mode = False
-                    orb.set_status("💤 Standby")
-                    standby_msg = "Returning to standby."
-                    speak_text(standby_msg, orb)
-                    orb.update_chat_signal.emit("[Timeout]", standby_msg)
+            utterance = capture.next_utterance(timeout=5)
+            if utterance is None:
+                raise sr.WaitTimeoutError()
+            if utterance.discarded:
+                continue
+            print("👂 Speech detected...")
+            trace = turn_tracer.start("voice", started=utterance.started_at)
+            # Outside a conversation only phrases starting with the wake word are recognized;
+            # interrupting JARVIS goes straight to recognition
+            gated = wake_word_gate.enabled and not conversation_mode and not utterance.barge_in
+            if backend.streaming:
+                def gate(pcm: bytes) -> bool:
+                    # Runs while the user is still talking, so it overlaps "listen"
+                    with trace.span("wake_word"):
+                        return wake_word_gate.check(pcm, utterance.sample_rate)
                 
-                print("👂 Listening for audio...")
-                audio = recognizer.listen(source, timeout=5, phrase_time_limit=8)
-                print("🎤 Audio captured, recognizing...")
-                text = recognizer.recognize_google(audio).lower()
-                logging.info(f"🎤 Detected: {text}")
+                # Partial transcripts show on the orb while the user is still talking
+                stream = stream_utterance(
+                    utterance, backend,
+                    on_partial=lambda partial: orb.set_status(f"🎤 {partial[-40:]}"),
+                    gate=gate if gated else None,
+                    gate_window=WakeWordGate.WINDOW_SECONDS)
+            else:
+                audio = utterance.audio_data()
+            trace.add("listen", utterance.started_at, utterance.ended_at)
+            if utterance.discarded:
+                continue  # Noise blip, or capture lost the audio
+            if backend.streaming and stream is None:
+                continue
+            if gated and not backend.streaming:
+                with trace.span("wake_word"):
+                    accepted = wake_word_gate.check_phrase(audio)
+                if not accepted:
+                    continue
+            print("🎤 Audio captured, recognizing...")
+            with trace.span("recognize"), orb.activity():
+                text = (stream.finish() if backend.streaming else backend.transcribe(audio)).lower()
+            if not text:
+                raise sr.UnknownValueError()
+            if utterance.during_playback and speech_worker.is_echo(text):
+                # JARVIS hearing its own voice; anything else said over it is kept
+                logging.info(f"🔁 Ignored echo of JARVIS's speech: {text}")
+                continue
+            if gated:
+                wake_word_gate.confirm(text)
+            logging.info(f"🎤 Detected: {text}")
+            
+            orb.set_status("🔍 Processing...")
+            
+            if TRIGGER_WORD in text or conversation_mode or utterance.barge_in:
+                orb.set_status("🤔 Analyzing...")
                 
-                orb.set_status("🔍 Processing...")
+                if TRIGGER_WORD in text:
+                    text = text.replace(TRIGGER_WORD, "").strip()
                 
-                if TRIGGER_WORD in text or conversation_mode:
-                    orb.set_status("🤔 Analyzing...")
+                if not text and not conversation_mode:
+                    response = "Yes sir? How can I help?"
+                    speak_text(response, orb, priority=SpeechWorker.PRIORITY_HIGH)
                     
-                    if TRIGGER_WORD in text:
-                        text = text.replace(TRIGGER_WORD, "").strip()
-                    
-                    if not text and not conversation_mode:
-                        response = "Yes sir? How can I help?"
-                        speak_text(response, orb)
-                        
-                        # Add to chat (thread-safe)
-                        orb.update_chat_signal.emit("Jarvis", response)
-                        
-                        orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
-                        conversation_mode = True
-                        last_interaction = time.time()
-                        continue
-                    
-                    if not text and conversation_mode:
-                        orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
-                        continue
-                    
-                    command = text
-                    ai_response = process_jarvis_command(command, orb)
-                    
-                    # Add to chat and speak (thread-safe)
-                    orb.update_chat_signal.emit(command, ai_response)
-                    
-                    orb.set_status("🗣️ Responding...")
-                    logging.info(f"🤖 Response: {ai_response[:100]}...")
-                    
-                    speak_text(ai_response, orb)
+                    # Add to chat (thread-safe)
+                    orb.update_chat_signal.emit("Jarvis", response, False, None)
                     
+                    orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
                     conversation_mode = True
                     last_interaction = time.time()
+                    continue
+                
+                if not text and conversation_mode:
                     orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
+                    continue
                 
-            except sr.WaitTimeoutError:
-                continue
-            except sr.UnknownValueError:
+                command = text
+                
+                # Streams the answer to the chat window and speaks it sentence by sentence
+                turn_cancel = threading.Event()
+                try:
+                    with turn_tracer.activate(trace), orb.activity():
+                        ai_response = run_streamed_turn(command, orb, cancel_event=turn_cancel)
+                    logging.info(f"🤖 Response: {ai_response[:100]}...")
+                except CommandCancelled:
+                    logging.info(f"✋ Interrupted while answering: {command[:50]}")
+                finally:
+                    turn_cancel = None
+                    turn_tracer.finish(trace, command)
+                
+                conversation_mode = True
+                last_interaction = time.time()
                 orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
-                continue
-            except Exception as e:
-                logging.error(f"Engine Error: {e}")
-                orb.set_status("⚠️ Error")
-                time.sleep(1)
+            else:
+                # Not addressed to JARVIS
                 orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
-                continue
+            
+        except sr.WaitTimeoutError:
+            continue
+        except sr.UnknownValueError:
+            orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
+            continue
+        except Exception as e:
+            logging.error(f"Engine Error: {e}")
+            orb.set_status("⚠️ Error")
+            time.sleep(1)
+            orb.set_status("👂 Listening..." if ai_mode_enabled else "🛠️ Basic Mode")
+            continue
 
 # ============================================================================
 # MAIN ENTRY
 # ============================================================================
 
 if __name__ == "__main__":
+    if "--bench-tools" in sys.argv:
+        ollama_bootstrap.start()
+        ollama_bootstrap.wait()
+        benchmark_tool_routing()
+        sys.exit(0)
+    
+    if "--tool-report" in sys.argv:
+        tool_registry.load_all()
+        print(tool_registry.report())
+        sys.exit(0)
+    
     # Create necessary directories
     os.makedirs("tools", exist_ok=True)
     os.makedirs("Jarvis_Notes", exist_ok=True)
@@ -2461,6 +5966,10 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     
+    if "--bench-chat" in sys.argv:
+        benchmark_chat_rendering()
+        sys.exit(0)
+    
     # Set high DPI awareness for Windows
     if sys.platform == "win32":
         try:
@@ -2471,6 +5980,19 @@ if __name__ == "__main__":
     
     orb = JarvisOrb(memory_manager)
     orb.show()
+    startup_timeline.mark("orb shown")
+    
+    # Probe and start Ollama in the background; basic mode until it is ready
+    orb.set_status("🔥 Warming up AI...")
+    
+    def on_ai_finished(enabled: bool):
+        # The engine announces AI mode itself; this may arrive after its welcome
+        orb.set_status(orb.idle_status())
+    
+    def on_ai_late_ready():
+        speak_text("AI systems online, sir.", orb, wait=False)
+    
+    ollama_bootstrap.start(on_finished=on_ai_finished, on_late_ready=on_ai_late_ready)
     
     # Start engine in a separate thread
     engine_thread = threading.Thread(target=run_jarvis_engine, args=(orb,), daemon=True)
@@ -2478,8 +6000,10 @@ if __name__ == "__main__":
     
     # Auto-save timer
     def auto_save():
-        if memory_manager.current_session:
+        if memory_manager.has_unsaved_changes():
             memory_manager.save_all_conversations()
+        response_cache.save()
+        microphone_service.save_profile()
     
     save_timer = QTimer()
     save_timer.timeout.connect(auto_save)
@@ -2487,8 +6011,13 @@ if __name__ == "__main__":
     
     # Exit handler
     def on_exit():
-        if memory_manager.current_session:
+        orb.dispatcher.shutdown()
+        agent_runner.shutdown()
+        tool_runtime.shutdown()
+        if memory_manager.has_unsaved_changes():
             memory_manager.save_all_conversations()
+        response_cache.save()
+        microphone_service.stop()  # Saves the noise profile and releases the device
         app.quit()
     
     app.aboutToQuit.connect(on_exit)
@@ -2505,10 +6034,7 @@ if __name__ == "__main__":
     print("   • Hyperrealistic orb interface with taskbar icon")
     print("   • Cool interactive chat UI (Ctrl+C to open)")
     print("="*70)
-    print(f"🤖 AI Mode: {'✅ ENABLED' if ai_mode_enabled else '⚠️ DISABLED (Install Ollama)'}")
-    if ai_mode_enabled:
-        print(f"📦 AI Model: {current_model}")
-        print(f"📦 Available Models: {len(available_models)} ({', '.join(available_models[:3])}{'...' if len(available_models) > 3 else ''})")
+    print("🤖 AI Mode: 🔥 Warming up in the background (basic mode until ready)")
     print(f"🔧 Loaded {len(tools)} tools successfully!")
     print("💡 SAY COMMANDS:")
     print("   • 'Jarvis' followed by your command")
@@ -0,0 +1,14 @@
+"""
+Test setup: main.py is imported as a module, in a scratch working directory so
+the settings, history and cache files it reads and writes at import time are
+not the user's. Needs the packages from requirements.txt (PyQt6, langchain...).
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.chdir(tempfile.mkdtemp(prefix="jarvis-tests-"))
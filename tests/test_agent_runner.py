@@ -0,0 +1,32 @@
+import asyncio
+
+from main import AsyncAgentRunner
+
+
+async def call(log, name, seconds):
+    log.append(f"{name} start")
+    await asyncio.sleep(seconds)
+    log.append(f"{name} end")
+
+
+def run_calls(calls):
+    """calls: (name, run_key, seconds), created in order like one agent step"""
+    runner = AsyncAgentRunner()
+    log = []
+
+    async def main():
+        await asyncio.gather(*[runner.ordered(call(log, name, seconds), key) for name, key, seconds in calls])
+
+    asyncio.run(main())
+    return log, runner
+
+
+def test_calls_of_one_run_keep_their_order():
+    log, runner = run_calls([("type", "run1", 0.05), ("press", "run1", 0)])
+    assert log == ["type start", "type end", "press start", "press end"]
+    assert runner._ordered_tails == {}
+
+
+def test_unrelated_runs_do_not_wait_for_each_other():
+    log, _ = run_calls([("slow command", "run1", 0.1), ("open app", "run2", 0)])
+    assert log.index("open app end") < log.index("slow command end")
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+import main
+from main import AudioRingBuffer, Utterance
+
+
+def test_read_across_the_wraparound():
+    ring = AudioRingBuffer(8)
+    ring.write(b"abcdef")
+    ring.write(b"ghij")  # Wraps: the buffer now holds "cdefghij"
+    assert ring.written == 10
+    assert ring.read(4, 10) == b"efghij"
+    assert ring.read(6, 8) == b"gh"
+
+
+def test_overwritten_audio_is_clamped_away():
+    ring = AudioRingBuffer(8)
+    ring.write(b"0123456789")
+    assert ring.read(0, 10) == b"23456789"
+    assert ring.read(0, 2) == b""
+    assert ring.read(8, 20) == b"89"  # Nothing past what was written
+
+
+def test_wait_beyond_wakes_on_write():
+    ring = AudioRingBuffer(8)
+    threading.Timer(0.05, ring.write, (b"ab",)).start()
+    assert ring.wait_beyond(0, timeout=2) == 2
+    assert ring.wait_beyond(2, timeout=0.01) == 2
+
+
+def utterance(ring, start=0):
+    return Utterance(ring, 16000, 2, start, time.perf_counter())
+
+
+def test_chunks_follow_capture_until_close():
+    ring = AudioRingBuffer(64)
+    ring.write(b"xx")
+    speech = utterance(ring, start=2)
+
+    def capture():
+        for chunk in (b"ab", b"cd", b"ef"):
+            time.sleep(0.02)
+            ring.write(chunk)
+        speech.close(ring.written - 2)  # The trailing "ef" is silence
+
+    threading.Thread(target=capture).start()
+    assert b"".join(speech.chunks()) == b"abcd"
+    assert speech.audio_data().get_raw_data() == b"abcd"
+    assert not speech.discarded
+
+
+def test_close_keeps_discarded():
+    speech = utterance(AudioRingBuffer(8))
+    speech.close(0, discarded=True)
+    speech.close(0)
+    assert speech.discarded and speech.done.is_set()
+
+
+def test_unfinished_utterance_times_out(monkeypatch):
+    monkeypatch.setattr(main, "MAX_UTTERANCE_SECONDS", 0.1)
+    ring = AudioRingBuffer(8)
+    with pytest.raises(main.sr.WaitTimeoutError):
+        utterance(ring).audio_data()
+    with pytest.raises(main.sr.WaitTimeoutError):
+        list(utterance(ring).chunks())
@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+
+import main
+import tools.app_launcher
+from main import INTENTS, IntentMatcher, intent
+
+
+class FakeTool:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def invoke(self, arguments):
+        self.calls.append(arguments)
+        return self.result
+
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher(INTENTS, system="Windows")
+
+
+def matched_name(matcher, text):
+    matched = matcher.match(text)
+    return matched[0].name if matched else None
+
+
+def test_politeness_is_stripped(matcher):
+    assert matched_name(matcher, "Hey Jarvis, could you please take a screenshot for me.") == "screenshot"
+    assert matched_name(matcher, "scroll down 3 please") == "scroll"
+
+
+def test_arguments_are_extracted(matcher):
+    candidate, match = matcher.match("set the volume to 150%")
+    assert candidate.arguments(match) == {"action": "set", "level": 100}
+    candidate, match = matcher.match("press ctrl + shift + esc")
+    assert candidate.arguments(match) == {"key_combination": "ctrl+shift+esc"}
+
+
+def test_compound_requests_fall_through(matcher):
+    assert matcher.match("take a screenshot and then lock the computer") is None
+    assert matcher.match("what is the weather like") is None
+    # Free text may contain blocker words
+    assert matched_name(matcher, "type salt and pepper") == "type_text"
+
+
+def test_platform_gating():
+    assert matched_name(IntentMatcher(INTENTS, system="Windows"), "volume up") == "volume_up"
+    assert IntentMatcher(INTENTS, system="Linux").match("volume up") is None
+    assert matched_name(IntentMatcher(INTENTS, system="Linux"), "mute") == "mute"
+
+
+def test_apps_must_be_installed(matcher, monkeypatch):
+    monkeypatch.setattr(main.installed_apps, "names", lambda: frozenset({"spotify", "visual studio code"}))
+    assert matched_name(matcher, "open Spotify") == "open_app"
+    assert matched_name(matcher, "launch visual studio code") == "open_app"
+    assert matcher.match("close the window") is None
+    assert matcher.match("open the pod bay doors") is None
+
+
+def test_installed_apps_reload_when_the_cache_is_rewritten(tmp_path, monkeypatch):
+    cache = tmp_path / "apps.json"
+    monkeypatch.setattr(tools.app_launcher, "APP_CACHE_FILE", str(cache))
+    apps = main.InstalledApps()
+    assert apps.names() == frozenset()
+
+    cache.write_text(json.dumps({"Spotify": "spotify.exe"}))
+    assert apps.names() == {"spotify"}
+    cache.write_text(json.dumps({"Discord": "discord.exe"}))
+    os.utime(cache, (1, 1))
+    assert apps.names() == {"discord"}
+
+
+def fake_matcher(monkeypatch, result, retryable=True):
+    tool = FakeTool(result)
+    monkeypatch.setitem(main.tool_registry.tools, "fake_tool", tool)
+    return IntentMatcher([intent("fake", r"do the thing", "fake_tool", lambda m: {"x": 1}, retryable=retryable)]), tool
+
+
+def test_handle_runs_the_tool_and_counts_hits(monkeypatch):
+    matcher, tool = fake_matcher(monkeypatch, "✅ Done")
+    assert matcher.handle("do the thing") == "✅ Done"
+    assert matcher.handle("do something else") is None
+    assert tool.calls == [{"x": 1}]
+    assert matcher.summary().startswith("1/2 requests (50%)")
+
+
+def test_reported_failure_falls_back_to_the_agent(monkeypatch):
+    monkeypatch.setattr(main, "ai_mode_enabled", True)
+    matcher, _ = fake_matcher(monkeypatch, "❌ App not found")
+    assert matcher.handle("do the thing") is None
+    assert matcher.intents[0].errors == 1
+    assert matcher.summary().startswith("0/1 requests")
+
+
+def test_reported_failure_is_returned_without_the_agent(monkeypatch):
+    monkeypatch.setattr(main, "ai_mode_enabled", False)
+    matcher, _ = fake_matcher(monkeypatch, "❌ App not found")
+    assert matcher.handle("do the thing") == "❌ App not found"
+
+
+def test_failed_action_is_not_repeated_by_the_agent(monkeypatch):
+    monkeypatch.setattr(main, "ai_mode_enabled", True)
+    matcher, tool = fake_matcher(monkeypatch, "❌ Typing stopped halfway", retryable=False)
+    assert matcher.handle("do the thing") == "❌ Typing stopped halfway"
+    assert len(tool.calls) == 1
+
+
+def test_only_read_only_or_idempotent_intents_are_retried():
+    retryable = {i.name for i in INTENTS if i.retryable}
+    assert {"battery", "city_time", "mute"} <= retryable
+    assert not {"type_text", "press_key", "close_app", "open_app", "quick_note", "volume_up"} & retryable
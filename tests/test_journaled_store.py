@@ -0,0 +1,102 @@
+import json
+
+from main import ConversationMemory, JournaledConversationStore
+
+
+def make_store(tmp_path, **kwargs):
+    return JournaledConversationStore(str(tmp_path / "history.json"), str(tmp_path / "history.journal"),
+                                      str(tmp_path / "history.index.json"), **kwargs)
+
+
+def new_session(session_id="s1", title="Test"):
+    return ConversationMemory(session_id=session_id, timestamp="2024-01-01T00:00:00", title=title, messages=[])
+
+
+def message(content, role="user"):
+    return {"role": role, "content": content, "timestamp": "2024-01-01T00:00:01"}
+
+
+def test_journal_is_replayed_without_compaction(tmp_path):
+    store = make_store(tmp_path)
+    store.save_session(new_session())
+    store.append_message("s1", message("hello"))
+    store.append_message("s1", message("hi sir", "assistant"))
+
+    conversations = make_store(tmp_path).load_all()
+    assert [m["content"] for m in conversations["s1"].messages] == ["hello", "hi sir"]
+
+
+def test_compaction_truncates_journal_and_keeps_messages(tmp_path):
+    store = make_store(tmp_path)
+    store.save_session(new_session())
+    store.append_message("s1", message("hello"))
+    conversations = make_store(tmp_path).load_all()
+
+    store.compact(conversations)
+    assert (tmp_path / "history.journal").read_text() == ""
+    assert make_store(tmp_path).load_all()["s1"].messages[0]["content"] == "hello"
+
+
+def test_torn_final_record_is_skipped(tmp_path):
+    store = make_store(tmp_path)
+    store.save_session(new_session())
+    store.append_message("s1", message("kept"))
+    with open(tmp_path / "history.journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "message", "session_id": "s1", "mess')
+
+    conversations = make_store(tmp_path).load_all()
+    assert [m["content"] for m in conversations["s1"].messages] == ["kept"]
+
+    # The next append starts on a fresh line instead of extending the torn one
+    reopened = make_store(tmp_path)
+    reopened.load_all()
+    reopened.append_message("s1", message("after crash"))
+    assert [m["content"] for m in make_store(tmp_path).load_all()["s1"].messages] == ["kept", "after crash"]
+
+
+def test_records_folded_into_snapshot_are_not_replayed_twice(tmp_path):
+    store = make_store(tmp_path)
+    store.save_session(new_session())
+    store.append_message("s1", message("once"))
+    journal = (tmp_path / "history.journal").read_text()
+    store.compact(make_store(tmp_path).load_all())
+
+    # Crash between writing the snapshot and truncating the journal
+    (tmp_path / "history.journal").write_text(journal)
+    assert len(make_store(tmp_path).load_all()["s1"].messages) == 1
+
+
+def test_delete_session(tmp_path):
+    store = make_store(tmp_path)
+    store.save_session(new_session("s1"))
+    store.save_session(new_session("s2"))
+    store.delete_session("s1")
+    assert list(make_store(tmp_path).load_all()) == ["s2"]
+
+
+def test_lazy_headers_then_messages_on_demand(tmp_path):
+    store = make_store(tmp_path, lazy=True)
+    store.save_session(new_session())
+    store.append_message("s1", message("in snapshot"))
+    store.compact(make_store(tmp_path).load_all())
+    store.append_message("s1", message("in journal"))
+
+    lazy = make_store(tmp_path, lazy=True)
+    headers = lazy.load_headers()
+    assert headers["s1"].messages is None
+    assert headers["s1"].get_message_count() == 2
+    assert [m["content"] for m in lazy.load_messages("s1")] == ["in snapshot", "in journal"]
+
+
+def test_stale_index_falls_back_to_full_load(tmp_path):
+    store = make_store(tmp_path, lazy=True)
+    store.save_session(new_session())
+    store.append_message("s1", message("hello"))
+    store.compact(make_store(tmp_path).load_all())
+
+    index = json.loads((tmp_path / "history.index.json").read_text())
+    index["snapshot_size"] += 1
+    (tmp_path / "history.index.json").write_text(json.dumps(index))
+
+    headers = make_store(tmp_path, lazy=True).load_headers()
+    assert headers["s1"].messages[0]["content"] == "hello"
@@ -0,0 +1,56 @@
+from main import ResponseCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "responses.json"), **kwargs)
+
+
+def test_key_ignores_politeness_and_punctuation(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.key("Jarvis, what can you do?", "llama3") == cache.key("what can you do", "llama3")
+    assert cache.key("what can you do", "llama3") != cache.key("what can you do", "qwen3")
+
+
+def test_context_dependent_requests_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    for text in ("what did I say earlier", "tell me a joke", "what's my name", "explain that again", "..."):
+        assert cache.key(text, "llama3") is None, text
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", "a", "A")
+    cache.put("b", "b", "B")
+    assert cache.get("a") == "A"  # "b" is now the oldest
+    cache.put("c", "c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.evictions == 1
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("a", "a", "A")
+    cache.entries["a"]["created"] -= 61
+    assert cache.get("a") is None
+    assert "a" not in cache.entries
+
+
+def test_save_and_load_keep_lru_order_and_skip_expired(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("old", "old", "Old")
+    cache.put("a", "a", "A")
+    cache.put("b", "b", "B")
+    cache.get("a")
+    cache.entries["old"]["created"] -= 61
+    cache.save()
+    assert not cache.dirty
+
+    reloaded = make_cache(tmp_path, ttl=60)
+    assert list(reloaded.entries) == ["b", "a"]
+    assert reloaded.get("a") == "A"
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    (tmp_path / "responses.json").write_text("{not json")
+    assert make_cache(tmp_path).entries == {}
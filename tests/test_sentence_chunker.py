@@ -0,0 +1,45 @@
+from main import SentenceChunker, StreamingResponseHandler
+
+
+def test_sentences_are_emitted_once_complete():
+    chunker = SentenceChunker()
+    assert chunker.feed("The weather today is") == []
+    assert chunker.feed(" sunny and warm. Tomorrow") == ["The weather today is sunny and warm."]
+    assert chunker.feed(" it will rain!\n") == ["Tomorrow it will rain!"]
+    assert chunker.flush() is None
+
+
+def test_short_fragments_merge_into_the_next_sentence():
+    chunker = SentenceChunker()
+    assert chunker.feed("Sure. ") == []
+    assert chunker.feed("Opening the calculator now. ") == ["Sure. Opening the calculator now."]
+
+
+def test_token_by_token_stream_matches_whole_text():
+    text = "Hello there, sir. The file was saved to your desktop. Anything else?"
+    chunker = SentenceChunker()
+    sentences = []
+    for i, token in enumerate(text.split(" ")):
+        sentences += chunker.feed(token if i == 0 else " " + token)
+    assert sentences == ["Hello there, sir.", "The file was saved to your desktop."]
+    assert chunker.flush() == "Anything else?"
+
+
+def test_decimals_and_newlines():
+    chunker = SentenceChunker()
+    assert chunker.feed("Version 3.12 is installed\nNext line") == ["Version 3.12 is installed"]
+    assert chunker.flush() == "Next line"
+
+
+def test_text_before_a_tool_call_is_not_the_answer():
+    sentences = []
+    handler = StreamingResponseHandler(on_sentence=sentences.append)
+    handler.on_llm_new_token("Sure, let me open that.")
+    handler.on_llm_end(None)
+    handler.on_tool_start({}, "chrome")
+    assert sentences == ["Sure, let me open that."]
+    assert handler.answer_text == ""
+
+    handler.on_llm_new_token("Chrome is open now, sir.")
+    assert handler.answer_text == "Chrome is open now, sir."
+    assert handler.streamed_text == "Sure, let me open that.Chrome is open now, sir."
@@ -0,0 +1,52 @@
+from main import SessionChatHistory, estimate_tokens
+
+
+def history(budget, *contents):
+    h = SessionChatHistory(token_budget=budget)
+    for i, content in enumerate(contents):
+        h.append("user" if i % 2 == 0 else "assistant", content)
+    return h
+
+
+def test_estimate_tokens_is_at_least_one():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 40) == 10
+
+
+def test_oldest_messages_are_evicted_to_fit_the_budget():
+    h = history(20, "a" * 40, "b" * 40, "c" * 40)
+    assert [m.content[0] for m in h.messages] == ["b", "c"]
+    assert h.window_tokens == 20
+    assert h.evicted_count == 1
+    assert h.messages_between(0, h.evicted_count)[0].content == "a" * 40
+
+
+def test_newest_message_is_kept_even_over_budget():
+    h = history(5, "a" * 8, "b" * 400)
+    assert [m.content[0] for m in h.messages] == ["b"]
+    assert h.window_tokens == 100
+
+
+def test_unknown_roles_are_ignored():
+    h = SessionChatHistory()
+    h.append("system", "ignored")
+    assert h.messages == []
+
+
+def test_set_token_budget_grows_and_shrinks_the_window():
+    h = history(10, "a" * 40, "b" * 40, "c" * 40)
+    assert h.evicted_count == 2
+
+    h.set_token_budget(30)
+    assert [m.content[0] for m in h.messages] == ["a", "b", "c"]
+    assert h.window_tokens == 30
+
+    h.set_token_budget(25)
+    assert [m.content[0] for m in h.messages] == ["b", "c"]
+    assert h.evicted_count == 1
+
+
+def test_clear_resets_the_window():
+    h = history(10, "a" * 40, "b" * 40)
+    h.clear()
+    assert h.messages == [] and h.window_tokens == 0 and h.evicted_count == 0
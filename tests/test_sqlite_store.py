@@ -0,0 +1,81 @@
+import pytest
+
+from main import ConversationMemory, SQLiteConversationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteConversationStore(str(tmp_path / "history.db"))
+
+
+def session(session_id, messages=None, timestamp="2024-01-01T00:00:00"):
+    return ConversationMemory(session_id=session_id, timestamp=timestamp, title=f"Title {session_id}",
+                              messages=messages if messages is not None else [])
+
+
+def message(content, role="user"):
+    return {"role": role, "content": content, "timestamp": "2024-01-01T00:00:01"}
+
+
+def test_headers_count_messages_without_loading_them(store):
+    store.save_session(session("s1"))
+    store.append_message("s1", message("hello"))
+    store.append_message("s1", message("hi sir", "assistant"))
+
+    header = store.load_headers()["s1"]
+    assert header.messages is None
+    assert header.get_message_count() == 2
+    assert [m["content"] for m in store.load_messages("s1")] == ["hello", "hi sir"]
+
+
+def test_list_sessions_pages_newest_first(store):
+    for day in range(1, 6):
+        store.save_session(session(f"s{day}", timestamp=f"2024-01-0{day}T00:00:00"))
+    assert [s["id"] for s in store.list_sessions(limit=2)] == ["s5", "s4"]
+    assert [s["id"] for s in store.list_sessions(offset=4)] == ["s1"]
+
+
+def test_search_treats_input_as_plain_terms(store):
+    store.save_session(session("s1"))
+    store.append_message("s1", message("remind me about the dentist"))
+    store.append_message("s1", message("open spotify"))
+
+    results = store.search_messages('dentist "OR')
+    assert [r["session_id"] for r in results] == []
+    results = store.search_messages("dentist")
+    assert len(results) == 1 and "dentist" in results[0]["snippet"]
+
+
+def test_delete_cascades_to_messages(store):
+    store.save_session(session("s1"))
+    store.append_message("s1", message("hello"))
+    store.delete_session("s1")
+    assert store.load_headers() == {}
+    assert store.load_messages("s1") == []
+    assert store.search_messages("hello") == []
+
+
+def test_import_is_recorded_and_not_duplicated(store):
+    assert not store.import_completed()
+    conversations = {"s1": session("s1", [message("one"), message("two", "assistant")])}
+    store.import_conversations(conversations)
+    store.import_conversations(conversations)
+
+    assert store.import_completed()
+    assert store.load_headers()["s1"].get_message_count() == 2
+    assert len(store.load_messages("s1")) == 2
+
+
+def test_import_finishes_a_session_left_empty_by_an_interrupted_import(store):
+    store.save_session(session("s1"))  # Header written, messages never were
+    store.import_conversations({"s1": session("s1", [message("one")]), "s2": session("s2", [message("two")])})
+    assert [m["content"] for m in store.load_messages("s1")] == ["one"]
+    assert [m["content"] for m in store.load_messages("s2")] == ["two"]
+
+
+def test_failed_import_rolls_back_completely(store):
+    broken = session("s2", [{"role": "user"}])  # No content: the insert fails midway
+    with pytest.raises(KeyError):
+        store.import_conversations({"s1": session("s1", [message("one")]), "s2": broken})
+    assert store.is_empty()
+    assert not store.import_completed()
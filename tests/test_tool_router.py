@@ -0,0 +1,36 @@
+from main import TOOL_GROUPS, TOOL_ROUTING_CASES, ToolRouter, routing_tokens, tool_router, tools
+
+
+def bound_tools(text):
+    profile = tool_router.select(text)
+    return tool_router.profiles[profile] if profile else tools
+
+
+def test_profiles_follow_the_tool_groups():
+    assert list(tool_router.profiles) == list(TOOL_GROUPS)
+    assert [t.name for t in tool_router.tools] == [t.name for t in tools]
+
+
+def test_expected_tool_is_always_bound():
+    for text, expected in TOOL_ROUTING_CASES:
+        assert expected in [t.name for t in bound_tools(text)], text
+
+
+def test_most_requests_are_routed_to_one_profile():
+    routed = [text for text, _ in TOOL_ROUTING_CASES if tool_router.select(text)]
+    assert len(routed) >= len(TOOL_ROUTING_CASES) * 3 // 4
+
+
+def test_unrelated_request_binds_all_tools():
+    assert tool_router.select("hello") is None
+    assert tool_router.select("") is None
+
+
+def test_close_scores_across_profiles_bind_all_tools():
+    a = tool_router.profiles["pc"][0]
+    b = tool_router.profiles["media"][0]
+    router = ToolRouter({"first": [a], "second": [b]})
+    assert router.select(" ".join(routing_tokens(a.name))) == "first"
+    # The same tool in both profiles: neither wins clearly
+    twins = ToolRouter({"first": [a], "second": [a.model_copy(update={"name": a.name + "_again"})]})
+    assert twins.select(" ".join(routing_tokens(a.description))) is None
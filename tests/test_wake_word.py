@@ -0,0 +1,52 @@
+import numpy as np
+
+from main import TemplateWakeWord, dtw_distance, mfcc_features
+
+RATE = 16000
+
+
+def word(pitches, seed, seconds=0.15, lead=0.0):
+    """A synthetic 'word': consecutive tones with a little noise, after `lead` seconds of near-silence"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RATE)) / RATE
+    signal = np.concatenate([np.zeros(int(lead * RATE))] +
+                            [0.5 * np.sin(2 * np.pi * pitch * (1 + rng.uniform(-0.02, 0.02)) * t) for pitch in pitches])
+    signal += rng.normal(0, 0.01, len(signal))
+    return (signal * 32767).astype(np.int16).tobytes()
+
+
+WAKE = (300, 900, 1800)
+
+
+def test_identical_sequences_have_zero_distance():
+    features = mfcc_features(word(WAKE, 0), RATE)
+    assert dtw_distance(features, features, start_slack=1) < 1e-4
+
+
+def test_template_is_found_after_a_lead_in():
+    template = mfcc_features(word(WAKE, 0), RATE, trim=True)
+    late = mfcc_features(word(WAKE, 1, lead=0.3), RATE)
+    other = mfcc_features(word(WAKE[::-1], 1, lead=0.3), RATE)
+    assert dtw_distance(template, late) < dtw_distance(template, other) / 2
+
+
+def test_features_are_resampled_to_16k():
+    assert mfcc_features(b"\0\0" * 8000, 8000).shape == mfcc_features(b"\0\0" * 16000, RATE).shape
+
+
+def test_enroll_save_load_detect(tmp_path):
+    detector = TemplateWakeWord.enroll([word(WAKE, seed) for seed in range(3)], RATE)
+    path = str(tmp_path / "wake_word.json")
+    detector.save(path)
+    loaded = TemplateWakeWord.load(path)
+
+    assert loaded.threshold == detector.threshold
+    assert len(loaded.templates) == 3
+    assert loaded.detect(word(WAKE, 7, lead=0.2) + word((500,), 8, seconds=0.5), RATE)
+    assert not loaded.detect(word((1200, 400, 2500), 7, lead=0.2), RATE)
+
+
+def test_missing_or_corrupt_file_loads_nothing(tmp_path):
+    assert TemplateWakeWord.load(str(tmp_path / "missing.json")) is None
+    (tmp_path / "bad.json").write_text("{}")
+    assert TemplateWakeWord.load(str(tmp_path / "bad.json")) is None
@@ -13,6 +13,8 @@ import time
 import logging
 from pathlib import Path
 
+from tools import runtime
+
 APP_CACHE_FILE = "installed_apps_cache.json"
 
 def scan_installed_applications():
@@ -34,11 +36,13 @@ def scan_installed_applications():
         
         # Scan directories for executables
         for search_dir in search_dirs:
-            if not os.path.exists(search_dir):
+            if not os.path.exists(search_dir) or runtime.cancelled():
                 continue
                 
             try:
                 for root, dirs, files in os.walk(search_dir):
+                    if runtime.cancelled():
+                        break
                     # Skip deep nesting for performance
                     depth = root[len(search_dir):].count(os.sep)
                     if depth > 3:
@@ -92,6 +96,10 @@ def scan_installed_applications():
         
         print(f"✅ Found {len(apps_dict)} applications")
     
+    # A cancelled scan is incomplete; use it for now but don't cache it
+    if runtime.cancelled():
+        return apps_dict
+    
     # Save cache
     try:
         with open(APP_CACHE_FILE, 'w') as f:
@@ -6,8 +6,11 @@ from langchain.tools import tool
 import platform
 import subprocess
 import os
+import time
 from typing import Optional
 
+from tools import runtime
+
 
 @tool("control_volume", return_direct=True)
 def control_volume(action: str, level: int = None) -> str:
@@ -190,11 +193,18 @@ def record_audio(duration: int = 5) -> str:
         sample_rate = 44100
         
         print(f"🎤 Recording for {duration} seconds...")
+        started = time.time()
         recording = sd.rec(int(duration * sample_rate), 
                           samplerate=sample_rate, 
                           channels=2, 
                           dtype=np.int16)
-        sd.wait()
+        if runtime.sleep(duration):
+            sd.wait()
+        else:
+            # Cancelled: keep what has been recorded so far
+            sd.stop()
+            duration = round(time.time() - started, 1)
+            recording = recording[:int(duration * sample_rate)]
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         recordings_dir = os.path.join(os.getcwd(), "recordings")
@@ -11,6 +11,8 @@ import requests
 from datetime import datetime
 import json
 
+from tools import runtime
+
 
 @tool("get_network_info", return_direct=True)
 def get_network_info() -> str:
@@ -69,10 +71,10 @@ def network_speed_test() -> str:
             param = '-n' if platform.system().lower() == 'windows' else '-c'
             command = ['ping', param, '4', host]
             try:
-                result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+                result, stopped = runtime.run_process(command, timeout=10)
                 if "time=" in result.stdout or "Average" in result.stdout:
                     return "✅ Connected"
-                return "❌ Failed"
+                return "❌ Timeout" if stopped else "❌ Failed"
             except:
                 return "❌ Timeout"
         
@@ -85,8 +87,12 @@ def network_speed_test() -> str:
         result += "═" * 60 + "\n"
         
         for name, host in hosts.items():
+            if runtime.cancelled():
+                break
             status = ping_host(host)
-            result += f"📡 **{name} ({host}):** {status}\n"
+            line = f"📡 **{name} ({host}):** {status}"
+            runtime.report_partial(line)
+            result += line + "\n"
         
         # Network stats
         net_io = psutil.net_io_counters()
@@ -16,6 +16,8 @@ import webbrowser
 import shutil
 from pathlib import Path
 
+from tools import runtime
+
 # Windows-specific imports
 if platform.system() == "Windows":
     try:
@@ -632,28 +634,28 @@ def close_application(app_name: str) -> str:
 def execute_command(command: str) -> str:
     """Execute a system command."""
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=20
-        )
+        # Killed early if the user cancels; whatever it printed so far is kept.
+        # The timeout stays below the tool's 20 s budget in main.TOOL_BUDGETS so it
+        # is reported as a timeout, not as a cancellation by the runtime.
+        result, stopped = runtime.run_process(command, shell=True, timeout=18)
         
-        output = result.stdout.strip()[:500]
-        error = result.stderr.strip()[:500]
+        output = (result.stdout or "").strip()[:500]
+        error = (result.stderr or "").strip()[:500]
         
         response = f"💻 **Command:** `{command}`\n\n"
+        if stopped == "timed out":
+            response = "⏰ **Command timed out after 18 seconds**\n\n" + response
+        elif stopped:
+            response = "🚫 **Command cancelled**\n\n" + response
         if output:
             response += f"📤 **Output:**\n```\n{output}\n```\n"
         if error:
             response += f"❌ **Error:**\n```\n{error}\n```\n"
-        response += f"📟 **Exit code:** {result.returncode}"
+        if not stopped:
+            response += f"📟 **Exit code:** {result.returncode}"
         
         return response
     
-    except subprocess.TimeoutExpired:
-        return "⏰ **Command timed out after 20 seconds**"
     except Exception as e:
         return f"❌ **Failed to execute command:** {str(e)}"
 
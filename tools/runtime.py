@@ -0,0 +1,259 @@
+"""
+Tool runtime for JARVIS
+Runs each tool call with a time budget, lets the user cancel it from the orb,
+and keeps whatever partial output the tool produced before it was stopped.
+
+Tools cooperate through the helpers at the bottom of this file: `cancelled()`,
+`report_partial()`, `sleep()` and `run_process()`. A tool that never checks
+them still can't block its caller past the budget, but it keeps running (and
+doing whatever it does) in the background; such calls are reported as abandoned.
+"""
+
+import contextvars
+import logging
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Cancel event of the command a tool call belongs to (set by whoever runs the command)
+command_cancel_event: contextvars.ContextVar = contextvars.ContextVar("command_cancel_event", default=None)
+
+_local = threading.local()
+
+
+class ToolCancelled(Exception):
+    """Raised inside a tool once its call has been cancelled or ran out of time"""
+
+
+class ToolCall:
+    """One running tool call"""
+
+    def __init__(self, name: str, budget: float, parent_cancel: Optional[threading.Event] = None):
+        self.name = name
+        self.budget = budget
+        self.parent_cancel = parent_cancel
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.started = time.perf_counter()
+        self.partial: List[str] = []
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def stop(self, reason: str):
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.cancel_event.set()
+
+
+class ToolRuntime:
+    """Runs tool functions on a bounded worker pool and waits at most their budget"""
+
+    SLOW_CALL_SECONDS = 1.0  # Tell the UI about calls that take longer than this
+    GRACE_SECONDS = 0.5  # Time a stopped tool gets to return its partial result
+
+    def __init__(self, default_budget: float = 30.0, budgets: Optional[Dict[str, object]] = None,
+                 max_workers: int = 8):
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.max_workers = max_workers
+        self.on_slow_call: Optional[Callable[[ToolCall], None]] = None
+        self.active: List[ToolCall] = []
+        self.abandoned: List[ToolCall] = []  # Stopped calls whose tool didn't return
+        self.calls = 0
+        self.timeouts = 0
+        self.cancellations = 0
+        self.abandonments = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="jarvis-tool-call")
+            return self._pool
+
+    def _still_running(self) -> List[ToolCall]:
+        """Abandoned calls that haven't returned yet (caller holds the lock)"""
+        self.abandoned = [call for call in self.abandoned if not call.done.is_set()]
+        return self.abandoned
+
+    def budget_for(self, name: str, arguments: dict) -> float:
+        budget = self.budgets.get(name, self.default_budget)
+        return float(budget(arguments) if callable(budget) else budget)
+
+    def run(self, name: str, func: Callable[[], object], arguments: Optional[dict] = None):
+        """Call func() within the tool's budget; returns its result or a stopped-early message"""
+        call = ToolCall(name, self.budget_for(name, arguments or {}), command_cancel_event.get())
+
+        def worker():
+            _local.call = call
+            try:
+                call.result = func()
+            except ToolCancelled:
+                pass
+            except BaseException as e:
+                call.error = e
+            finally:
+                _local.call = None
+                call.done.set()
+
+        with self._lock:
+            self.active.append(call)
+            self.calls += 1
+        try:
+            future = self._executor().submit(worker)
+            announced = False
+            while not call.done.wait(0.1):
+                if call.parent_cancel is not None and call.parent_cancel.is_set():
+                    call.stop("cancelled")
+                if call.cancel_event.is_set():
+                    break
+                if call.elapsed > call.budget:
+                    call.stop("timed out")
+                    break
+                if not announced and call.elapsed > self.SLOW_CALL_SECONDS and self.on_slow_call:
+                    announced = True
+                    self.on_slow_call(call)
+        finally:
+            with self._lock:
+                self.active.remove(call)
+
+        if call.stop_reason is None:
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        with self._lock:
+            if call.stop_reason == "timed out":
+                self.timeouts += 1
+            else:
+                self.cancellations += 1
+
+        # Every worker is busy (with abandoned calls): the tool never started
+        if future.cancel():
+            with self._lock:
+                busy = len(self._still_running())
+            logging.warning(f"⏱️ Tool {name} {call.stop_reason} before a worker was free")
+            return (f"⏱️ **{name} {call.stop_reason} after {call.elapsed:.0f}s without starting**\n"
+                    f"⚠️ {busy} earlier tool call(s) are still running in the background")
+
+        # A cooperating tool returns what it has so far once it sees the cancellation
+        call.done.wait(self.GRACE_SECONDS)
+        if call.done.is_set():
+            logging.warning(f"⏱️ Tool {name} {call.stop_reason} after {call.elapsed:.1f}s")
+            if call.error is None and call.result is not None:
+                return call.result
+            message = f"⏱️ **{name} {call.stop_reason} after {call.elapsed:.0f}s**"
+        else:
+            # The tool ignores cancellation: it keeps running and its effects may still happen
+            with self._lock:
+                self.abandonments += 1
+                self.abandoned.append(call)
+            logging.warning(f"⏱️ Tool {name} {call.stop_reason} after {call.elapsed:.1f}s, "
+                            f"abandoned while still running")
+            message = (f"⏱️ **{name} {call.stop_reason} after {call.elapsed:.0f}s** "
+                       f"(abandoned: it is still running in the background and may still finish its work)")
+        if call.partial:
+            message += "\n\n📋 **Partial result:**\n" + "\n".join(call.partial)
+        return message
+
+    def cancel_all(self) -> int:
+        """Stop every running tool call (click on the orb)"""
+        with self._lock:
+            active = list(self.active)
+        for call in active:
+            call.stop("cancelled")
+        return len(active)
+
+    def shutdown(self):
+        """Stop running calls and drop queued ones (abandoned tools are left to finish)"""
+        self.cancel_all()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def summary(self) -> str:
+        with self._lock:
+            running = ", ".join(call.name for call in self.active)
+            abandoned = ", ".join(call.name for call in self._still_running())
+            return (f"{self.calls} calls, {self.timeouts} timed out, {self.cancellations} cancelled, "
+                    f"{self.abandonments} abandoned"
+                    + (f" (running: {running})" if running else "")
+                    + (f" (abandoned, still running: {abandoned})" if abandoned else ""))
+
+
+# --- Helpers for tools ---
+
+def current_call() -> Optional[ToolCall]:
+    """The call the current thread is running for, if it runs under a ToolRuntime"""
+    return getattr(_local, "call", None)
+
+
+def cancelled() -> bool:
+    call = current_call()
+    return call is not None and call.cancel_event.is_set()
+
+
+def report_partial(text: str):
+    """Record output that is still worth returning if the tool is stopped early"""
+    call = current_call()
+    if call is not None:
+        call.partial.append(text)
+
+
+def sleep(seconds: float) -> bool:
+    """time.sleep that wakes up on cancellation; False if the call was cancelled"""
+    call = current_call()
+    if call is None:
+        time.sleep(seconds)
+        return True
+    return not call.cancel_event.wait(seconds)
+
+
+def run_process(args, timeout: Optional[float] = None, **kwargs):
+    """
+    subprocess.run(args, capture_output=True, text=True) that kills the process
+    when the tool call is cancelled. Returns (CompletedProcess, stop_reason);
+    stop_reason is None, "timed out" or "cancelled", and the output captured
+    up to that point is kept either way.
+    """
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs)
+    deadline = time.monotonic() + timeout if timeout else None
+    stop_reason = None
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if cancelled():
+                stop_reason = "cancelled"
+            elif deadline is not None and time.monotonic() > deadline:
+                stop_reason = "timed out"
+            else:
+                continue
+            _kill_tree(process)
+            try:
+                stdout, stderr = process.communicate(timeout=2)
+            except subprocess.TimeoutExpired:
+                stdout, stderr = "", ""  # Something still holds the pipes open
+            break
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr), stop_reason
+
+
+def _kill_tree(process: subprocess.Popen):
+    """Kill a process and its children (shell=True commands run inside a shell)"""
+    try:
+        import psutil
+        for child in psutil.Process(process.pid).children(recursive=True):
+            child.kill()
+    except Exception:
+        pass
+    process.kill()